@@ -0,0 +1,849 @@
+import heapq
+import math
+import time
+from dataclasses import dataclass
+
+import arcade
+import numpy as np
+
+import game_data.collision as collision
+import game_data.vector as vector
+
+# The screen width for the rule distances, the same as the enemies use.
+SCREEN_WIDTH, SCREEN_HEIGHT = arcade.get_display_size()
+
+# Whether the enemy handler runs the movement rules for every enemy at once rather than each enemy running its own.
+BATCHED_RULES = True
+
+# How long in seconds an enemy waits between finding new effects for rules two to five.
+RULE_DELAY = 0.1
+
+# How many milliseconds each update can spend finding rules two to five, and how many enemies are found at once
+# between checks of the time.
+RULE_BUDGET = 2.0
+RULE_CHUNK = 16
+
+# Half the width in degrees of the cone in front of a shooter that has to be clear of allies, and how far past its
+# target an ally still blocks the shot.
+FIRE_SPREAD = 45
+FIRE_REACH = 200
+
+# How close an ally or the edge of a planet has to be to be dodged.
+ALLY_DISTANCE = 250
+PLANET_DISTANCE = 2500
+
+# The level of detail tiers. Reduced does not shoot, steering only chases the target, and frozen only drifts.
+LOD_FULL = 0
+LOD_REDUCED = 1
+LOD_STEERING = 2
+LOD_FROZEN = 3
+LOD_NAMES = ("full", "reduced", "steering", "frozen")
+
+# Whether the enemies are given level of detail tiers at all.
+LOD_ENABLED = True
+
+# How far outside the edge of the screen an enemy can be for each tier, past the last it is frozen.
+LOD_DISTANCES = (200, SCREEN_WIDTH, SCREEN_WIDTH * 8)
+
+# How much further than a tier's distance an enemy has to go before it drops to the tier below.
+LOD_HYSTERESIS = 150
+
+# How many times a second each tier updates. None updates every tick, and 0 never updates.
+LOD_TICK_RATES = (None, 15, 4, 0)
+
+# Enemies this close to their target are in range to shoot it, and are never given less than the reduced tier.
+ENGAGE_DISTANCE = 750
+
+# How close an enemy has to be to the player to attack them, and how much closer than the others, and further past
+# the range, an enemy already attacking counts as.
+THREAT_RANGE = SCREEN_WIDTH * 3
+THREAT_HYSTERESIS = 300
+
+# How many times a second the attackers are chosen. None chooses them every update.
+THREAT_RATE = 4
+
+
+@dataclass
+class FlockState:
+    """
+    Every value the movement rules read, as arrays with one row per enemy.
+    """
+    # The enemies' positions, velocities, angles and speeds.
+    positions: np.ndarray
+    velocities: np.ndarray
+    angles: np.ndarray
+    speeds: np.ndarray
+
+    # The direction and distance to each enemy's target, the target's velocity and speed, and the acceleration to
+    # chase it with.
+    target_directions: np.ndarray
+    target_distances: np.ndarray
+    target_velocities: np.ndarray
+    target_speeds: np.ndarray
+    target_accelerations: np.ndarray
+
+    # The priority of each of the five rules, one column per rule.
+    priorities: np.ndarray
+
+    # The positions and angles of every sprite in the enemy list, and the row of each enemy in them.
+    neighbour_positions: np.ndarray
+    neighbour_angles: np.ndarray
+    neighbour_rows: np.ndarray
+
+    # The player's position and angle.
+    player_position: np.ndarray
+    player_angle: float
+
+    # The position and half width of every gravity influence.
+    influence_positions: np.ndarray
+    influence_radii: np.ndarray
+
+    def select(self, rows):
+        """
+        Take some of the enemies. The neighbours, player and influences are kept whole.
+
+        :param rows: The rows to keep, as indices or a mask.
+        :return: A new FlockState.
+        """
+        return FlockState(self.positions[rows], self.velocities[rows], self.angles[rows], self.speeds[rows],
+                          self.target_directions[rows], self.target_distances[rows], self.target_velocities[rows],
+                          self.target_speeds[rows], self.target_accelerations[rows], self.priorities[rows],
+                          self.neighbour_positions, self.neighbour_angles, self.neighbour_rows[rows],
+                          self.player_position, self.player_angle, self.influence_positions, self.influence_radii)
+
+
+def dodge_sides(differences_left, differences_right):
+    """
+    Find which way to dodge something facing within 45 degrees of an enemy, and how strongly.
+
+    :return: The side, -1, 1 or 0 for no dodge, and how strongly to dodge.
+    """
+    left = (differences_left < 45) & (differences_left < differences_right)
+    right = (differences_right < 45) & (differences_right < differences_left)
+    sides = np.where(right, 1, np.where(left, -1, 0))
+    moves = np.where(right, 45 - differences_right, np.where(left, 45 - differences_left, 0.0))
+    return sides, moves
+
+
+def approach_accelerations(directions, distances, accelerations, priorities):
+    """
+    Find rule one from its arrays, so the steering can use it without the rest of the state.
+
+    :param directions: The (n, 2) unit vectors towards each enemy's target.
+    :param distances: The distance to each target.
+    :param accelerations: The acceleration each enemy chases its target with.
+    :param priorities: The priority of rule one for each enemy.
+    :return: The (n, 2) accelerations.
+    """
+    # The very far case of the scalar rule is always replaced by the next one, so it is left out.
+    factors = np.select([distances > SCREEN_HEIGHT / 2 + 50,
+                         distances > SCREEN_HEIGHT / 2 - 25,
+                         distances < SCREEN_HEIGHT / 2 - 130,
+                         distances < 75],
+                        [accelerations + 1.4, accelerations, -2.5, -4.0], 0.0)
+
+    # Increase it by 1.5 times to ensure they do not run away.
+    return directions * (factors * priorities * 1.5)[:, np.newaxis]
+
+
+def approach_rule(state: FlockState):
+    """
+    Rule One: Move Towards the player but stay 300 pixels away.
+    """
+    return approach_accelerations(state.target_directions, state.target_distances, state.target_accelerations,
+                                  state.priorities[:, 0])
+
+
+def separation_rule(state: FlockState):
+    """
+    Rule Two: Avoid being in front of allies, and do not crash into each other.
+    """
+    # Every enemy and neighbour close enough to dodge. An enemy is not its own neighbour.
+    rows, columns = collision.near_pairs(state.positions, state.neighbour_positions, ALLY_DISTANCE)
+    other = columns != state.neighbour_rows[rows]
+    rows, columns = rows[other], columns[other]
+
+    # The direction from each neighbour to its enemy.
+    units, distances = vector.directions(state.positions[rows], state.neighbour_positions[columns])
+
+    # If the neighbour is looking at the enemy dodge at a right angle to its facing, else move away from it.
+    angles = state.neighbour_angles[columns]
+    sides, moves = dodge_sides(*vector.calc_differences(angles, vector.headings(units)))
+    facing = vector.angle_vectors(angles)
+    dodges = np.stack((-facing[:, 1] * sides, facing[:, 0] * sides), axis=-1) * moves[:, np.newaxis]
+    offsets = state.positions[rows] - state.neighbour_positions[columns]
+    pushes = np.where((sides != 0)[:, np.newaxis], dodges, offsets)
+
+    # Find the average of each enemy's pushes and apply it.
+    count = len(state.positions)
+    totals = np.maximum(np.bincount(rows, minlength=count), 1)
+    summed = np.stack((np.bincount(rows, pushes[:, 0], minlength=count),
+                       np.bincount(rows, pushes[:, 1], minlength=count)), axis=-1)
+    return summed / totals[:, np.newaxis] * (state.priorities[:, 1] * 0.05)[:, np.newaxis]
+
+
+def match_speed_rule(state: FlockState):
+    """
+    Rule Three: Attempt to slow down or speed up to match the players velocity.
+    """
+    # Close enemies with a very different speed match slowly, closer ones match faster.
+    distances = state.target_distances
+    very_different = (distances < SCREEN_WIDTH * 1.5) & (np.abs(state.speeds - state.target_speeds) > 250)
+    factors = np.select([very_different, distances < SCREEN_WIDTH], [1 / 8, 1 / 4], 0.0)
+
+    return (state.target_velocities - state.velocities) * (factors * 0.05 * state.priorities[:, 2])[:, np.newaxis]
+
+
+def avoid_nose_rule(state: FlockState):
+    """
+    Rule Four: Avoid being in front of the player.
+    """
+    # Same as with Rule 2, dodge at a right angle to the player's facing.
+    angles_to_self = vector.headings(state.positions - state.player_position)
+    sides, moves = dodge_sides(*vector.calc_differences(state.player_angle, angles_to_self))
+    facing_x, facing_y = vector.angle_vector(state.player_angle)
+    dodges = np.stack((-facing_y * sides, facing_x * sides), axis=-1) * moves[:, np.newaxis]
+
+    return dodges * (state.priorities[:, 3] * 0.05)[:, np.newaxis]
+
+
+def avoid_planets_rule(state: FlockState):
+    """
+    Rule Five: avoid planets
+    """
+    pushes = np.zeros((len(state.positions), 2))
+    totals = np.zeros(len(state.positions))
+
+    # The push from each influence builds on the push from those before it, so the influences go one at a time.
+    for position, radius in zip(state.influence_positions, state.influence_radii):
+        units, distances = vector.directions(state.positions, position)
+        distances = distances - radius
+        inside = (0 < distances) & (distances < PLANET_DISTANCE)
+
+        # Inverse the acceleration so the closer they are the stronger the push, then increase it by 3.
+        pushed = pushes + units * (distances / PLANET_DISTANCE)[:, np.newaxis]
+        pushed = np.where(pushed < 0, -1 - pushed, 1 - pushed) * 3
+        pushes = np.where(inside[:, np.newaxis], pushed, pushes)
+        totals += inside
+
+    # Find the average.
+    return pushes / np.maximum(totals, 1)[:, np.newaxis] * state.priorities[:, 4, np.newaxis]
+
+
+# The rules found every tenth of a second, in order.
+DELAYED_RULES = (separation_rule, match_speed_rule, avoid_nose_rule, avoid_planets_rule)
+
+
+def find_decisions(state: FlockState, due_rows, reaches, spread: float = FIRE_SPREAD, fire: bool = True):
+    """
+    Find everything the enemies decide in an update from their state alone, in-process or in the AI worker.
+
+    :param state: The FlockState of the enemies.
+    :param due_rows: The rows that find new effects for rules two to five, as any number of arrays.
+    :param reaches: How far past each enemy an ally blocks its shot.
+    :param spread: Half the width of the cone in front of a shooter in degrees.
+    :param fire: Whether to find if each enemy's shot is blocked. If not, the enemies ask the handler's LineOfFire.
+    :return: The (n, 5, 2) effect of every rule, the (n, 4) mask of the delayed effects that were found, and whether
+    each enemy's shot is blocked, or None.
+    """
+    effects = np.zeros((len(state.positions), 5, 2))
+    found = np.zeros((len(state.positions), 4), dtype=bool)
+    effects[:, 0] = approach_rule(state)
+
+    # Rules two to five are only found for the enemies that are due, and only if the rule has a priority.
+    for rows in due_rows:
+        if not len(rows):
+            continue
+        due_state = state.select(rows)
+        for column, rule in enumerate(DELAYED_RULES):
+            prioritised = due_state.priorities[:, column + 1] != 0
+            if prioritised.any():
+                effects[rows[prioritised], column + 1] = rule(due_state)[prioritised]
+                found[rows[prioritised], column] = True
+
+    if not fire:
+        return effects, found, None
+
+    # Each enemy asks if its shot at its current angle is blocked, the same as it would when shooting.
+    line_of_fire = LineOfFire()
+    line_of_fire.load(state.positions, state.neighbour_positions, state.neighbour_rows)
+    blocked = np.array([line_of_fire.blocked_row(row, angle, reach, spread)
+                        for row, (angle, reach) in enumerate(zip(state.angles.tolist(), reaches.tolist()))],
+                       dtype=bool)
+    return effects, found, blocked
+
+
+class RuleScheduler:
+    """
+    Spreads the enemies finding new effects for rules two to five over the updates, the stalest first, within a
+    time budget.
+    """
+
+    def __init__(self, budget: float = RULE_BUDGET, chunk: int = RULE_CHUNK, period: float = RULE_DELAY):
+        # The milliseconds each update can spend, the enemies found between checks of the time, and how long each
+        # enemy should wait between finding new effects.
+        self.budget = budget
+        self.chunk = chunk
+        self.period = period
+
+        # The number of enemies found last update, the number due but carried over, and the milliseconds spent.
+        self.found = 0
+        self.carried_over = 0
+        self.time_spent = 0.0
+
+        # How old the oldest effects were after the last update, and the average age, in seconds.
+        self.max_staleness = 0.0
+        self.mean_staleness = 0.0
+
+    @staticmethod
+    def staleness(enemy, now):
+        """
+        Find how old an enemy's effects for rules two to five are.
+
+        :param enemy: The enemy.
+        :param now: The game time.
+        :return: The age in seconds, or None if they have never been found.
+        """
+        if enemy.rule_time is None:
+            return None
+        return now - enemy.rule_time
+
+    def slices(self, rule_times, now, delta_time):
+        """
+        Yield the rows of the enemies to find, a chunk at a time, until the share is done or the budget is spent.
+
+        :param rule_times: The game time each enemy last found its effects, -inf if it never has.
+        :param now: The game time.
+        :param delta_time: The time since the last update.
+        """
+        # An enemy is due once its effects are a period old, or if the clock was reset since.
+        stale = now - rule_times
+        due = np.flatnonzero((stale >= self.period - delta_time / 2) | (stale < 0))
+        order = due[np.argsort(-stale[due], kind='stable')]
+
+        # Each update takes its share, so every enemy is found once a period spread evenly over the updates.
+        share = max(1, math.ceil(len(rule_times) * delta_time / self.period))
+        order = order[:share]
+
+        start = time.perf_counter()
+        found = 0
+        for first in range(0, len(order), self.chunk):
+            if found and (time.perf_counter() - start) * 1000 > self.budget:
+                break
+            rows = order[first:first + self.chunk]
+            yield rows
+            found += len(rows)
+            rule_times[rows] = now
+
+        self.found = found
+        self.carried_over = len(due) - found
+        self.time_spent = (time.perf_counter() - start) * 1000
+
+        stale = now - rule_times
+        if len(stale):
+            self.max_staleness = float(stale.max())
+            self.mean_staleness = float(stale[np.isfinite(stale)].mean()) if np.isfinite(stale).any() else 0.0
+
+
+class LineOfFire:
+    """
+    Answers whether an ally is in the way of a shot, from the bearings to every sprite sorted once an update.
+    """
+
+    def __init__(self):
+        # The bearings from each shooter to every sprite, sorted, and the distances in the same order.
+        self.bearings = np.zeros((0, 0))
+        self.distances = np.zeros((0, 0))
+
+        # The row of each shooter, and the positions and column of every sprite that can block a shot.
+        self.rows = {}
+        self.positions = np.zeros((0, 2))
+        self.columns = {}
+
+        # Whether each shooter is blocked, when it was decided elsewhere such as by the AI worker.
+        self.decisions = {}
+
+    def build(self, shooters, sprites):
+        """
+        Find and sort every shooter's bearings. Nothing moves until the physics step so it is correct for the update.
+
+        :param shooters: The sprites that might shoot.
+        :param sprites: The sprites that can block a shot.
+        """
+        sprites = list(sprites)
+        self.positions = np.array([(sprite.center_x, sprite.center_y) for sprite in sprites],
+                                  dtype=float).reshape(-1, 2)
+        self.columns = {id(sprite): column for column, sprite in enumerate(sprites)}
+        shooters = list(shooters)
+        self.rows = {id(shooter): row for row, shooter in enumerate(shooters)}
+        self.decisions = {}
+
+        origins = np.array([(shooter.center_x, shooter.center_y) for shooter in shooters], dtype=float).reshape(-1, 2)
+        self.bearings, self.distances = self.sort_bearings(origins, [id(shooter) for shooter in shooters])
+
+    def load(self, origins, positions, exclude):
+        """
+        Build from arrays rather than sprites. The shooters and sprites are then known by their row and column.
+
+        :param origins: The (n, 2) positions of the shooters.
+        :param positions: The (m, 2) positions of the sprites that can block a shot.
+        :param exclude: The column of each shooter in the sprites.
+        """
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        self.columns = {column: column for column in range(len(self.positions))}
+        self.rows = {row: row for row in range(len(origins))}
+        self.decisions = {}
+        self.bearings, self.distances = self.sort_bearings(np.asarray(origins, dtype=float).reshape(-1, 2),
+                                                           [int(column) for column in exclude])
+
+    def sort_bearings(self, origins, exclude):
+        """
+        Find the bearings and distances from some origins to every sprite, each row sorted by bearing.
+
+        :param origins: The (n, 2) positions of the shooters.
+        :param exclude: The key of each shooter in the columns, so a shooter does not block itself.
+        :return: The (n, m) sorted bearings and the distances in the same order.
+        """
+        units, distances = vector.directions(self.positions[np.newaxis], origins[:, np.newaxis])
+        bearings = vector.headings(units)
+
+        # A shooter is never in its own way.
+        for row, sprite_id in enumerate(exclude):
+            column = self.columns.get(sprite_id)
+            if column is not None:
+                distances[row, column] = np.inf
+
+        order = np.argsort(bearings, axis=1)
+        return np.take_along_axis(bearings, order, axis=1), np.take_along_axis(distances, order, axis=1)
+
+    def blocked(self, shooter, angle, reach, spread: float = FIRE_SPREAD):
+        """
+        Find if any sprite is within a cone in front of a shooter.
+
+        :param shooter: The sprite shooting.
+        :param angle: The angle in degrees the shot is fired at.
+        :param reach: How far the cone reaches.
+        :param spread: Half the width of the cone in degrees.
+        :return: True if a sprite is in the way.
+        """
+        decision = self.decisions.get(id(shooter))
+        if decision is not None:
+            return decision
+
+        row = self.rows.get(id(shooter))
+        if row is None:
+            bearings, distances = self.sort_bearings(np.array([(shooter.center_x, shooter.center_y)], dtype=float),
+                                                     [id(shooter)])
+            return self.in_cone(bearings[0], distances[0], angle, reach, spread)
+        return self.blocked_row(row, angle, reach, spread)
+
+    def blocked_row(self, row, angle, reach, spread: float = FIRE_SPREAD):
+        # The same as blocked, for a shooter by its row in the last build.
+        return self.in_cone(self.bearings[row], self.distances[row], angle, reach, spread)
+
+    @staticmethod
+    def in_cone(bearings, distances, angle, reach, spread):
+        # Find if any of a shooter's sorted bearings is within the cone and closer than the reach.
+        if spread >= 180:
+            return bool(np.any(distances < reach))
+
+        # The sprites strictly inside the cone, which wraps around 0 degrees.
+        low = (angle - spread) % 360
+        high = (angle + spread) % 360
+        first = np.searchsorted(bearings, low, side='right')
+        last = np.searchsorted(bearings, high, side='left')
+        if low <= high:
+            inside = distances[first:last]
+        else:
+            inside = np.concatenate((distances[first:], distances[:last]))
+
+        return bool(np.any(inside < reach))
+
+
+class ThreatAssigner:
+    """
+    Decides which enemies attack the player, the closest in range up to a number, and which attack the mission
+    target.
+    """
+
+    def __init__(self, rate: float = THREAT_RATE, threat_range: float = THREAT_RANGE,
+                 hysteresis: float = THREAT_HYSTERESIS):
+        # The times a second the attackers are chosen, the range and the head start of an enemy already attacking.
+        self.rate = rate
+        self.threat_range = threat_range
+        self.hysteresis = hysteresis
+
+        # The time since the attackers were last chosen.
+        self.time = 0
+
+        # The number of attackers after the last choice, and the number of enemies whose target changed.
+        self.attackers = 0
+        self.changes = 0
+
+    def on_update(self, delta_time, enemies, player, target_object, count):
+        """
+        Choose the attackers if it is time to.
+
+        :param delta_time: The time since the last update.
+        :param enemies: The enemies.
+        :param player: The player.
+        :param target_object: The mission target.
+        :param count: The most enemies that can attack the player.
+        :return: True if the attackers were chosen.
+        """
+        self.time += delta_time
+        if self.rate is not None and self.time < 1 / self.rate - delta_time / 2:
+            return False
+        self.time = 0
+        self.assign(enemies, player, target_object, count)
+        return True
+
+    def assign(self, enemies, player, target_object, count):
+        """
+        Choose the attackers, and give every enemy its target.
+
+        :param enemies: The enemies.
+        :param player: The player.
+        :param target_object: The mission target.
+        :param count: The most enemies that can attack the player.
+        """
+        enemies = list(enemies)
+        self.changes = 0
+        if not enemies:
+            self.attackers = 0
+            return
+
+        positions = np.array([(enemy.center_x, enemy.center_y) for enemy in enemies], dtype=float)
+        distances = np.sqrt(((positions - (player.center_x, player.center_y)) ** 2).sum(axis=1))
+
+        # The enemies in range, with those already attacking a little closer and in range a little further.
+        candidates = []
+        for row, (enemy, distance) in enumerate(zip(enemies, distances.tolist())):
+            if enemy.target is player:
+                if distance < self.threat_range + self.hysteresis:
+                    candidates.append((distance - self.hysteresis, row))
+            elif distance < self.threat_range:
+                candidates.append((distance, row))
+
+        chosen = {row for _, row in heapq.nsmallest(count, candidates)}
+        self.attackers = len(chosen)
+
+        for row, enemy in enumerate(enemies):
+            target = player if row in chosen else target_object
+            if enemy.target is not target:
+                previous = enemy.target
+                enemy.target = target
+                enemy.on_target_changed(previous, target)
+                self.changes += 1
+
+
+class FlockingEngine:
+    """
+    Runs the movement rules for every enemy at once, and gives the enemies far from the screen a lower level of
+    detail.
+    """
+
+    def __init__(self, handler):
+        # The enemy handler, for the enemies, the player and the game window.
+        self.handler = handler
+
+        # Whether the level of detail tiers are used, and the updates a second of each tier.
+        self.lod_enabled = LOD_ENABLED
+        self.tick_rates = list(LOD_TICK_RATES)
+
+        # The number of enemies in each tier, the number the rules were found for last update, and how many found new
+        # delayed effects.
+        self.tier_counts = [0] * len(LOD_NAMES)
+        self.enemies_updated = 0
+        self.enemies_due = 0
+
+    def on_update(self, delta_time: float = 1 / 60):
+        """
+        Update every sprite in the enemy list, with the movement rules found for all the enemies at once.
+        """
+        # The explosions update themselves.
+        enemies = []
+        for sprite in list(self.handler.enemy_sprites):
+            if type(sprite) == vector.AnimatedTempSprite:
+                sprite.on_update(delta_time)
+            else:
+                enemies.append(sprite)
+
+        promoted = self.assign_tiers(enemies) if self.lod_enabled else set()
+
+        # Find which enemies are due to update in their tier.
+        thinking = []
+        steering = []
+        for enemy in enemies:
+            enemy.lod_time += delta_time
+            interval = self.tick_interval(enemy.lod)
+            if interval is None:
+                continue
+            if id(enemy) in promoted or enemy.lod_time >= interval - delta_time / 2:
+                if enemy.lod == LOD_STEERING:
+                    steering.append(enemy)
+                else:
+                    thinking.append(enemy)
+
+        # The enemies calculate their movement and turn, the rules are found for all of them, then they shoot.
+        acting = []
+        for enemy in thinking:
+            enemy.think(enemy.lod_time)
+            if enemy.health > 0:
+                acting.append(enemy)
+
+        self.enemies_updated = len(acting)
+        if acting:
+            self.apply_rules(acting, delta_time)
+
+        # Only the enemies in the full tier, on or near the screen, shoot.
+        for enemy in acting:
+            enemy.act(enemy.lod_time, enemy.lod == LOD_FULL)
+            enemy.lod_time = 0
+
+        if steering:
+            self.steer(steering)
+
+        # Every enemy that is not frozen keeps the acceleration from its last update.
+        moving = [enemy for enemy in enemies if enemy.lod != LOD_FROZEN and enemy.health > 0]
+        if moving:
+            physics_world = self.handler.game_window.physics_world
+            physics_world.velocities[[enemy.physics_row for enemy in moving]] += \
+                np.array([enemy.rule_acceleration for enemy in moving], dtype=float)
+
+    def tick_interval(self, tier):
+        """
+        Find how long a tier waits between updates.
+
+        :param tier: The tier.
+        :return: The time in seconds, 0 for every tick, or None if the tier never updates.
+        """
+        rate = self.tick_rates[tier]
+        if rate is None:
+            return 0
+        if rate <= 0:
+            return None
+        return 1 / rate
+
+    def assign_tiers(self, enemies):
+        """
+        Give every enemy a tier from how far it is outside the screen.
+
+        :param enemies: The enemies.
+        :return: The ids of the enemies that moved to a higher tier, which update straight away.
+        """
+        if not enemies:
+            self.tier_counts = [0] * len(LOD_NAMES)
+            return set()
+
+        # How far each enemy is outside the screen, 0 if it is on it.
+        game_window = self.handler.game_window
+        positions = np.array([(enemy.center_x, enemy.center_y) for enemy in enemies], dtype=float)
+        screen_min = np.array((game_window.left_view, game_window.bottom_view), dtype=float)
+        screen_max = screen_min + (SCREEN_WIDTH, SCREEN_HEIGHT)
+        outside = np.maximum(np.maximum(screen_min - positions, positions - screen_max), 0)
+        outside = np.sqrt(np.einsum('ij,ij->i', outside, outside))
+
+        # Enemies move up a tier straight away, but only move down once past the hysteresis.
+        current = np.array([enemy.lod for enemy in enemies], dtype=int)
+        closest = np.searchsorted(LOD_DISTANCES, outside, side='right')
+        furthest = np.searchsorted(LOD_DISTANCES, outside - LOD_HYSTERESIS, side='right')
+        tiers = np.where(closest < current, closest, np.maximum(furthest, current))
+
+        engaged = np.array([enemy.target_distance < ENGAGE_DISTANCE for enemy in enemies])
+        tiers = np.where(engaged, np.minimum(tiers, LOD_REDUCED), tiers)
+
+        # Enemies chasing something other than the player, like the station, never freeze.
+        player = self.handler.player
+        chasing = np.array([enemy.target is not None and enemy.target is not player for enemy in enemies])
+        tiers = np.where(chasing, np.minimum(tiers, LOD_STEERING), tiers)
+
+        promoted = set()
+        for enemy, tier in zip(enemies, tiers.tolist()):
+            if tier < enemy.lod:
+                promoted.add(id(enemy))
+
+                # Coming back from only steering, every rule is found again as soon as possible.
+                if enemy.lod >= LOD_STEERING:
+                    enemy.rule_time = None
+            elif tier == LOD_FROZEN and enemy.lod != LOD_FROZEN:
+                enemy.rule_acceleration = [0.0, 0.0]
+            enemy.lod = tier
+
+        self.tier_counts = np.bincount(tiers, minlength=len(LOD_NAMES)).tolist()
+        return promoted
+
+    def steer(self, enemies):
+        """
+        The update of the steering tier, which only chases the target with rule one.
+
+        :param enemies: The enemies to steer.
+        """
+        positions = np.array([(enemy.center_x, enemy.center_y) for enemy in enemies], dtype=float)
+        targets = np.array([(enemy.target.center_x, enemy.target.center_y) for enemy in enemies], dtype=float)
+        units, distances = vector.directions(targets, positions)
+        accelerations = approach_accelerations(units, distances,
+                                               np.array([enemy.target_acceleration for enemy in enemies], dtype=float),
+                                               np.array([enemy.rule_1_priority for enemy in enemies], dtype=float))
+
+        for enemy, unit, distance, angle, acceleration in zip(enemies, units.tolist(), distances.tolist(),
+                                                              vector.headings(units).tolist(), accelerations.tolist()):
+            enemy.target_direction = tuple(unit)
+            enemy.target_distance = distance
+            enemy.angle = angle
+            enemy.rule_acceleration = acceleration
+            enemy.shot_volume = 0
+            enemy.lod_time = 0
+
+    def gather(self, enemies):
+        """
+        Read everything the rules need from the enemies and the world.
+
+        :param enemies: The enemies to find the rules for.
+        :return: The FlockState of the enemies.
+        """
+        player = self.handler.player
+        physics_world = self.handler.game_window.physics_world
+        influences = list(self.handler.game_window.gravity_handler.gravity_influences)
+
+        # Every sprite in the enemy list can be dodged, including the explosions.
+        neighbours = list(self.handler.enemy_sprites)
+        neighbour_rows = {id(neighbour): row for row, neighbour in enumerate(neighbours)}
+
+        rows = [enemy.physics_row for enemy in enemies]
+        return FlockState(
+            positions=np.array([(enemy.center_x, enemy.center_y) for enemy in enemies], dtype=float),
+            velocities=physics_world.velocities[rows],
+            angles=np.array([enemy.angle for enemy in enemies], dtype=float),
+            speeds=np.array([enemy.speed for enemy in enemies], dtype=float),
+            target_directions=np.array([enemy.target_direction for enemy in enemies], dtype=float),
+            target_distances=np.array([enemy.target_distance for enemy in enemies], dtype=float),
+            target_velocities=np.array([(enemy.target_velocity[0], enemy.target_velocity[1]) for enemy in enemies],
+                                       dtype=float),
+            target_speeds=np.array([enemy.target_speed for enemy in enemies], dtype=float),
+            target_accelerations=np.array([enemy.target_acceleration for enemy in enemies], dtype=float),
+            priorities=np.array([(enemy.rule_1_priority, enemy.rule_2_priority, enemy.rule_3_priority,
+                                  enemy.rule_4_priority, enemy.rule_5_priority) for enemy in enemies], dtype=float),
+            neighbour_positions=np.array([(neighbour.center_x, neighbour.center_y) for neighbour in neighbours],
+                                         dtype=float).reshape(-1, 2),
+            neighbour_angles=np.array([neighbour.angle for neighbour in neighbours], dtype=float),
+            neighbour_rows=np.array([neighbour_rows[id(enemy)] for enemy in enemies], dtype=int),
+            player_position=np.array((player.center_x, player.center_y), dtype=float),
+            player_angle=float(player.angle),
+            influence_positions=np.array([(influence.center_x, influence.center_y) for influence in influences],
+                                         dtype=float).reshape(-1, 2),
+            influence_radii=np.array([influence.width / 2 for influence in influences], dtype=float))
+
+    def apply_rules(self, enemies, delta_time: float = 1 / 60):
+        """
+        Find every rule for the enemies and keep the summed result as their acceleration.
+
+        :param enemies: The enemies to find the rules for.
+        :param delta_time: The time since the last update.
+        """
+        state = self.gather(enemies)
+
+        # If the AI worker is running it finds the rules instead.
+        worker = self.handler.ai_worker
+        if worker is not None and worker.active:
+            self.apply_worker_rules(worker, enemies, state, delta_time)
+            return
+
+        # The scheduler picks which enemies find new effects this update, a slice at a time within its budget.
+        now = self.handler.game_window.clock.time
+        rule_times = np.array([-math.inf if enemy.rule_time is None else enemy.rule_time for enemy in enemies],
+                              dtype=float)
+        effects, found, _ = self.find_scheduled(enemies, state,
+                                                self.handler.rule_scheduler.slices(rule_times, now, delta_time),
+                                                state.target_distances + FIRE_REACH)
+        self.enemies_due = self.handler.rule_scheduler.found
+        self.apply_decisions(enemies, effects, found, rule_times == now, now)
+
+    def find_scheduled(self, enemies, state, slices, reaches, fire: bool = False):
+        """
+        Run find_decisions in-process over the rule scheduler's slices.
+
+        :param enemies: The enemies.
+        :param state: The FlockState of the enemies.
+        :param slices: The rows due to find their delayed effects, a slice at a time.
+        :param reaches: How far past each enemy an ally blocks its shot.
+        :param fire: Whether to ask if each shot is blocked now, rather than when the enemy shoots.
+        :return: The effects, the mask of delayed effects found, and whether each shot is blocked, or None.
+        """
+        effects, found, _ = find_decisions(state, slices, reaches, fire=False)
+        if not fire:
+            return effects, found, None
+
+        line_of_fire = self.handler.line_of_fire
+        blocked = np.array([line_of_fire.blocked(enemy, enemy.angle, reach)
+                            for enemy, reach in zip(enemies, reaches.tolist())], dtype=bool)
+        return effects, found, blocked
+
+    def apply_worker_rules(self, worker, enemies, state, delta_time: float = 1 / 60):
+        """
+        Hand the enemies' state to the AI worker, and apply what it found last tick. The rest are found here.
+
+        :param worker: The AIWorker.
+        :param enemies: The enemies to find the rules for.
+        :param state: The FlockState of the enemies.
+        :param delta_time: The time since the last update.
+        """
+        # The scheduler still picks which enemies find new delayed effects. The worker finds them all at once.
+        now = self.handler.game_window.clock.time
+        rule_times = np.array([-math.inf if enemy.rule_time is None else enemy.rule_time for enemy in enemies],
+                              dtype=float)
+        slices = list(self.handler.rule_scheduler.slices(rule_times, now, delta_time))
+        due = np.zeros(len(enemies), dtype=bool)
+        for rows in slices:
+            due[rows] = True
+        self.enemies_due = self.handler.rule_scheduler.found
+
+        # With verify on the worker's results are checked against what the handler's own path finds for the tick.
+        reaches = state.target_distances + FIRE_REACH
+        expected = self.find_scheduled(enemies, state, slices, reaches, fire=True) if worker.verify else None
+        results = worker.exchange([enemy.serial for enemy in enemies], state, due, reaches, expected)
+
+        missing = [row for row, enemy in enumerate(enemies) if enemy.serial not in results]
+        if missing:
+            effects, found, blocked = find_decisions(state.select(missing), (np.flatnonzero(due[missing]),),
+                                                     reaches[missing])
+            for row, enemy_effects, enemy_found, enemy_blocked in zip(missing, effects, found, blocked):
+                results[enemies[row].serial] = (enemy_effects, enemy_found, enemy_blocked)
+
+        effects, found, blocked = (np.array(column) for column in zip(*(results[enemy.serial] for enemy in enemies)))
+        self.apply_decisions(enemies, effects, found, due, now, blocked)
+
+    def apply_decisions(self, enemies, effects, found, due, now, blocked=None):
+        """
+        Write what find_decisions found back to the enemies so the next update, batched or not, carries on from it.
+
+        :param enemies: The enemies the decisions were found for.
+        :param effects: The (n, 5, 2) effect of every rule.
+        :param found: The (n, 4) mask of the delayed effects that were found.
+        :param due: Which enemies were due to find their delayed effects.
+        :param now: The game time of the update.
+        :param blocked: Whether each enemy's shot is blocked, if it was found.
+        """
+        # Only the delayed effects that were found replace the enemy's last ones.
+        for enemy, enemy_effects, enemy_found, due_now in zip(enemies, effects.tolist(), found.tolist(), due.tolist()):
+            delayed = [enemy.rule_2_effect, enemy.rule_3_effect, enemy.rule_4_effect, enemy.rule_5_effect]
+            for column, column_found in enumerate(enemy_found):
+                if column_found:
+                    delayed[column] = enemy_effects[column + 1]
+
+            enemy.rule_1_effect = enemy_effects[0]
+            enemy.rule_2_effect, enemy.rule_3_effect, enemy.rule_4_effect, enemy.rule_5_effect = delayed
+            enemy.rule_effects = [enemy.rule_1_effect] + delayed
+            if due_now:
+                enemy.rule_time = now
+                enemy.do_rule = 0
+
+            # The acceleration is applied every tick until the enemy next updates.
+            enemy.rule_acceleration = [sum(effect[0] for effect in enemy.rule_effects),
+                                       sum(effect[1] for effect in enemy.rule_effects)]
+
+        # The worker's fire decisions answer the enemies' shots this update.
+        if blocked is not None:
+            decisions = self.handler.line_of_fire.decisions
+            for enemy, enemy_blocked in zip(enemies, blocked.tolist()):
+                decisions[id(enemy)] = enemy_blocked
@@ -0,0 +1,299 @@
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import game_data.ai as ai
+
+# Whether the enemy handler hands the rules and fire decisions to a worker process.
+WORKER_ENABLED = False
+
+# Whether every result from the worker is checked against the same tick found in-process.
+WORKER_VERIFY = False
+
+# The most enemies, sprites in the enemy list and gravity influences the shared arrays can hold.
+WORKER_ENEMIES = 256
+WORKER_NEIGHBOURS = 512
+WORKER_INFLUENCES = 32
+
+# How long in seconds the main thread waits for the worker's results before it stops using the worker.
+WORKER_TIMEOUT = 0.25
+
+# The header holds the number of enemies, neighbours and influences, then the player's position and angle.
+HEADER_SIZE = 6
+
+# Every shared array, the capacity its rows are counted by and the shape of each row. They are all floats.
+SHARED_ARRAYS = {
+    'header': (None, (HEADER_SIZE,)),
+    'positions': ('enemies', (2,)),
+    'velocities': ('enemies', (2,)),
+    'angles': ('enemies', ()),
+    'speeds': ('enemies', ()),
+    'target_directions': ('enemies', (2,)),
+    'target_distances': ('enemies', ()),
+    'target_velocities': ('enemies', (2,)),
+    'target_speeds': ('enemies', ()),
+    'target_accelerations': ('enemies', ()),
+    'priorities': ('enemies', (5,)),
+    'neighbour_rows': ('enemies', ()),
+    'due': ('enemies', ()),
+    'reaches': ('enemies', ()),
+    'neighbour_positions': ('neighbours', (2,)),
+    'neighbour_angles': ('neighbours', ()),
+    'influence_positions': ('influences', (2,)),
+    'influence_radii': ('influences', ()),
+    'effects': ('enemies', (5, 2)),
+    'found': ('enemies', (4,)),
+    'blocked': ('enemies', ()),
+}
+
+# The arrays of the FlockState with one row per enemy, one per neighbour and one per influence.
+ENEMY_FIELDS = ('positions', 'velocities', 'angles', 'speeds', 'target_directions', 'target_distances',
+                'target_velocities', 'target_speeds', 'target_accelerations', 'priorities')
+NEIGHBOUR_FIELDS = ('neighbour_positions', 'neighbour_angles')
+INFLUENCE_FIELDS = ('influence_positions', 'influence_radii')
+
+
+class SharedArrays:
+    """
+    The arrays in shared memory the main thread publishes the enemies' state to, and the worker writes results to.
+    """
+
+    def __init__(self, capacities: dict, names: dict = None):
+        # The number of rows of each capacity, and the blocks and the arrays over them.
+        self.capacities = capacities
+        self.blocks = {}
+        self.arrays = {}
+
+        # The creator makes the blocks, the worker attaches to them by name.
+        self.owner = names is None
+        for key, (capacity, row_shape) in SHARED_ARRAYS.items():
+            shape = ((capacities[capacity],) if capacity is not None else ()) + row_shape
+            if self.owner:
+                block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)), 1) * 8)
+            else:
+                block = shared_memory.SharedMemory(name=names[key])
+            self.blocks[key] = block
+            self.arrays[key] = np.ndarray(shape, dtype=float, buffer=block.buf)
+
+    @property
+    def names(self):
+        # The name of every block, for the worker to attach to.
+        return {key: block.name for key, block in self.blocks.items()}
+
+    def fits(self, state: ai.FlockState):
+        # Whether a state is small enough for the arrays.
+        return (len(state.positions) <= self.capacities['enemies'] and
+                len(state.neighbour_positions) <= self.capacities['neighbours'] and
+                len(state.influence_positions) <= self.capacities['influences'])
+
+    def publish(self, state: ai.FlockState, due, reaches):
+        """
+        Write a tick's state into the arrays.
+
+        :param state: The FlockState of the enemies.
+        :param due: Which enemies find new effects for rules two to five.
+        :param reaches: How far past each enemy an ally blocks its shot.
+        """
+        n, m, k = len(state.positions), len(state.neighbour_positions), len(state.influence_positions)
+        self.arrays['header'][:] = (n, m, k, state.player_position[0], state.player_position[1], state.player_angle)
+        for key in ENEMY_FIELDS:
+            self.arrays[key][:n] = getattr(state, key)
+        for key in NEIGHBOUR_FIELDS:
+            self.arrays[key][:m] = getattr(state, key)
+        for key in INFLUENCE_FIELDS:
+            self.arrays[key][:k] = getattr(state, key)
+        self.arrays['neighbour_rows'][:n] = state.neighbour_rows
+        self.arrays['due'][:n] = due
+        self.arrays['reaches'][:n] = reaches
+
+    def read(self):
+        """
+        Read a copy of the tick's state from the arrays.
+
+        :return: The FlockState, which enemies are due, and the reach of each shot.
+        """
+        n, m, k, player_x, player_y, player_angle = self.arrays['header'].tolist()
+        n, m, k = int(n), int(m), int(k)
+        fields = {key: self.arrays[key][:n].copy() for key in ENEMY_FIELDS}
+        fields.update({key: self.arrays[key][:m].copy() for key in NEIGHBOUR_FIELDS})
+        fields.update({key: self.arrays[key][:k].copy() for key in INFLUENCE_FIELDS})
+        state = ai.FlockState(neighbour_rows=self.arrays['neighbour_rows'][:n].astype(int),
+                              player_position=np.array((player_x, player_y)), player_angle=player_angle, **fields)
+        return state, self.arrays['due'][:n] != 0, self.arrays['reaches'][:n].copy()
+
+    def write_results(self, effects, found, blocked):
+        # Write the worker's results into the arrays.
+        n = len(effects)
+        self.arrays['effects'][:n] = effects
+        self.arrays['found'][:n] = found
+        self.arrays['blocked'][:n] = blocked
+
+    def read_results(self, n):
+        # Copy the worker's results for the first n enemies out of the arrays.
+        return (self.arrays['effects'][:n].copy(), self.arrays['found'][:n] != 0,
+                self.arrays['blocked'][:n] != 0)
+
+    def close(self):
+        # The arrays have to go before the blocks can close. The creator also frees the memory.
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            if self.owner:
+                block.unlink()
+        self.blocks = {}
+
+
+def worker_main(names: dict, capacities: dict, connection):
+    """
+    The loop the worker process runs. Each tick number sent down the pipe is found and sent back, None stops it.
+
+    :param names: The names of the shared blocks.
+    :param capacities: The capacities of the shared arrays.
+    :param connection: The worker's end of the pipe.
+    """
+    shared = SharedArrays(capacities, names)
+    try:
+        while True:
+            tick = connection.recv()
+            if tick is None:
+                break
+            state, due, reaches = shared.read()
+            shared.write_results(*ai.find_decisions(state, (np.flatnonzero(due),), reaches))
+            connection.send(tick)
+    finally:
+        shared.close()
+
+
+class AIWorker:
+    """
+    Runs the enemies' rules and fire decisions in another process, one tick late. If it fails the handler finds them
+    in-process, and why is kept in failure.
+    """
+
+    def __init__(self, enemies: int = WORKER_ENEMIES, neighbours: int = WORKER_NEIGHBOURS,
+                 influences: int = WORKER_INFLUENCES, timeout: float = WORKER_TIMEOUT, verify: bool = WORKER_VERIFY):
+        # The capacities of the shared arrays, and how long to wait for results.
+        self.capacities = {'enemies': enemies, 'neighbours': neighbours, 'influences': influences}
+        self.timeout = timeout
+
+        # The shared arrays, the worker process and the main thread's end of the pipe.
+        self.shared = None
+        self.process = None
+        self.connection = None
+
+        # The serials of the enemies in the tick the worker is finding, and whether it has been sent.
+        self.submitted = []
+        self.waiting = False
+        self.tick = 0
+
+        # Whether results are checked, what the handler found itself, and the ticks checked and that differed.
+        self.verify = verify
+        self.submitted_expected = None
+        self.checks = 0
+        self.mismatches = 0
+
+        # The number of ticks the handler had to find itself as they did not fit, and why the worker stopped if it did.
+        self.fallbacks = 0
+        self.failure = None
+
+        self.start()
+
+    @property
+    def active(self):
+        # Whether the worker process is running.
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        # Make the shared arrays and start the worker. If either fails the handler carries on in-process.
+        try:
+            self.shared = SharedArrays(self.capacities)
+            self.connection, worker_connection = multiprocessing.Pipe()
+            self.process = multiprocessing.Process(target=worker_main,
+                                                   args=(self.shared.names, self.capacities, worker_connection),
+                                                   daemon=True)
+            self.process.start()
+        except (OSError, ValueError) as error:
+            self.failure = f"Failed To Start: {error}"
+            self.close()
+
+    def exchange(self, serials, state: ai.FlockState, due, reaches, expected=None):
+        """
+        Take the results of the last tick, then hand this tick to the worker.
+
+        :param serials: The spawn serial of each enemy in the state.
+        :param state: The FlockState of the enemies.
+        :param due: Which enemies find new effects for rules two to five.
+        :param reaches: How far past each enemy an ally blocks its shot.
+        :param expected: What the handler found itself for this tick, for the check.
+        :return: A dictionary of the effects, the mask of delayed effects found and whether the shot is blocked, by
+        the serial of each enemy in the last tick.
+        """
+        results = self.collect()
+        if not self.active:
+            return results
+        if not self.shared.fits(state):
+            self.fallbacks += 1
+            return results
+
+        self.shared.publish(state, due, reaches)
+        self.submitted_expected = expected
+        self.submitted = list(serials)
+        self.connection.send(self.tick)
+        self.tick += 1
+        self.waiting = True
+        return results
+
+    def collect(self):
+        """
+        Wait for the results of the tick the worker is finding.
+
+        :return: The results by enemy serial, empty if there were none.
+        """
+        if not self.waiting:
+            return {}
+        self.waiting = False
+
+        if not self.connection.poll(self.timeout):
+            self.failure = "Stopped Responding"
+            self.close()
+            return {}
+        self.connection.recv()
+
+        effects, found, blocked = self.shared.read_results(len(self.submitted))
+        if self.verify and self.submitted_expected is not None:
+            self.check(effects, found, blocked)
+        return {serial: (effects[row], found[row], blocked[row]) for row, serial in enumerate(self.submitted)}
+
+    def check(self, effects, found, blocked):
+        """
+        Count the worker's results if they differ from what the handler found itself for the same tick.
+
+        :param effects: The worker's effects.
+        :param found: The worker's mask of delayed effects found.
+        :param blocked: The worker's fire decisions.
+        """
+        self.checks += 1
+        if not all(np.array_equal(result, result_expected)
+                   for result, result_expected in zip((effects, found, blocked), self.submitted_expected)):
+            self.mismatches += 1
+
+    def close(self):
+        # Stop the worker and free the shared arrays.
+        if self.process is not None:
+            if self.process.is_alive():
+                try:
+                    self.connection.send(None)
+                except (OSError, ValueError):
+                    pass
+                self.process.join(1)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
+        self.waiting = False
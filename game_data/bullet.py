@@ -1,65 +1,426 @@
 import math
-import time
+from array import array
+from dataclasses import dataclass
 
 import arcade
+import arcade.gl as gl
+import numpy as np
 
+import game_data.clock as clock
+import game_data.collision as collision
 
-class Bullet(arcade.Sprite):
+# The number of bullets the system has room for at the start, it doubles whenever it is full.
+INITIAL_CAPACITY = 512
 
-    def __init__(self, pos, angle, velocity, bullet_type: dict, texture: str = None):
-        super().__init__()
-        # parent variables
-        if texture is not None:
-            texture_location = texture
-        else:
-            texture_location = bullet_type['texture']
-        self.texture = arcade.load_texture(texture_location)
-        self.scale = bullet_type['scale']
-        self.spawn_away = 0
-        self.hit_box = bullet_type['hit_box']
+# The corners of the quad each bullet is drawn on, around its center, and the texture coordinate of each corner.
+QUAD = (-0.5, -0.5, 0.0, 0.0,
+        0.5, -0.5, 1.0, 0.0,
+        -0.5, 0.5, 0.0, 1.0,
+        0.5, 0.5, 1.0, 1.0)
 
-        self.pause_delay = 0
 
-        # variables for bullets
-        self.gravity_acceleration = [0.0, 0.0]
-        self.gravity_mod = 0
-        self.velocity = [0.0, 0.0]
-        self.speed = bullet_type['speed']
-        self.life = 0
-        self.max_age = bullet_type['age']
-        self.spawn(pos, angle, velocity)
-        self.damage = bullet_type['damage']
-        self.weight = 1
+@dataclass(frozen=True)
+class BulletType:
+    """
+    Everything bullets of the same type share, found once from the type's data in bullet_types.json.
+    """
+    texture: str
+    scale: float
+    hit_shape: collision.HitShape
+    collision_mask: int
 
-    def spawn(self, pos, angle, velocity):
+    @property
+    def radius(self):
+        # The radius of the bounding circle of the type's hit shape once scaled.
+        return self.hit_shape.radius * self.scale
+
+
+class Shot:
+    """
+    A handle on a single bullet in the bullet system, used by the collision checks as they would a sprite.
+    """
+    __slots__ = ('system', 'row')
+
+    def __init__(self, system, row):
+        self.system = system
+        self.row = row
+
+    def __eq__(self, other):
+        return isinstance(other, Shot) and other.system is self.system and other.row == self.row
+
+    def __hash__(self):
+        return hash((id(self.system), self.row))
+
+    @property
+    def center_x(self):
+        return float(self.system.positions[self.row, 0])
+
+    @property
+    def center_y(self):
+        return float(self.system.positions[self.row, 1])
+
+    @property
+    def angle(self):
+        return float(self.system.angles[self.row])
+
+    @property
+    def bullet_type(self):
+        return self.system.types[self.system.type_ids[self.row]]
+
+    @property
+    def scale(self):
+        return self.bullet_type.scale
+
+    @property
+    def hit_shape(self):
+        return self.bullet_type.hit_shape
+
+    @property
+    def collision_mask(self):
+        return int(self.system.masks[self.row])
+
+    @property
+    def damage(self):
+        return float(self.system.damages[self.row])
+
+    @property
+    def owner(self):
+        return self.system.owners[self.row]
+
+    @property
+    def swept(self):
+        # Whether the bullet is fast enough to be checked along the segment it moved.
+        return bool(self.system.swept[self.row])
+
+    @property
+    def previous_position(self):
+        # The position of the bullet before the last step.
+        return tuple(self.system.previous_positions[self.row].tolist())
+
+    def kill(self):
+        self.system.kill(self.row)
+
+
+class BulletSystem:
+    """
+    Holds every bullet as a row of the arrays. They are moved and aged in one step, and drawn once for each type.
+    """
+
+    def __init__(self, window=None, capacity: int = INITIAL_CAPACITY):
+        # The window, for drawing.
+        self.window = window
+
+        # The arrays of every bullet. Each row is a bullet.
+        self.positions = np.zeros((capacity, 2))
+        self.previous_positions = np.zeros((capacity, 2))
+        self.velocities = np.zeros((capacity, 2))
+        self.angles = np.zeros(capacity)
+        self.ages = np.zeros(capacity)
+        self.max_ages = np.zeros(capacity)
+        self.damages = np.zeros(capacity)
+        self.type_ids = np.zeros(capacity, dtype=int)
+        self.masks = np.zeros(capacity, dtype=np.int64)
+        self.owner_ids = np.zeros(capacity, dtype=np.int64)
+        self.swept = np.zeros(capacity, dtype=bool)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+        # The sprite that fired the bullet in each row, and the rows that are free.
+        self.owners = np.full(capacity, None, dtype=object)
+        self.free_rows = list(range(capacity - 1, -1, -1))
+
+        # The types of bullet, the index of each by its key, and the radius of each.
+        self.types = []
+        self.type_index = {}
+        self.type_radii = np.zeros(0)
+
+        # The grid over the bullets, rebuilt once a step or after a bullet is fired, and whether it was built swept.
+        self.grid = collision.PointGrid()
+        self.grid_dirty = True
+        self.grid_swept = False
+
+        # The number of live bullets, and the most there have been at once.
+        self.count = 0
+        self.high_water = 0
+
+        # The program, quad, instance buffer, geometry and textures used to draw, made the first time they are needed.
+        self.program = None
+        self.quad = None
+        self.instances = None
+        self.geometry = None
+        self.textures = {}
+
+    @property
+    def capacity(self):
+        return len(self.positions)
+
+    def grow(self):
         """
-        Taking many variables from the parent spawn the bullet and give it velocity
+        Double the size of every array.
         """
+        old_capacity = self.capacity
+        new_capacity = old_capacity * 2
+
+        def _resize(values):
+            new_values = np.zeros((new_capacity,) + values.shape[1:], dtype=values.dtype)
+            new_values[:old_capacity] = values
+            return new_values
+
+        self.positions = _resize(self.positions)
+        self.previous_positions = _resize(self.previous_positions)
+        self.velocities = _resize(self.velocities)
+        self.angles = _resize(self.angles)
+        self.ages = _resize(self.ages)
+        self.max_ages = _resize(self.max_ages)
+        self.damages = _resize(self.damages)
+        self.type_ids = _resize(self.type_ids)
+        self.masks = _resize(self.masks)
+        self.owner_ids = _resize(self.owner_ids)
+        self.swept = _resize(self.swept)
+        self.alive = _resize(self.alive)
+
+        self.owners = np.concatenate((self.owners, np.full(new_capacity - old_capacity, None, dtype=object)))
+        self.free_rows = list(range(new_capacity - 1, old_capacity - 1, -1)) + self.free_rows
+
+        # The instance buffer is made again at the new size when next drawn.
+        self.instances = None
+        self.geometry = None
+
+    def get_type(self, bullet_type: dict, texture: str = None):
+        """
+        Find the index of a type of bullet, adding it the first time it is fired.
+
+        :param bullet_type: The type's data from bullet_types.json.
+        :param texture: The texture to use rather than the type's own.
+        :return: The index of the type.
+        """
+        if texture is None:
+            texture = bullet_type['texture']
+        hit_box = tuple((float(x), float(y)) for x, y in bullet_type['hit_box'])
+        mask = bullet_type.get('collision_mask', collision.DEFAULT_BULLET_MASK)
+        key = (texture, bullet_type['scale'], hit_box, tuple(mask))
+
+        type_id = self.type_index.get(key)
+        if type_id is None:
+            type_id = len(self.types)
+            self.types.append(BulletType(texture=texture, scale=bullet_type['scale'],
+                                         hit_shape=collision.get_hit_shape(hit_box),
+                                         collision_mask=collision.parse_mask(mask)))
+            self.type_index[key] = type_id
+            self.type_radii = np.append(self.type_radii, self.types[type_id].radius)
+        return type_id
+
+    def fire(self, pos, angle, velocity, bullet_type: dict, owner=None, texture: str = None):
+        """
+        Fire a bullet at its type's speed in the direction of the angle, plus the shooter's velocity.
+
+        :param pos: The x and y position.
+        :param angle: The angle in degrees.
+        :param velocity: The velocity of the shooter.
+        :param bullet_type: The type's data from bullet_types.json.
+        :param owner: The sprite firing the bullet.
+        :param texture: The texture to use rather than the type's own.
+        :return: The row of the bullet.
+        """
+        type_id = self.get_type(bullet_type, texture)
+
+        if not self.free_rows:
+            self.grow()
+        row = self.free_rows.pop()
+
         angle_rad = math.radians(angle)
+        self.positions[row] = pos[0], pos[1]
+        self.previous_positions[row] = self.positions[row]
+        self.velocities[row] = (velocity[0] + math.cos(angle_rad) * bullet_type['speed'],
+                                velocity[1] + math.sin(angle_rad) * bullet_type['speed'])
+        self.angles[row] = angle
+        self.ages[row] = 0
+        self.max_ages[row] = bullet_type['age']
+        self.damages[row] = bullet_type['damage']
+        self.type_ids[row] = type_id
+        self.masks[row] = self.types[type_id].collision_mask
+        self.owner_ids[row] = id(owner)
+        self.owners[row] = owner
+
+        # A bullet that moves further in a step than it and the smallest ship reach could pass through the ship, so it
+        # is checked along the segment it moved.
+        step_distance = math.hypot(*self.velocities[row].tolist()) * clock.SIMULATION_STEP
+        self.swept[row] = step_distance > self.type_radii[type_id] + collision.SMALLEST_HIT_RADIUS
+        self.alive[row] = True
+        self.grid_dirty = True
+
+        self.count += 1
+        if self.count > self.high_water:
+            self.high_water = self.count
+        return row
 
-        self.center_x = pos[0] + math.cos(angle_rad) * self.spawn_away
-        self.center_y = pos[1] + math.sin(angle_rad) * self.spawn_away
+    def kill(self, row):
+        # Free the row of a bullet. Rows that are already free are ignored.
+        if not self.alive[row]:
+            return
+        self.alive[row] = False
+        self.owners[row] = None
+        self.free_rows.append(row)
+        self.count -= 1
 
-        self.velocity[0] = velocity[0] + (math.cos(angle_rad) * self.speed)
-        self.velocity[1] = velocity[1] + (math.sin(angle_rad) * self.speed)
+    def kill_rows(self, rows):
+        # Free many rows at once. Rows that are already free are ignored.
+        rows = np.unique(rows)
+        rows = rows[self.alive[rows]]
+        self.alive[rows] = False
+        self.owners[rows] = None
+        self.free_rows.extend(rows.tolist())
+        self.count -= len(rows)
 
-        self.angle = angle
+    def kill_owner(self, owner):
+        # Kill every bullet fired by a sprite.
+        self.kill_rows(np.flatnonzero(self.alive & (self.owner_ids == id(owner))))
 
-        self.life = time.time() + self.max_age
+    def live_rows(self):
+        # The row of every live bullet.
+        return np.flatnonzero(self.alive)
 
-    def on_update(self, delta_time: float = 1 / 60):
+    def step(self, delta_time: float):
         """
-        Update the bullet and kill it if it's to old.
+        Move and age every bullet at once, then kill those that are too old.
+
+        :param delta_time: The length of the step.
         """
+        alive = self.alive
+        self.previous_positions[alive] = self.positions[alive]
+        self.positions[alive] += self.velocities[alive] * delta_time
+        self.ages[alive] += delta_time
+        self.grid_dirty = True
 
-        self.velocity[0] += self.gravity_acceleration[0] * self.gravity_mod
-        self.velocity[1] += self.gravity_acceleration[1] * self.gravity_mod
+        self.kill_rows(np.flatnonzero(alive & (self.ages > self.max_ages)))
 
-        self.center_x += self.velocity[0] * delta_time
-        self.center_y += self.velocity[1] * delta_time
-        if time.time() - self.pause_delay > self.life:
-            self.kill()
+    def build_grid(self, swept: bool = False):
+        """
+        Sort the live bullets into the grid, each swept bullet at the middle of the segment it moved.
 
-    def kill(self):
-        self.remove_from_sprite_lists()
-        del self
+        :param swept: Whether every bullet is swept, not only the fast ones.
+        """
+        rows = self.live_rows()
+        moves = (self.positions[rows] - self.previous_positions[rows]) * (self.swept[rows] | swept)[:, np.newaxis]
+        points = self.positions[rows] - moves / 2
+        radii = self.type_radii[self.type_ids[rows]] + np.hypot(moves[:, 0], moves[:, 1]) / 2
+        self.grid.build(points, rows, float(radii.max()) if len(rows) else 0.0)
+        self.grid_dirty = False
+        self.grid_swept = swept
+
+    def layers(self):
+        # Every layer any live bullet can hit.
+        if not self.count:
+            return 0
+        return int(np.bitwise_or.reduce(self.masks[self.alive]))
+
+    def near(self, x, y, radius, swept: bool = False):
+        """
+        Find every live bullet whose bounding circle, or swept segment, touches a circle.
+
+        :param x: The x position of the circle.
+        :param y: The y position of the circle.
+        :param radius: The radius of the circle.
+        :param swept: Whether every bullet is swept, not only the fast ones.
+        :return: The rows of the bullets.
+        """
+        if self.grid_dirty or self.grid_swept != swept:
+            self.build_grid(swept)
+
+        # Only the bullets in the cells around the circle are checked, and only those still alive.
+        rows = self.grid.query_radius(x, y, radius)
+        rows = rows[self.alive[rows]]
+        if not len(rows):
+            return rows
+
+        # The point on each swept bullet's segment closest to the center of the circle.
+        center = np.array((x, y))
+        ends = self.positions[rows] - center
+        moves = (self.positions[rows] - self.previous_positions[rows]) * (self.swept[rows] | swept)[:, np.newaxis]
+        starts = ends - moves
+        lengths = np.einsum('ij,ij->i', moves, moves)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            along = np.clip(-np.einsum('ij,ij->i', starts, moves) / lengths, 0.0, 1.0)
+        along = np.where(lengths > 0, along, 1.0)
+        ends = starts + moves * along[:, np.newaxis]
+
+        reaches = radius + self.type_radii[self.type_ids[rows]]
+        return rows[np.einsum('ij,ij->i', ends, ends) <= reaches ** 2]
+
+    def can_hit_rows(self, rows, sprite):
+        """
+        Keep the bullets whose masks let them hit a sprite. A sprite is never hit by its own bullets.
+
+        :param rows: The rows of the bullets.
+        :param sprite: The sprite.
+        :return: The rows that can hit it.
+        """
+        masks = self.masks[rows]
+        hits = ((masks & sprite.collision_layer) != 0) & (self.owner_ids[rows] != id(sprite))
+        targeted = ~hits & ((masks & collision.LAYER_TARGET) != 0)
+        for index in np.flatnonzero(targeted).tolist():
+            hits[index] = getattr(self.owners[rows[index]], 'target', None) is sprite
+        return rows[hits]
+
+    def shot(self, row):
+        # A handle on the bullet in a row.
+        return Shot(self, row)
+
+    def reset(self):
+        # Kill every bullet, used when a mission restarts.
+        self.kill_rows(self.live_rows())
+
+    def load_graphics(self):
+        # Make the program, quad and geometry used to draw, with room for every row.
+        ctx = self.window.ctx
+        if self.program is None:
+            self.program = ctx.load_program(vertex_shader="game_data/glsl/vertex_shader_bullet.glsl",
+                                            fragment_shader="game_data/glsl/fragment_shader_bullet.glsl")
+            self.quad = ctx.buffer(data=array('f', QUAD))
+
+        self.instances = ctx.buffer(reserve=self.capacity * 3 * 4)
+        self.geometry = ctx.geometry([gl.BufferDescription(self.quad, '2f 2f', ['in_vert', 'in_uv']),
+                                      gl.BufferDescription(self.instances, '2f 1f', ['in_pos', 'in_angle'],
+                                                           instanced=True)],
+                                     mode=ctx.TRIANGLE_STRIP)
+
+    def get_texture(self, bullet_type: BulletType):
+        # Load a type's texture the first time it is drawn.
+        texture = self.textures.get(bullet_type.texture)
+        if texture is None:
+            texture = self.window.ctx.load_texture(bullet_type.texture)
+            self.textures[bullet_type.texture] = texture
+        return texture
+
+    def draw(self, alpha: float = 1.0):
+        """
+        Draw every bullet between the last two steps, with one instanced draw for each type.
+
+        :param alpha: How far between the last two steps.
+        """
+        rows = self.live_rows()
+        if not len(rows) or self.window is None:
+            return
+        if self.geometry is None:
+            self.load_graphics()
+
+        # The shader places the bullets in the viewport itself.
+        left, right, bottom, top = arcade.get_viewport()
+        self.program['view'] = left, bottom, right - left, top - bottom
+        self.program['texture0'] = 0
+
+        previous = self.previous_positions[rows]
+        positions = previous + (self.positions[rows] - previous) * alpha
+        instances = np.column_stack((positions, self.angles[rows])).astype('f4')
+        type_ids = self.type_ids[rows]
+
+        for type_id, bullet_type in enumerate(self.types):
+            chosen = type_ids == type_id
+            count = int(np.count_nonzero(chosen))
+            if not count:
+                continue
+
+            texture = self.get_texture(bullet_type)
+            texture.use(0)
+            self.program['size'] = texture.width * bullet_type.scale, texture.height * bullet_type.scale
+            self.instances.write(instances[chosen].tobytes())
+            self.geometry.render(self.program, instances=count)
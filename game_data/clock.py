@@ -0,0 +1,126 @@
+# The length of a single simulation step, and the most steps the simulation can run in a single frame.
+SIMULATION_STEP = 1 / 60
+MAX_SUBSTEPS = 4
+
+#   -- Simulation Clock --
+#
+# GameClock - Runs the simulation at a fixed step no matter the frame rate.
+#
+# RenderInterpolator - Draws the moving sprites between the last two simulation steps.
+
+
+class GameClock:
+    """
+    Runs the game at a fixed step, as many steps each frame as fit in the frame time, up to a maximum.
+    """
+
+    def __init__(self, step: float = SIMULATION_STEP, max_substeps: int = MAX_SUBSTEPS):
+        # The length of each step and the maximum steps per frame.
+        self.step = step
+        self.max_substeps = max_substeps
+
+        # The frame time that has not been simulated yet.
+        self.accumulator = 0
+
+        # The total simulated time and the number of steps run.
+        self.time = 0
+        self.ticks = 0
+
+        # The number of steps that were dropped last frame.
+        self.dropped = 0
+
+    @property
+    def alpha(self):
+        # How far between the last step and the next step the frame is. Used for drawing.
+        return self.accumulator / self.step
+
+    def advance(self, delta_time: float):
+        """
+        Add the frame time to the accumulator and find the number of steps to run this frame.
+
+        :param delta_time: The frame time.
+        :return: The number of steps to run.
+        """
+        self.accumulator += delta_time
+        steps = int(self.accumulator // self.step)
+
+        # If there are too many steps drop the extra ones.
+        if steps > self.max_substeps:
+            self.dropped = steps - self.max_substeps
+            steps = self.max_substeps
+        else:
+            self.dropped = 0
+
+        self.accumulator -= (steps + self.dropped) * self.step
+        return steps
+
+    def tick(self):
+        # Record that a step was run.
+        self.time += self.step
+        self.ticks += 1
+
+    def reset(self):
+        # Forget any time not yet simulated. The total time keeps counting.
+        self.accumulator = 0
+        self.dropped = 0
+
+
+class RenderInterpolator:
+    """
+    Draws the moving sprites between where they were at the start of the last step and where they are now.
+    """
+
+    def __init__(self):
+        # The position of each sprite at the start of the latest step.
+        self.previous = {}
+
+        # The simulated positions of the sprites while they are drawn at their interpolated positions.
+        self.stored = []
+
+    def capture(self, sprites):
+        """
+        Remember the position of every sprite before a step is run.
+
+        :param sprites: Every sprite that moves.
+        """
+        self.previous = {sprite: (sprite.center_x, sprite.center_y) for sprite in sprites}
+
+    def position(self, sprite, alpha: float):
+        """
+        Find the interpolated position of a single sprite without moving it.
+
+        :param sprite: The sprite.
+        :param alpha: How far between the last two steps to interpolate.
+        :return: The x and y position.
+        """
+        if sprite not in self.previous:
+            return sprite.center_x, sprite.center_y
+
+        previous_x, previous_y = self.previous[sprite]
+        return (previous_x + (sprite.center_x - previous_x) * alpha,
+                previous_y + (sprite.center_y - previous_y) * alpha)
+
+    def apply(self, alpha: float):
+        """
+        Move every remembered sprite to its interpolated position for drawing.
+
+        :param alpha: How far between the last two steps to interpolate.
+        """
+        self.stored = []
+        for sprite, (previous_x, previous_y) in self.previous.items():
+            current_x, current_y = sprite.center_x, sprite.center_y
+            self.stored.append((sprite, current_x, current_y))
+            sprite.center_x = previous_x + (current_x - previous_x) * alpha
+            sprite.center_y = previous_y + (current_y - previous_y) * alpha
+
+    def restore(self):
+        # Move every sprite back to its simulated position after drawing.
+        for sprite, current_x, current_y in self.stored:
+            sprite.center_x = current_x
+            sprite.center_y = current_y
+        self.stored = []
+
+    def reset(self):
+        # Forget every position, used when sprites are teleported.
+        self.previous = {}
+        self.stored = []
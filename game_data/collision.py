@@ -0,0 +1,508 @@
+import math
+from dataclasses import dataclass
+
+import arcade
+import numpy as np
+
+# The width and height of each cell in the bullet grid. Larger than any bullet and most ships so each ship only looks
+# in a few cells.
+CELL_SIZE = 128
+
+# The cell size of the enemy neighbour index, the distance enemies avoid each other at.
+NEIGHBOUR_CELL_SIZE = 250
+
+# The number of angles the rotated hit boxes are cached at. The angle used is at most half a bucket from the true
+# angle, which is a fraction of a pixel at the size of the ships.
+ANGLE_BUCKETS = 720
+BUCKET_ANGLE = 360 / ANGLE_BUCKETS
+
+# The cached hit shapes, keyed by their points.
+HIT_SHAPES = {}
+
+# Whether every bullet checks the whole segment it moved in the last step, rather than only where it ended. Bullets
+# that move further in a step than their radius and the smallest hit radius are always checked swept. Every type fires
+# at 210 to 550 pixels a second, which is safe alone, so only bullets from a fast moving shooter are swept.
+SWEPT_COLLISIONS = False
+
+# The smallest hit radius of a ship a bullet can hit, half the width of the player's ship.
+SMALLEST_HIT_RADIUS = 16
+
+# The collision layers. Every sprite that can be hit is on one layer, and each bullet has a mask of the layers it hits.
+# The target layer is special, a bullet with it hits whatever its shooter is currently targeting. The bullet system's
+# can_hit_rows is the one place the masks are checked.
+LAYER_PLAYER = 1 << 0
+LAYER_ENEMY = 1 << 1
+LAYER_BOSS = 1 << 2
+LAYER_STATION = 1 << 3
+LAYER_SATELLITE = 1 << 4
+LAYER_PLANET = 1 << 5
+LAYER_TARGET = 1 << 6
+
+# The names of the layers used in bullet_types.json.
+LAYER_NAMES = {
+    "player": LAYER_PLAYER,
+    "enemy": LAYER_ENEMY,
+    "boss": LAYER_BOSS,
+    "station": LAYER_STATION,
+    "satellite": LAYER_SATELLITE,
+    "planet": LAYER_PLANET,
+    "target": LAYER_TARGET
+}
+
+# The mask of any bullet type that does not give one. Allies and the shooter's target.
+DEFAULT_BULLET_MASK = ("enemy", "boss", "target")
+
+#   -- Collision --
+#
+# SpatialHash - A uniform grid used to find the sprites near a point, such as the neighbours of an enemy.
+#
+# PointGrid - A uniform grid over an array of points, such as the bullets, rebuilt once a step.
+#
+# HitEvent - A bullet hitting a sprite, made by the collision pass and resolved after it.
+#
+# HitShape - A hit box with a bounding circle, a convex hull and the exact polygon, cached at every rotation.
+
+
+def parse_mask(names):
+    """
+    Turn a list of layer names into a mask.
+
+    :param names: The names of the layers, from LAYER_NAMES.
+    :return: The mask with a bit set for each layer.
+    """
+    mask = 0
+    for name in names:
+        if name not in LAYER_NAMES:
+            raise ValueError(f"Unknown Collision Layer: {name}")
+        mask |= LAYER_NAMES[name]
+    return mask
+
+
+class SpatialHash:
+    """
+    A uniform grid over the whole of space. Each item is placed in every cell its bounding box covers, then anything
+    that wants to know what is near it only looks at the cells it covers rather than at every item.
+
+    Only the cells holding items exist, so the grid has no bounds.
+    """
+
+    def __init__(self, cell_size: float = CELL_SIZE):
+        self.cell_size = cell_size
+
+        # The items in each cell, and the cells of each item so it can be removed.
+        self.cells = {}
+        self.item_cells = {}
+
+    def __len__(self):
+        return len(self.item_cells)
+
+    def __contains__(self, item):
+        return item in self.item_cells
+
+    def clear(self):
+        # Remove every item.
+        self.cells = {}
+        self.item_cells = {}
+
+    def cell_range(self, left, bottom, right, top):
+        # The first and last cell on each axis covered by a box.
+        size = self.cell_size
+        return int(left // size), int(bottom // size), int(right // size), int(top // size)
+
+    def insert(self, item, left, bottom, right, top):
+        """
+        Add an item to every cell its bounding box covers.
+
+        :param item: The item to add.
+        :param left: The left of the box.
+        :param bottom: The bottom of the box.
+        :param right: The right of the box.
+        :param top: The top of the box.
+        """
+        if item in self.item_cells:
+            self.remove(item)
+
+        first_x, first_y, last_x, last_y = self.cell_range(left, bottom, right, top)
+        keys = []
+        for cell_x in range(first_x, last_x + 1):
+            for cell_y in range(first_y, last_y + 1):
+                key = (cell_x, cell_y)
+                cell = self.cells.get(key)
+                if cell is None:
+                    cell = self.cells[key] = []
+                cell.append(item)
+                keys.append(key)
+        self.item_cells[item] = keys
+
+    def remove(self, item):
+        # Take an item out of each of its cells. Items not in the hash are ignored.
+        keys = self.item_cells.pop(item, None)
+        if keys is None:
+            return
+
+        for key in keys:
+            cell = self.cells[key]
+            cell.remove(item)
+            if not cell:
+                del self.cells[key]
+
+    def insert_point(self, item, x, y):
+        # Add an item that is a single point, it is only ever in one cell.
+        self.insert(item, x, y, x, y)
+
+    def query(self, left, bottom, right, top):
+        """
+        Find every item in the cells a box covers. The items may not actually touch the box, only be near it.
+
+        :return: A list of the items, each only once.
+        """
+        first_x, first_y, last_x, last_y = self.cell_range(left, bottom, right, top)
+
+        # If the box covers more cells than hold items it is quicker to look at every item.
+        if (last_x - first_x + 1) * (last_y - first_y + 1) > len(self.cells):
+            return list(self.item_cells)
+
+        # Most boxes only cover a single cell, so there is nothing to remove twice.
+        if first_x == last_x and first_y == last_y:
+            return list(self.cells.get((first_x, first_y), ()))
+
+        found = {}
+        for cell_x in range(first_x, last_x + 1):
+            for cell_y in range(first_y, last_y + 1):
+                for item in self.cells.get((cell_x, cell_y), ()):
+                    found[item] = None
+        return list(found)
+
+    def query_radius(self, x, y, radius):
+        # Find every item in the cells a circle covers. The caller checks the true distance.
+        return self.query(x - radius, y - radius, x + radius, y + radius)
+
+
+def cell_keys(cells):
+    # A single number for each cell of an (n, 2) array of cells, so cells can be sorted and searched.
+    return cells[:, 0] * 2 ** 31 + (cells[:, 1] + 2 ** 30)
+
+
+def near_pairs(points, positions, radius):
+    """
+    Find every pair of a point and a position closer than a radius. The array version of the neighbour index, the
+    positions are sorted into cells the size of the radius and each point only looks in the nine cells around it,
+    rather than at every position.
+
+    :param points: The (n, 2) points.
+    :param positions: The (m, 2) positions.
+    :param radius: The distance.
+    :return: The row of the point and the row of the position of each pair.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+    if not len(points) or not len(positions):
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    # The positions sorted by cell, so every position in a cell is found with a binary search.
+    keys = cell_keys(np.floor(positions / radius).astype(np.int64))
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    point_cells = np.floor(points / radius).astype(np.int64)
+
+    point_rows = []
+    position_rows = []
+    for offset in ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+        query = cell_keys(point_cells + offset)
+        starts = np.searchsorted(sorted_keys, query, side='left')
+        counts = np.searchsorted(sorted_keys, query, side='right') - starts
+
+        # Every position in the cell, for each point.
+        rows = np.repeat(np.arange(len(points)), counts)
+        firsts = np.cumsum(counts) - counts
+        point_rows.append(rows)
+        position_rows.append(order[starts[rows] + np.arange(len(rows)) - firsts[rows]])
+
+    point_rows = np.concatenate(point_rows)
+    position_rows = np.concatenate(position_rows)
+    offsets = points[point_rows] - positions[position_rows]
+    close = np.einsum('ij,ij->i', offsets, offsets) < radius ** 2
+    return point_rows[close], position_rows[close]
+
+
+class PointGrid:
+    """
+    A uniform grid over an array of points, rebuilt all at once. The rows are sorted by the cell of their point, so
+    every row in a column of cells is one slice found with two binary searches.
+    """
+
+    def __init__(self, cell_size: float = CELL_SIZE):
+        self.cell_size = cell_size
+
+        # The rows sorted by cell, the key of each one's cell, and how far past its point any row reaches.
+        self.rows = np.zeros(0, dtype=int)
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.padding = 0.0
+
+    def build(self, points, rows, padding: float = 0.0):
+        """
+        Sort the rows into the cells of their points.
+
+        :param points: The (n, 2) point of each row.
+        :param rows: The rows.
+        :param padding: How far past its point any row can reach.
+        """
+        keys = cell_keys(np.floor(points / self.cell_size).astype(np.int64))
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.rows = rows[order]
+        self.padding = padding
+
+    def query_radius(self, x, y, radius):
+        # Find every row in the cells a circle covers, padded by how far the rows reach. The caller checks the true
+        # distance.
+        reach = radius + self.padding
+        size = self.cell_size
+        columns = np.arange(int((x - reach) // size), int((x + reach) // size) + 1, dtype=np.int64)
+        bottoms = np.full(len(columns), int((y - reach) // size), dtype=np.int64)
+        tops = np.full(len(columns), int((y + reach) // size), dtype=np.int64)
+        starts = np.searchsorted(self.keys, cell_keys(np.column_stack((columns, bottoms))), side='left')
+        ends = np.searchsorted(self.keys, cell_keys(np.column_stack((columns, tops))), side='right')
+        if len(columns) == 1:
+            return self.rows[starts[0]:ends[0]]
+        return np.concatenate([self.rows[start:end] for start, end in zip(starts.tolist(), ends.tolist())])
+
+
+@dataclass
+class HitEvent:
+    """
+    A single bullet hitting a single sprite, found by the collision pass and applied later by the resolution step.
+    Keeping the two apart means a tick's hits can be counted, logged or resolved again. The owner is kept as the
+    bullet's row forgets it once the bullet is killed.
+    """
+    bullet: object
+    victim: object
+    damage: float
+    owner: object = None
+
+
+def convex_hull(points):
+    """
+    Find the convex hull of a set of points with the monotone chain algorithm.
+
+    :return: The points of the hull in anti-clockwise order.
+    """
+    points = sorted(set((float(x), float(y)) for x, y in points))
+    if len(points) <= 2:
+        return points
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower = []
+    for point in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], point) <= 0:
+            lower.pop()
+        lower.append(point)
+
+    upper = []
+    for point in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], point) <= 0:
+            upper.pop()
+        upper.append(point)
+
+    return lower[:-1] + upper[:-1]
+
+
+class HitShape:
+    """
+    A hit box prepared for fast checks. A check runs through three levels, stopping as soon as one gives an answer:
+        The bounding circle, if the circles do not touch there is no hit.
+        The convex hull, if the hulls are separated there is no hit. If both hit boxes are convex this is a hit.
+        The exact polygon, only reached when the hulls touch.
+
+    The hull and polygon are rotated and scaled once per angle bucket and kept, rather than every check.
+    """
+
+    def __init__(self, points):
+        # The points of the polygon and its hull, around the center of the sprite before scaling.
+        self.points = np.array(points, dtype=float)
+        self.hull = np.array(convex_hull(points), dtype=float)
+
+        # If the polygon is convex the hull is exact.
+        self.convex = len(self.hull) == len(set(tuple(point) for point in self.points.tolist()))
+
+        # The radius of the bounding circle before scaling.
+        self.radius = float(np.sqrt((self.points ** 2).sum(axis=1)).max())
+
+        # The rotated and scaled hull and polygon, keyed by angle bucket and scale.
+        self.rotations = {}
+
+    def transformed(self, angle, scale):
+        """
+        Find the hull and polygon rotated to the nearest angle bucket and scaled, still around the sprite's center.
+
+        :param angle: The sprite's angle in degrees.
+        :param scale: The sprite's scale.
+        :return: The hull and the polygon as arrays of points.
+        """
+        bucket = int(round(angle / BUCKET_ANGLE)) % ANGLE_BUCKETS
+        key = (bucket, scale)
+        rotation = self.rotations.get(key)
+        if rotation is None:
+            rad_angle = math.radians(bucket * BUCKET_ANGLE)
+            cos_angle = math.cos(rad_angle) * scale
+            sin_angle = math.sin(rad_angle) * scale
+            matrix = np.array(((cos_angle, sin_angle), (-sin_angle, cos_angle)))
+            rotation = (self.hull @ matrix, self.points @ matrix)
+            self.rotations[key] = rotation
+        return rotation
+
+
+def get_hit_shape(points):
+    """
+    Find the hit shape of a hit box, creating it if it has not been made yet. Every sprite with the same hit box shares
+    a single shape and its cached rotations.
+    """
+    key = tuple((float(x), float(y)) for x, y in points)
+    shape = HIT_SHAPES.get(key)
+    if shape is None:
+        shape = HitShape(key)
+        HIT_SHAPES[key] = shape
+    return shape
+
+
+def sprite_hit_shape(sprite):
+    """
+    Find the hit shape of a sprite. Sprites without their own, such as planets and stations, use one made from their
+    arcade hit box.
+    """
+    shape = getattr(sprite, 'hit_shape', None)
+    if shape is None and hasattr(sprite, 'get_hit_box'):
+        shape = get_hit_shape(sprite.get_hit_box())
+    return shape
+
+
+def hulls_separated(hull_1, hull_2):
+    # The separating axis test. Two convex shapes are apart if they do not overlap when projected onto some edge normal.
+    for hull in (hull_1, hull_2):
+        edges = np.roll(hull, -1, axis=0) - hull
+        normals = np.stack((-edges[:, 1], edges[:, 0]), axis=1)
+        projection_1 = hull_1 @ normals.T
+        projection_2 = hull_2 @ normals.T
+        if np.any((projection_1.max(axis=0) < projection_2.min(axis=0))
+                  | (projection_2.max(axis=0) < projection_1.min(axis=0))):
+            return True
+    return False
+
+
+def point_in_polygon(point, polygon):
+    # Whether a point is inside a polygon, by counting the edges a ray to the right crosses.
+    x, y = point
+    start = polygon
+    end = np.roll(polygon, -1, axis=0)
+    straddles = (start[:, 1] > y) != (end[:, 1] > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crossing_x = start[:, 0] + (y - start[:, 1]) * (end[:, 0] - start[:, 0]) / (end[:, 1] - start[:, 1])
+    return bool(np.count_nonzero(straddles & (x < crossing_x)) % 2)
+
+
+def polygons_overlap(polygon_1, polygon_2):
+    """
+    Whether two polygons of any shape overlap. They do if any of their edges cross, or if one is completely inside
+    the other.
+    """
+    start_1 = polygon_1[:, np.newaxis, :]
+    edge_1 = (np.roll(polygon_1, -1, axis=0) - polygon_1)[:, np.newaxis, :]
+    start_2 = polygon_2[np.newaxis, :, :]
+    edge_2 = (np.roll(polygon_2, -1, axis=0) - polygon_2)[np.newaxis, :, :]
+
+    # Every edge of the first polygon against every edge of the second.
+    between = start_2 - start_1
+    denominator = edge_1[..., 0] * edge_2[..., 1] - edge_1[..., 1] * edge_2[..., 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (between[..., 0] * edge_2[..., 1] - between[..., 1] * edge_2[..., 0]) / denominator
+        u = (between[..., 0] * edge_1[..., 1] - between[..., 1] * edge_1[..., 0]) / denominator
+    if np.any((denominator != 0) & (0 <= t) & (t <= 1) & (0 <= u) & (u <= 1)):
+        return True
+
+    return point_in_polygon(polygon_1[0], polygon_2) or point_in_polygon(polygon_2[0], polygon_1)
+
+
+def check_hit(sprite_1, sprite_2):
+    """
+    Check if two sprites touch using their hit shapes. Either can be a bullet in the bullet system. Any sprite without a
+    hit shape uses one made from its arcade hit box, and if it has neither arcade's check is used instead.
+    """
+    shape_1 = sprite_hit_shape(sprite_1)
+    shape_2 = sprite_hit_shape(sprite_2)
+    if shape_1 is None or shape_2 is None:
+        return arcade.check_for_collision(sprite_1, sprite_2)
+
+    # The bounding circles.
+    d_x = sprite_2.center_x - sprite_1.center_x
+    d_y = sprite_2.center_y - sprite_1.center_y
+    reach = shape_1.radius * sprite_1.scale + shape_2.radius * sprite_2.scale
+    if d_x ** 2 + d_y ** 2 > reach ** 2:
+        return False
+
+    # The convex hulls, with the second sprite placed relative to the first.
+    hull_1, polygon_1 = shape_1.transformed(sprite_1.angle, sprite_1.scale)
+    hull_2, polygon_2 = shape_2.transformed(sprite_2.angle, sprite_2.scale)
+    offset = np.array((d_x, d_y))
+    if hulls_separated(hull_1, hull_2 + offset):
+        return False
+    if shape_1.convex and shape_2.convex:
+        return True
+
+    # The exact polygons.
+    return polygons_overlap(polygon_1, polygon_2 + offset)
+
+
+def segment_crosses_polygon(start, end, polygon):
+    # Whether a segment crosses any edge of a polygon, or starts inside it.
+    edge = np.asarray(end) - np.asarray(start)
+    starts = polygon
+    edges = np.roll(polygon, -1, axis=0) - polygon
+    between = starts - np.asarray(start)
+    denominator = edge[0] * edges[:, 1] - edge[1] * edges[:, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (between[:, 0] * edges[:, 1] - between[:, 1] * edges[:, 0]) / denominator
+        u = (between[:, 0] * edge[1] - between[:, 1] * edge[0]) / denominator
+    if np.any((denominator != 0) & (0 <= t) & (t <= 1) & (0 <= u) & (u <= 1)):
+        return True
+    return point_in_polygon(start, polygon)
+
+
+def check_swept_hit(sprite, shot, previous):
+    """
+    Check if a bullet passed through a sprite while moving from its previous position to where it is now. Uses the
+    same levels as check_hit, the bounding circle, then the hull, then the exact polygon.
+
+    :param sprite: The sprite that may have been hit.
+    :param shot: The bullet.
+    :param previous: The x and y position of the bullet before the last step.
+    :return: True if the segment touches the sprite.
+    """
+    shape = sprite_hit_shape(sprite)
+    if shape is None:
+        return False
+
+    # The segment relative to the center of the sprite.
+    start = (previous[0] - sprite.center_x, previous[1] - sprite.center_y)
+    end = (shot.center_x - sprite.center_x, shot.center_y - sprite.center_y)
+    d_x = end[0] - start[0]
+    d_y = end[1] - start[1]
+    length = d_x ** 2 + d_y ** 2
+    if not length:
+        return False
+
+    # The bounding circle, using the point on the segment closest to the center.
+    along = max(0.0, min(1.0, -(start[0] * d_x + start[1] * d_y) / length))
+    closest_x = start[0] + d_x * along
+    closest_y = start[1] + d_y * along
+    if closest_x ** 2 + closest_y ** 2 > (shape.radius * sprite.scale) ** 2:
+        return False
+
+    # The hull, then the exact polygon.
+    hull, polygon = shape.transformed(sprite.angle, sprite.scale)
+    if not segment_crosses_polygon(start, end, hull):
+        return False
+    if shape.convex:
+        return True
+    return segment_crosses_polygon(start, end, polygon)
@@ -1,22 +1,36 @@
+import itertools
 import math
 import random
 import time
+from dataclasses import dataclass
 import PIL
 
 import arcade
 
-import game_data.bullet as bullet
+import game_data.ai as ai
+import game_data.collision as collision
 import game_data.ui as ui
 import game_data.vector as vector
 
 # The screen width for spawning calculations and other algorithms.
 SCREEN_WIDTH, SCREEN_HEIGHT = arcade.get_display_size()
 
+# The longest time in seconds between checks of whether the player is close enough to a cluster to spawn it.
+CLUSTER_CHECK_INTERVAL = 1.0
+
+# Hands every enemy a new serial each time it is set up, so an enemy taken from a pool is never mistaken for its last
+# life.
+SPAWN_SERIALS = itertools.count()
+
 
 class Cluster:
     """
     A Cluster is an object spawned by the enemy handler and acts as a way to separate the total number of enemies in
     a wave into smaller manageable segments. These clusters slowly travel towards the mission target.
+
+    A cluster's path is found rather than stepped. It closes on its target at a constant speed along the line it
+    started on, riding along with the target as it orbits. So where it is at any time, and when it arrives, are each a
+    single sum. The enemy handler schedules when to check if it should spawn on the game clock.
     """
 
     def __init__(self, handler, target):
@@ -26,9 +40,6 @@ class Cluster:
         # The speed it moves towards the target.
         self.speed = random.randint(80, 100)
 
-        self.center_x = 0
-        self.center_y = 0
-
         # The enemy handler and the target.
         self.handler = handler
         if target != self.handler.planet_data:
@@ -36,6 +47,12 @@ class Cluster:
         else:
             self.target = None
 
+        # The position the cluster started from, relative to its target, and the game time it started.
+        self.start_x = 0
+        self.start_y = 0
+        self.start_time = 0
+        self.start_distance = 0
+
         # The bool which tells the handler and other objects that the cluster has spawned its enemies.
         self.spawned = False
 
@@ -49,29 +66,108 @@ class Cluster:
         self.distance = 0
         self.p_distance = 0
 
-    def spawn_enemies(self, delta_time):
-        # This method calls every update and checks to see if the Cluster needs to spawn its enemies.
+        # The enemies made ready before the cluster arrives, and the number spawned that the handler has not yet made.
+        self.prepared = []
+        self.pending = 0
 
-        # These are vector values for the player and the clusters position.
-        p_d = self.handler.player.center_x, self.handler.player.center_y
-        s_d = self.center_x, self.center_y
+    @property
+    def center_x(self):
+        # Where the cluster is now. It is moved with place.
+        return self.position_at(self.handler.game_window.clock.time)[0]
 
-        # If the target is not None it find the distance to the target rather than the player.
-        if self.target is not None:
-            t_d = self.target.center_x, self.target.center_y
-            angle = math.radians(vector.find_angle(t_d, s_d))
-            self.distance = vector.find_distance(t_d, s_d)
-            d_x = math.cos(angle) * self.speed * delta_time
-            d_y = math.sin(angle) * self.speed * delta_time
-            self.center_x += d_x
-            self.center_y += d_y
+    @property
+    def center_y(self):
+        return self.position_at(self.handler.game_window.clock.time)[1]
+
+    def target_at(self, t):
+        # Where the target is at a game time. Orbiting targets are found on their orbit, others stay where they are.
+        if self.target is None:
+            return None
+        if hasattr(self.target, 'position_at'):
+            return self.target.position_at(t)
+        return self.target.center_x, self.target.center_y
+
+    def place(self, x, y):
+        """
+        Start the cluster's approach from a position at the current game time.
+
+        :param x: The x position.
+        :param y: The y position.
+        """
+        self.start_time = self.handler.game_window.clock.time
+        target_pos = self.target_at(self.start_time)
+        if target_pos is None:
+            self.start_x, self.start_y = x, y
+            self.start_distance = 0
+        else:
+            self.start_x, self.start_y = x - target_pos[0], y - target_pos[1]
+            self.start_distance = math.sqrt(self.start_x ** 2 + self.start_y ** 2)
+
+    def distance_at(self, t):
+        # The distance to the target at a game time. It closes at the cluster's speed until it reaches the target.
+        return max(self.start_distance - self.speed * (t - self.start_time), 0)
+
+    def position_at(self, t):
+        """
+        Find where the cluster is at a game time.
+
+        :param t: The game time.
+        :return: The x and y position.
+        """
+        target_pos = self.target_at(t)
+        if target_pos is None:
+            return self.start_x, self.start_y
+
+        # The offset from the target shrinks along the line the cluster started on.
+        if self.start_distance:
+            remaining = self.distance_at(t) / self.start_distance
         else:
-            self.distance = vector.find_distance(p_d, s_d)
+            remaining = 0
+        return target_pos[0] + self.start_x * remaining, target_pos[1] + self.start_y * remaining
+
+    def arrival_time(self, distance: float = 0):
+        """
+        Find the game time the cluster comes within a distance of its target.
+
+        :param distance: How close to the target.
+        :return: The game time, or None if the cluster does not move.
+        """
+        if self.target is None:
+            return None
+        return self.start_time + max(self.start_distance - distance, 0) / self.speed
 
-        # Find the player distance
-        self.p_distance = vector.find_distance(p_d, s_d)
+    def spawn_enemies(self, t):
+        """
+        Check if the cluster should spawn its enemies at a game time, and spawn them if so.
+
+        :param t: The game time.
+        :return: The game time to check again, or None once the enemies have spawned.
+        """
+        # The distance to the target, or if there is no target the player.
+        p_d = self.handler.player.center_x, self.handler.player.center_y
+        self.p_distance = vector.find_distance(p_d, self.position_at(t))
+        if self.target is not None:
+            self.distance = self.distance_at(t)
+        else:
+            self.distance = self.p_distance
 
         self.spawn()
+        if self.spawned:
+            return None
+
+        # Find the soonest the player could come within a screen, moving straight at the cluster at full speed. It is
+        # checked again then, or when the cluster reaches the target if that is sooner.
+        player = self.handler.player
+        closing_speed = self.speed + max(player.speed, player.max_speed)
+        if self.target is not None and hasattr(self.target, 'velocity_at'):
+            v_x, v_y = self.target.velocity_at(t)
+            closing_speed += math.sqrt(v_x ** 2 + v_y ** 2)
+        next_check = t + min(max(self.p_distance - SCREEN_WIDTH, 0) / closing_speed, CLUSTER_CHECK_INTERVAL)
+
+        arrival = self.arrival_time(SCREEN_WIDTH)
+        if arrival is not None:
+            next_check = min(next_check, max(arrival, t))
+        return next_check
 
     def spawn(self):
         # This method runs the loop to spawn the enemies.
@@ -86,49 +182,156 @@ class Cluster:
             # Variables for the spaning method.
             planet_pos = (self.handler.planet_data.center_x, self.handler.planet_data.center_y)
             half_planet = self.handler.planet_data.width / 2
-            r_angle_to_cluster = math.radians(vector.find_angle((self.center_x, self.center_y), planet_pos))
+            to_cluster_x, to_cluster_y, distance_to_planet = vector.direction((self.center_x, self.center_y),
+                                                                              planet_pos)
 
             # The distance to planet is the distance from the edge of the sprite. rather than the center.
-            distance_to_planet = (vector.find_distance((self.center_x, self.center_y), planet_pos)
-                                  - half_planet)
+            distance_to_planet -= half_planet
 
-            # For every enemy in self.num_enemies, spawn an enemy away from the planet around the cluster.
+            # For every enemy in self.num_enemies, queue an enemy away from the planet around the cluster. The handler
+            # makes them over the next few updates.
             for i in range(self.num_enemies):
-                # From the loaded data choose the enemy, and find it's bullet type/
-                enemy_type = random.randrange(0, len(self.handler.basic_types))
-                bullet_type = self.handler.bullet_types[self.handler.basic_types[enemy_type]["shoot_type"]]
+                # Use an enemy made ready while the cluster was in transit, or choose the type to make.
+                entry = PendingEnemy(self)
+                if self.prepared:
+                    entry.enemy = self.prepared.pop()
+                else:
+                    entry.type_data, entry.bullet_type = self.choose_type()
 
-                # Create the enemy and decide its initial target (The player, or the mission target).
-                enemy = Enemy(self.handler.basic_types[enemy_type], bullet_type)
+                # Decide its initial target (The player, or the mission target).
                 target = self.target
                 if vector.find_distance(s_d, p_d) < vector.find_distance(s_d, (target.center_x, target.center_y)):
                     target = self.handler.player
-                enemy.setup(self.handler, target, s_d, self)
-
-                # Place the enemy at the position of the planet to shorten the next lines.
-                enemy.center_x = self.handler.planet_data.center_x
-                enemy.center_y = self.handler.planet_data.center_y
+                entry.target = target
 
-                # choose a random angle between -5 and 5 degrees. In radians.
+                # choose a random angle between -5 and 5 degrees. In radians. Then turn the direction to the cluster.
                 random_angle = random.uniform(-0.0872665, 0.0872665)
+                spawn_x, spawn_y = vector.rotate((to_cluster_x, to_cluster_y),
+                                                 math.cos(random_angle), math.sin(random_angle))
 
                 # Calculate the position of the enemy. It is spawned away from the planet rather than the cluster
                 # this is so the enemy will never spawn inside the planet, making them pointless.
-                enemy.center_x += math.cos(r_angle_to_cluster + random_angle) * (half_planet + distance_to_planet
-                                                                                 + random.randint(-100, 100))
-                enemy.center_y += math.sin(r_angle_to_cluster + random_angle) * (half_planet + distance_to_planet
-                                                                                 + random.randint(-100, 100))
-                self.handler.enemy_sprites.append(enemy)
-
-            # We then remove the clusters point from the pointers list, and set the cluster to be spawned.
-            self.point.remove_from_sprite_lists()
+                reach = half_planet + distance_to_planet
+                entry.center_x = planet_pos[0] + spawn_x * (reach + random.randint(-100, 100))
+                entry.center_y = planet_pos[1] + spawn_y * (reach + random.randint(-100, 100))
+                self.pending += 1
+                self.handler.queue_spawn(entry)
+
+            # The cluster is now spawned. Its point stays in the pointers list until the last enemy is made.
             self.spawned = True
+            if not self.pending:
+                self.point.remove_from_sprite_lists()
+
+    def choose_type(self):
+        """
+        Choose the type of one of the cluster's enemies.
+
+        :return: The type's data and its bullet type.
+        """
+        enemy_type = random.randrange(0, len(self.handler.basic_types))
+        type_data = self.handler.basic_types[enemy_type]
+        return type_data, self.handler.bullet_types[type_data["shoot_type"]]
+
+    def prepare_enemy(self):
+        # Make one more of the cluster's enemies ahead of its arrival. It is only set up once it spawns.
+        type_data, bullet_type = self.choose_type()
+        self.prepared.append(self.handler.enemy_pool.acquire(type_data, bullet_type,
+                                                             self.handler.get_archetype(type_data)))
+
+    @property
+    def unprepared(self):
+        # The number of the cluster's enemies not yet made ready.
+        return self.num_enemies - len(self.prepared)
 
     def slaughter(self):
         # Kill the cluster.
         self.spawned = True
         self.point.kill()
         self.num_enemies = 0
+        self.pending = 0
+
+        # The enemies made ready were never set up, so they go straight back to the pool.
+        for enemy in self.prepared:
+            enemy.pool.release(enemy)
+        self.prepared = []
+
+
+@dataclass
+class PendingEnemy:
+    """
+    An enemy a cluster has spawned that the enemy handler has not yet made. Until then it stands in for the enemy on the
+    minimap, and the cluster's pointer stands in for its pointer.
+    """
+    cluster: Cluster
+    target: object = None
+    center_x: float = 0
+    center_y: float = 0
+
+    # The type to make, or the enemy already made while the cluster was in transit.
+    type_data: dict = None
+    bullet_type: dict = None
+    enemy: object = None
+
+
+def load_frames(image_file):
+    """
+    Gets all of the frames of a sprite sheet.
+
+    To make it easier to calculate, the sprite sheet is always one column. The width is then used to find the number
+    of frames.
+
+    :param image_file: The sprite sheet.
+    :return: A tuple of the textures.
+    """
+    image = PIL.Image.open(image_file)
+    num_frames = image.size[1] // image.size[0]
+    x = image.size[0]
+    y = image.size[1] / num_frames
+    return tuple(arcade.load_texture(image_file, 0, y * i, x, y) for i in range(num_frames))
+
+
+@dataclass(frozen=True, eq=False)
+class EnemyArchetype:
+    """
+    Everything every enemy of one type shares. The textures, sounds and hit box are loaded once a mission by the
+    enemy handler, and each enemy of the type points at them rather than loading its own. Archetypes are compared and
+    hashed by identity, one per type.
+    """
+    # The type.
+    type: str
+
+    # The damage frames, and the frames of each ability in the same order as the abilities.
+    textures: tuple
+    ability_frames: tuple
+
+    # The sounds of the enemy shooting and of its shots hitting.
+    shot_sound: arcade.Sound
+    hit_sound: arcade.Sound
+
+    # The hit box points and the hit shape made from them.
+    point_list: tuple
+    hit_shape: collision.HitShape
+
+    # The priority of each of the five rules.
+    rules: tuple
+
+    @classmethod
+    def load(cls, type_data: dict):
+        """
+        Load everything an enemy type shares.
+
+        :param type_data: The type's data from enemy_types.json.
+        :return: The new EnemyArchetype.
+        """
+        point_list = tuple(tuple(point) for point in type_data['point_list'])
+        return cls(type=type_data['type'],
+                   textures=load_frames(type_data['image_file']),
+                   ability_frames=tuple(load_frames(frames) for frames in type_data.get('ability_frames', ())),
+                   shot_sound=arcade.Sound("game_data/Music/Enemy Shot.wav"),
+                   hit_sound=arcade.Sound("game_data/Music/player_damage.wav"),
+                   point_list=point_list,
+                   hit_shape=collision.get_hit_shape(point_list),
+                   rules=tuple(float(priority) for priority in type_data['rules']))
 
 
 class Enemy(arcade.Sprite):
@@ -137,13 +340,27 @@ class Enemy(arcade.Sprite):
     calculate how they should move every update.
     """
 
-    def __init__(self, type_data: dict, bullet_type: dict):
+    def __init__(self, type_data: dict, bullet_type: dict, archetype: EnemyArchetype = None):
         super().__init__()
 
-        # type
+        # The pool the enemy goes back to when it is killed, if it came from one.
+        self.pool = None
+
+        self.reuse(type_data, bullet_type, archetype)
+
+    def reuse(self, type_data: dict, bullet_type: dict, archetype: EnemyArchetype = None):
+        """
+        Set up the enemy, either new or taken from a pool, with all of its state reset.
+        """
+
+        # type, and the assets shared by every enemy of the type. If none are given they are loaded for this enemy.
+        if archetype is None:
+            archetype = EnemyArchetype.load(type_data)
+        self.archetype = archetype
         self.type_data = type_data
         self.type = type_data['type']
         self.super_type = type_data['super_type']
+        self.serial = next(SPAWN_SERIALS)
 
         # checks if the enemy is in range of player
         self.handler = None
@@ -155,14 +372,24 @@ class Enemy(arcade.Sprite):
         self.gravity_acceleration = [0.0, 0.0]
         self.weight = 549054
 
+        # The cached hit shape, found once the enemy is setup, and the enemy's collision layer.
+        self.hit_shape = None
+        if self.super_type == "boss":
+            self.collision_layer = collision.LAYER_BOSS
+        else:
+            self.collision_layer = collision.LAYER_ENEMY
+
         # movement
         self.turning_speed = 100
         self.velocity = [0.0, 0.0]
 
+        # The physics world moves the enemy once it is setup.
+        self.physics_world = None
+        self.physics_row = None
+
         # shooting variables
         self.firing = False
         self.bullet_type = bullet_type
-        self.bullets = arcade.SpriteList()
         self.last_shot = 0
         self.shoot_delay = 0.1
         self.shoot_delay_range = type_data['shoot_delay']
@@ -172,7 +399,7 @@ class Enemy(arcade.Sprite):
         self.angle_mod = type_data['angle_mod']
 
         # shooting audio
-        self.shot_sound = arcade.Sound("game_data/Music/Enemy Shot.wav")
+        self.shot_sound = archetype.shot_sound
         self.shot_panning = -1
         self.shot_volume = 0
 
@@ -185,9 +412,9 @@ class Enemy(arcade.Sprite):
         self.first_shot = False
 
         # sprites
-        self.textures = []
+        self.textures = list(archetype.textures)
+        self.texture = self.textures[0]
         self.scale = 0.15
-        self.get_sprites(type_data['image_file'])
         self.health = type_data['health']
         self.full_health = self.health
         if len(self.textures) - 1:
@@ -207,6 +434,7 @@ class Enemy(arcade.Sprite):
         self.target_velocity = [0.0, 0.0]
 
         self.target_angle = 0
+        self.target_direction = (1.0, 0.0)
         self.angle_to_target = 0
         self.direction = 0
         self.difference = [0.0, 0.0]
@@ -228,22 +456,28 @@ class Enemy(arcade.Sprite):
 
         self.do_rule = 0
 
-        self.rule_1_priority = type_data['rules'][0]
-        self.rule_2_priority = type_data['rules'][1]
-        self.rule_3_priority = type_data['rules'][2]
-        self.rule_4_priority = type_data['rules'][3]
-        self.rule_5_priority = type_data['rules'][4]
+        # The game time the rule scheduler last found rules two to five for the enemy, None if it never has.
+        self.rule_time = None
+
+        # The summed rule effects from the last update, applied every tick by the flocking engine.
+        self.rule_acceleration = [0.0, 0.0]
+
+        # The level of detail tier, and the time since the enemy last updated in it.
+        self.lod = ai.LOD_FULL
+        self.lod_time = 0
+
+        self.rule_1_priority = archetype.rules[0]
+        self.rule_2_priority = archetype.rules[1]
+        self.rule_3_priority = archetype.rules[2]
+        self.rule_4_priority = archetype.rules[3]
+        self.rule_5_priority = archetype.rules[4]
 
         # Ability Variables
         try:
             self.abilities = type_data['abilities']
             self.active_ability = None
             self.active_frames = []
-            self.ability_frames = []
-            for frames in type_data['ability_frames']:
-                frame_list = []
-                self.get_sprites(frames, frame_list)
-                self.ability_frames.append(frame_list)
+            self.ability_frames = archetype.ability_frames
 
             self.cool_down = 0
             self.cool_down_delay = 4
@@ -274,7 +508,8 @@ class Enemy(arcade.Sprite):
 
         # Set_hit_box does not like lists of points even though that is what it requires. This is a bug with formating
         # rather than an issue in the code.
-        self.set_hit_box(points=self.type_data['point_list'])
+        self.set_hit_box(points=self.archetype.point_list)
+        self.hit_shape = self.archetype.hit_shape
 
         # Adds the enemy as a gravity object
         handler.game_window.gravity_handler.set_gravity_object(self)
@@ -298,46 +533,43 @@ class Enemy(arcade.Sprite):
         self.velocity[0] = self.target.velocity[0] / 2
         self.velocity[1] = self.target.velocity[1] / 2
 
-    def get_sprites(self, image_file, list_to_append: list = None):
+        # Adds the enemy to the physics world.
+        handler.game_window.physics_world.add(self)
+
+    def on_target_changed(self, previous, target):
         """
-        Gets all of the damage sprites for the enemy.
+        Called by the threat assigner when the enemy is given a new target.
 
-        To make it easier to calculate, the sprite sheet is always one column. The width is then used to find the number
-        of frames.
+        :param previous: The old target.
+        :param target: The new target.
         """
-        image = PIL.Image.open(image_file)
-        num_frames = image.size[1] // image.size[0]
-        x = image.size[0]
-        y = image.size[1] / num_frames
-        for i in range(num_frames):
-            texture = arcade.load_texture(image_file, 0, y * i, x, y)
-            if list_to_append is None:
-                self.textures.append(texture)
-            else:
-                list_to_append.append(texture)
-        if list_to_append is None:
-            self.texture = self.textures[0]
+        # Rules two to five were found against the old target, so they are found again as soon as possible.
+        self.rule_time = None
 
     def draw(self):
         """
-        Draws the enemy sprite and bullets.
+        Draws the enemy sprite. Its bullets are drawn by the bullet system.
         """
-        self.bullets.draw()
         super().draw()
 
     def on_update(self, delta_time: float = 1 / 60):
         """
-        Every update run different methods for the enemy and its algorithms.
+        Every update run different methods for the enemy and its algorithms. When the enemy handler finds the rules
+        for every enemy at once it calls think and act itself, with the rules found in between.
+        """
+        self.think(delta_time)
+        self.rules()
+        self.act(delta_time)
+
+    def think(self, delta_time: float = 1 / 60):
+        """
+        The first half of the update, everything the rules need.
         """
 
         # A check to ensure the enemy dies.
         if self.health <= 0:
             self.kill()
 
-        # check contact
-        self.check_contact()
-        self.if_hit_player()
-
         # fix the enemies angle to be in the range 0 - 360
         self.fix_angle()
 
@@ -347,28 +579,25 @@ class Enemy(arcade.Sprite):
         # turn towards the player
         self.turn(delta_time)
 
-        # gravity
-        self.velocity[0] += self.gravity_acceleration[0]
-        self.velocity[1] += self.gravity_acceleration[1]
-
-        # run a counter to check when to do some of the rules, then calculate the rules and the resultant velocity
+        # run a counter to check when to do some of the rules. The physics world has already applied gravity, the
+        # rules then find the resultant velocity which the physics world moves the enemy with.
         self.do_rule += 1 * delta_time
-        self.rules()
 
-        # apply velocity
-        self.center_x += self.velocity[0] * delta_time
-        self.center_y += self.velocity[1] * delta_time
+    def act(self, delta_time: float = 1 / 60, fire: bool = True):
+        """
+        The second half of the update, after the rules have changed the velocity. Enemies too far off the screen for
+        the player to see do not fire.
+        """
 
         # abilities
         if self.abilities is not None:
             self.ability_rules()
 
         # shooting
-        if self.active_ability is None:
+        if fire and self.active_ability is None:
             self.shoot_rule()
             if self.firing:
                 self.shoot()
-        self.bullets.on_update(delta_time)
 
     def turn(self, delta_time):
         """
@@ -404,8 +633,9 @@ class Enemy(arcade.Sprite):
             num = random.randrange(0, 4)
             for scrap in range(num):
                 x_y = (self.center_x + random.randrange(-15, 16), self.center_y + random.randrange(-15, 16))
-                drop = vector.Scrap(self.handler.player, self.handler, x_y)
+                drop = self.handler.scrap_pool.acquire(self.handler.player, self.handler, x_y)
                 self.handler.scrap_list.append(drop)
+                self.handler.game_window.physics_world.add(drop, 0)
             self.handler.count_dropped_scrap(num)
 
     def kill(self):
@@ -420,65 +650,60 @@ class Enemy(arcade.Sprite):
         if self.cluster is not None:
             self.cluster.num_enemies -= 1
 
+        if self.physics_world is not None:
+            self.physics_world.remove(self)
+
+        self.handler.neighbour_index.remove(self)
         self.remove_from_sprite_lists()
+
+        # The enemy's bullets are killed with it.
+        self.handler.game_window.bullet_system.kill_owner(self)
+
+        if self.pool is not None:
+            self.pool.release(self)
         del self
 
     """
     Methods for different contact. Either being hit or hitting the player.
     """
 
-    def check_contact(self):
-        """
-        Check to see if the player or an ally hits the enemy.
-        """
-        # First it checks if the player's bullets are hitting the enemy.
-        hits = arcade.check_for_collision_with_list(self, self.handler.player.bullets)
-
-        # It then adds any other bullets from it's allies to the list
-        for enemy in self.handler.enemy_sprites:
-            if enemy != self and type(enemy) != vector.AnimatedTempSprite:
-                e_hits = arcade.check_for_collision_with_list(self, enemy.bullets)
-                if len(e_hits) > 0:
-                    for hit in e_hits:
-                        hits.append(hit)
-
-        # Finally if any bullets hit the enemy, deal damage for each bullet and kill the bullet.
-        if len(hits) > 0:
-            hit_copy = hits
-            for index, hit in enumerate(hit_copy):
-                self.health -= hit.damage
-                if self.health <= 0:
-                    # If the enemy has no health, then spawn a death animation, and kill the enemy.
-                    death = vector.AnimatedTempSprite("game_data/Sprites/Enemies/enemy explosions.png",
-                                                      (self.center_x, self.center_y))
-                    self.handler.enemy_sprites.append(death)
-                    self.kill()
-                elif self.health <= self.full_health - (self.frame * self.health_segment):
-                    # If the enemy has taken enough damage to switch damage frame, change the enemy's texture.
-                    self.texture = self.textures[self.frame]
-                    self.frame += 1
-                hit.kill()
-
-    def if_hit_player(self):
-        """
-        check if the enemy hits the player
-        """
-        # Find every bullet that is hitting the target and damage the target and play the player hit sound.
-        hits = arcade.check_for_collision_with_list(self.target, self.bullets)
-        if len(hits) > 0:
-            for hit in hits:
-                self.target.health -= self.bullet_type['damage']
-                self.target.last_damage = time.time()
-                file = "game_data/Music/player_damage.wav"
-                sound = arcade.Sound(file)
-                sound.play(volume=self.shot_volume, pan=self.shot_panning)
-
-                if self.target.health <= 0:
-                    self.target.health = 0
-                    self.target.dead = True
-
-                self.target.hit = True
-                hit.kill()
+    def take_hit(self, damage):
+        """
+        Deal a bullet's damage to the enemy. The enemy handler finds the hits and calls this for each one.
+
+        :param damage: The damage of the bullet.
+        :return: True if the hit killed the enemy.
+        """
+        self.health -= damage
+        if self.health <= 0:
+            # If the enemy has no health, then spawn a death animation, and kill the enemy.
+            death = self.handler.explosion_pool.acquire("game_data/Sprites/Enemies/enemy explosions.png",
+                                                        (self.center_x, self.center_y))
+            self.handler.enemy_sprites.append(death)
+            self.kill()
+            return True
+        elif self.health <= self.full_health - (self.frame * self.health_segment):
+            # If the enemy has taken enough damage to switch damage frame, change the enemy's texture.
+            self.texture = self.textures[self.frame]
+            self.frame += 1
+        return False
+
+    def hit_sprite(self, sprite, damage):
+        """
+        Deal one of the enemy's bullets' damage to the player or the station, and play the player hit sound.
+
+        :param sprite: The sprite that was hit.
+        :param damage: The damage of the bullet.
+        """
+        sprite.health -= damage
+        sprite.last_damage = time.time()
+        self.archetype.hit_sound.play(volume=self.shot_volume, pan=self.shot_panning)
+
+        if sprite.health <= 0:
+            sprite.health = 0
+            sprite.dead = True
+
+        sprite.hit = True
 
     """
     Methods for calculating the different rules.
@@ -495,8 +720,19 @@ class Enemy(arcade.Sprite):
         self_pos = (self.center_x, self.center_y)
         target_pos = (target.center_x, target.center_y)
 
-        # get the angle towards the player
-        self.target_angle = vector.find_angle(target_pos, self_pos)
+        # get the direction, angle and distance towards the target
+        unit_x, unit_y, self.target_distance = vector.direction(target_pos, self_pos)
+        self.target_direction = unit_x, unit_y
+        self.target_angle = vector.heading(self.target_direction)
+
+        # If the target is the player aim where they will be once a shot reaches them, using their predicted path.
+        # The path starts where the player is now, which is before this step moves them, so the flight is timed from
+        # the start of the path rather than the clock.
+        trajectory = self.handler.game_window.player_trajectory
+        if target is player and trajectory is not None:
+            flight_time = min(self.target_distance / self.bullet_type['speed'], trajectory.horizon)
+            lead_pos = trajectory.position_at(trajectory.start_time + flight_time)
+            self.target_angle = vector.find_angle(lead_pos, self_pos)
 
         # find the difference and the direction
         self.difference = vector.calc_difference(self.target_angle, self.angle)
@@ -512,12 +748,15 @@ class Enemy(arcade.Sprite):
         if forward_acceleration > self.target_acceleration:
             self.target_acceleration = forward_acceleration
 
-        # distance to target
-        self.target_distance = vector.find_distance(self_pos, target_pos)
-
         # self speed
         self.speed = vector.find_distance((0.0, 0.0), self.velocity)
 
+        # Enemies off the screen are silent.
+        if self.lod != ai.LOD_FULL:
+            self.shot_panning = 0
+            self.shot_volume = 0
+            return
+
         # Find the audio volume to the left or right depending on the enemies position.
         diff_panning = self_pos[0] - target_pos[0]
         if abs(diff_panning) < SCREEN_WIDTH:
@@ -604,25 +843,12 @@ class Enemy(arcade.Sprite):
             if self.difference[0] < 20 or self.difference[1] < 20 and self.target_distance < 750:
                 self.firing = True
 
-                # It then checks to see if it is aiming at any of its neighbors.
-                for neighbor in self.handler.enemy_sprites:
-                    distance_to_neighbor = vector.find_distance((self.center_x, self.center_y),
-                                                                (neighbor.center_x, neighbor.center_y))
-                    if neighbor != self:
-                        # If they are in between the enemy and the player than do not shoot.
-                        if distance_to_neighbor < self.target_distance + 200:
-                            angle_to_neighbor = vector.find_angle((neighbor.center_x, neighbor.center_y),
-                                                                  (self.center_x, self.center_y))
-                            difference = vector.calc_difference(angle_to_neighbor, self.angle)
-                            # Than if the
-                            if difference[0] < 45 or difference[1] < 45:
-                                self.firing = False
-
-                        # If they did not shoot reset the timer and break from the loop.
-                        if self.firing is False:
-                            self.last_shot = time.time()
-                            self.shoot_delay = random.randrange(self.shoot_delay_range[0], self.shoot_delay_range[1])
-                            break
+                # It then checks to see if any of its allies are in the way, up to a little past its target. If they
+                # are, do not shoot, reset the timer.
+                if self.handler.line_of_fire.blocked(self, self.angle, self.target_distance + ai.FIRE_REACH):
+                    self.firing = False
+                    self.last_shot = time.time()
+                    self.shoot_delay = random.randrange(self.shoot_delay_range[0], self.shoot_delay_range[1])
 
     def shoot(self):
         """
@@ -635,9 +861,9 @@ class Enemy(arcade.Sprite):
             # and the angle modifier. This system allows for enemies to shoot in circles or "shotgun" spreads.
             angle = self.angle + self.start_angle + (self.angle_mod * self.shots_this_firing)
 
-            # It then creates a shot and appends it.
-            shot = bullet.Bullet([self.center_x, self.center_y], angle, self.velocity, self.bullet_type)
-            self.bullets.append(shot)
+            # It then fires a shot from the bullet system.
+            self.handler.game_window.bullet_system.fire([self.center_x, self.center_y], angle, self.velocity,
+                                                        self.bullet_type, self)
 
             # It then increases the shots this firing, finds the time until the next shot, and plays some audio.
             self.shots_this_firing += 1
@@ -666,30 +892,30 @@ class Enemy(arcade.Sprite):
         Rule One: Move Towards the player but stay 300 pixels away.
         """
 
-        # Find the distance and the angle in radians.
+        # Find the distance and the direction.
         distance = self.target_distance
-        rad_angle = math.radians(self.target_angle)
+        unit_x, unit_y = self.target_direction
 
         if distance > SCREEN_WIDTH * 10:
             # If the enemy is very far from the target accelerate in that direction aggressively.
-            x = math.cos(rad_angle) * self.target_acceleration * 4
-            y = math.sin(rad_angle) * self.target_acceleration * 4
+            x = unit_x * self.target_acceleration * 4
+            y = unit_y * self.target_acceleration * 4
         if distance > SCREEN_HEIGHT/2 + 50:
             # If the distance is large but not huge, than accelerate towards the target, faster than the target.
-            x = math.cos(rad_angle) * (self.target_acceleration + 1.4)
-            y = math.sin(rad_angle) * (self.target_acceleration + 1.4)
+            x = unit_x * (self.target_acceleration + 1.4)
+            y = unit_y * (self.target_acceleration + 1.4)
         elif distance > SCREEN_HEIGHT/2 - 25:
             # If the enemies is just on screen accelerate with the target.
-            x = math.cos(rad_angle) * self.target_acceleration
-            y = math.sin(rad_angle) * self.target_acceleration
+            x = unit_x * self.target_acceleration
+            y = unit_y * self.target_acceleration
         elif distance < SCREEN_HEIGHT/2 - 130:
             # If they are close to the target move away
-            x = math.cos(rad_angle) * -2.5
-            y = math.sin(rad_angle) * -2.5
+            x = unit_x * -2.5
+            y = unit_y * -2.5
         elif distance < 75:
             # If they are too close quickly move away
-            x = math.cos(rad_angle) * -4
-            y = math.sin(rad_angle) * -4
+            x = unit_x * -4
+            y = unit_y * -4
         else:
             # If in the sweet spot stay as they are.
             x = 0
@@ -707,32 +933,32 @@ class Enemy(arcade.Sprite):
         y = 0
         total = 0
 
-        # Find the average of all their motions and move in that average direction.
-        for neighbor in self.handler.enemy_sprites:
+        # Find the average of all their motions and move in that average direction. Only the close neighbors matter.
+        for neighbor in self.handler.find_neighbours(self, 250):
             if neighbor != self:
-                distance = vector.find_distance((self.center_x, self.center_y), (neighbor.center_x, neighbor.center_y))
+                unit_x, unit_y, distance = vector.direction((self.center_x, self.center_y),
+                                                            (neighbor.center_x, neighbor.center_y))
                 # If the distance is too close than dodge.
                 if distance < 250:
                     total += 1
 
-                    angle_neighbor = vector.find_angle((self.center_x, self.center_y),
-                                                       (neighbor.center_x, neighbor.center_y))
+                    angle_neighbor = vector.heading((unit_x, unit_y))
                     difference_neighbor = vector.calc_difference(neighbor.angle, angle_neighbor)
-                    direction = 0
+                    side = 0
                     move = 0
                     if difference_neighbor[0] < 45 and difference_neighbor[0] < difference_neighbor[1]:
                         # If the neighbor is looking at the enemy and the left side is closer, dodge left.
-                        direction = neighbor.angle - 90
+                        side = -1
                         move = (45 - difference_neighbor[0])
                     if difference_neighbor[1] < 45 and difference_neighbor[1] < difference_neighbor[0]:
                         # If the neighbor is looking at the enemy and the right side is closer, dodge right.
-                        direction = neighbor.angle + 90
+                        side = 1
                         move = (45 - difference_neighbor[1])
-                    if direction:
-                        # If they should dodge, than find the dodge velocity.
-                        rad_difference = math.radians(direction)
-                        x += math.cos(rad_difference) * move
-                        y += math.sin(rad_difference) * move
+                    if side:
+                        # If they should dodge, than find the dodge velocity at a right angle to the neighbor's facing.
+                        dodge_x, dodge_y = vector.perpendicular(vector.angle_vector(neighbor.angle), side)
+                        x += dodge_x * move
+                        y += dodge_y * move
                     else:
                         # Else move away from the neighbor from distance rather than view.
                         x += (self.center_x - neighbor.center_x)
@@ -774,17 +1000,17 @@ class Enemy(arcade.Sprite):
 
         # Same as with Rule 2. If the Left is better dodge left, elif the right is better dodge right.
         if difference[0] < 45 and difference[0] < difference[1]:
-            direction = player.angle - 90
+            direction = -1
             move = (45 - difference[0])
         if difference[1] < 45 and difference[1] < difference[0]:
-            direction = player.angle + 90
+            direction = 1
             move = (45 - difference[1])
         x, y = 0, 0
         # As before if they need to dodge find the dodge acceleration.
         if direction:
-            rad_difference = math.radians(direction)
-            x = math.cos(rad_difference) * move
-            y = math.sin(rad_difference) * move
+            x, y = vector.perpendicular(vector.angle_vector(player.angle), direction)
+            x *= move
+            y *= move
         result = [x * self.rule_4_priority * 0.05, y * self.rule_4_priority * 0.05]
         return result
 
@@ -797,8 +1023,9 @@ class Enemy(arcade.Sprite):
         total = 0
         for influence in self.gravity_handler.gravity_influences:
             # For each gravity influence find the distance from the edge of the sprite.
-            distance = vector.find_distance((self.center_x, self.center_y),
-                                            (influence.center_x, influence.center_y)) - (influence.width / 2)
+            unit_x, unit_y, distance = vector.direction((self.center_x, self.center_y),
+                                                        (influence.center_x, influence.center_y))
+            distance -= influence.width / 2
 
             # if the enemy is within 2500 pixels dodge the planet.
             if 0 < distance < 2500:
@@ -806,11 +1033,8 @@ class Enemy(arcade.Sprite):
                 total += 1
 
                 # Find the opposite direction, and use that as the acceleration
-                neg_direction = math.radians(vector.find_angle((self.center_x, self.center_y),
-                                                               (influence.center_x, influence.center_y)))
-
-                neg_x = math.cos(neg_direction) * distance
-                neg_y = math.sin(neg_direction) * distance
+                neg_x = unit_x * distance
+                neg_y = unit_y * distance
 
                 x += neg_x / 2500
                 y += neg_y / 2500
@@ -888,7 +1112,7 @@ class Enemy(arcade.Sprite):
 
             # Reset the texture and the rules affected.
             self.texture = self.textures[self.frame]
-            self.rule_4_priority = self.type_data['rules'][3]
+            self.rule_4_priority = self.archetype.rules[3]
 
             # Reset the time variables.
             self.start_time = 0
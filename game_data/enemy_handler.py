@@ -1,17 +1,29 @@
 import math
 import random
 import json
+import heapq
+import time
+from collections import deque
 
 import arcade
 
 import game_data.ui as ui
+import game_data.ai as ai
+import game_data.ai_worker as ai_worker
+import game_data.collision as collision
 import game_data.vector as vector
 import game_data.font as font
+import game_data.pool as pool
 import game_data.enemy as _
 
 # The maximum number of enemies that can be spawned
 MAX_ENEMIES = 90
 
+# How many milliseconds each update can spend making the enemies of spawned clusters, and how many seconds before a
+# cluster arrives its enemies start being made ready.
+SPAWN_BUDGET = 1.5
+PREWARM_TIME = 5.0
+
 
 class EnemyHandler:
     """
@@ -35,6 +47,11 @@ class EnemyHandler:
             self.bullet_types = bullets["enemy"]
             self.boss_bullet_types = bullets['boss']
 
+        # The shared assets of every enemy and boss type in the mission, loaded once.
+        self.archetypes = {}
+        for type_data in (self.basic_types or []) + (self.boss_types or []):
+            self.get_archetype(type_data)
+
         self.game_window = game_window
         self.mission_handler = mission_handler
         self.target_object = target_object
@@ -45,6 +62,12 @@ class EnemyHandler:
         self.level_data = mission_data
         self.planet_data = mission_data['planet']
 
+        # The pools of enemies, scrap and explosions, kept for the whole mission so each wave reuses the sprites of the
+        # last.
+        self.enemy_pool = pool.Pool(_.Enemy)
+        self.scrap_pool = pool.Pool(vector.Scrap)
+        self.explosion_pool = pool.Pool(vector.AnimatedTempSprite)
+
         # The player object. This allows the enemies to get its position.
         self.player = None
 
@@ -53,6 +76,37 @@ class EnemyHandler:
         # The sprite list that holds all of the enemy sprites
         self.enemy_sprites = None
 
+        # The neighbour index of every enemy position, rebuilt each update for the rules that look at allies when each
+        # enemy runs its own rules. The batched rules find their neighbours by cell themselves.
+        self.neighbour_index = collision.SpatialHash(collision.NEIGHBOUR_CELL_SIZE)
+
+        # The engine that runs the movement rules for every enemy at once, and whether it is used rather than each enemy
+        # running its own rules.
+        self.flocking = ai.FlockingEngine(self)
+        self.batched_rules = ai.BATCHED_RULES
+
+        # The line of fire test the enemies use to not shoot their allies, rebuilt each update.
+        self.line_of_fire = ai.LineOfFire()
+
+        # The scheduler that spreads the expensive rules over the updates, within a time budget.
+        self.rule_scheduler = ai.RuleScheduler()
+
+        # The service that decides which enemies attack the player and which attack the target.
+        self.threat_assigner = ai.ThreatAssigner()
+
+        # The worker process that finds the rules and fire decisions off the main thread, if it is used.
+        self.ai_worker = ai_worker.AIWorker() if ai_worker.WORKER_ENABLED else None
+
+        # The hits found by the last collision pass, and the number of bullet and sprite pairs it checked exactly.
+        self.hit_events = []
+        self.pairs_checked = 0
+
+        # Whether every bullet is checked along the whole segment it moved, not only the fast ones.
+        self.swept_collisions = collision.SWEPT_COLLISIONS
+
+        # Every layer any live bullet can hit. Planets and satellites are only checked if a bullet can hit them.
+        self.bullet_layers = 0
+
         # engagement time.
         self.engagement = 0
 
@@ -70,6 +124,11 @@ class EnemyHandler:
         self.last_player_health = 0
 
         self.time_to_spawn = None
+        self.time_until_threat = None
+
+        # The seconds and position the threat text was made with.
+        self.time_to_spawn_seconds = None
+        self.time_to_spawn_position = None
 
         # clusters for when there are more than 10 enemies
         self.clusters = []
@@ -78,6 +137,20 @@ class EnemyHandler:
         self.total_count_in_clusters = 0
         self.cluster_count = 1
 
+        # The game times to check if each cluster should spawn, as a heap of the time, a count and the cluster.
+        self.cluster_schedule = []
+        self.scheduled_clusters = 0
+
+        # The enemies spawned clusters are waiting on, made in order a few each update within the spawn budget.
+        self.spawn_queue = deque()
+        self.spawn_budget = SPAWN_BUDGET
+        self.prewarm_time = PREWARM_TIME
+
+        # The number of enemies made and made ready last update, and the milliseconds it took.
+        self.spawned_count = 0
+        self.prepared_count = 0
+        self.spawn_time = 0
+
         # the current wave, plus which stage of difficulty
         self.wave = 0
         self.stage = 1
@@ -96,13 +169,20 @@ class EnemyHandler:
         # The sprite list that holds all of the enemy sprites
         self.enemy_sprites = None
 
-        # The SpriteList that holds all the scrap
+        # The SpriteList that holds all the scrap. Any scrap left over goes back to the pool first.
+        for scrap in list(self.scrap_list):
+            scrap.kill()
         self.scrap_list = arcade.SpriteList()
 
+        # The neighbour index, and the last hits.
+        self.neighbour_index.clear()
+        self.hit_events = []
+
         # clusters for when there are more than 10 enemies
         self.clusters = []
         self.total_count_in_clusters = 0
         self.cluster_count = 1
+        self.cluster_schedule = []
 
         # the current wave, plus which stage of difficulty
         self.wave = 0
@@ -128,7 +208,7 @@ class EnemyHandler:
     def slaughter(self):
         # If there are enemy sprites, kill the enemies.
         if self.enemy_sprites is not None:
-            safe_copy = self.enemy_sprites
+            safe_copy = list(self.enemy_sprites)
             for enemy in safe_copy:
                 enemy.kill()
 
@@ -137,6 +217,18 @@ class EnemyHandler:
             for clusters in self.clusters:
                 clusters.slaughter()
 
+        # Forget the enemies waiting to be made. Any already made go back to the pool.
+        for entry in self.spawn_queue:
+            if entry.enemy is not None:
+                entry.enemy.pool.release(entry.enemy)
+        self.spawn_queue.clear()
+
+    def close(self):
+        # Stop the AI worker, if there is one. The handler is not used after this.
+        if self.ai_worker is not None:
+            self.ai_worker.close()
+            self.ai_worker = None
+
     def calc_wave(self):
 
         """
@@ -210,20 +302,52 @@ class EnemyHandler:
                     self.boss_wave = True
 
     def setup_enemies(self):
-        # Set the enemy sprite lists to an empty SpriteList, then creates the new clusters.
-        self.enemy_sprites = arcade.SpriteList()
+        # Empty the enemy sprite list, then creates the new clusters.
+        self.empty_enemy_sprites()
         self.cluster()
 
     def setup_boss(self):
-        # resets the enemy sprite list, then creates the boss enemy targeting the player.
-        self.enemy_sprites = arcade.SpriteList()
+        # Empty the enemy sprite list, then creates the boss enemy targeting the player.
+        self.empty_enemy_sprites()
         boss_type = random.choice(self.boss_types)
         bullets = boss_type['shoot_type']
         bullet_type = self.boss_bullet_types[bullets]
-        enemy = _.Enemy(boss_type, bullet_type)
+        enemy = self.enemy_pool.acquire(boss_type, bullet_type, self.get_archetype(boss_type))
         enemy.setup(self, self.player)
         self.enemy_sprites.append(enemy)
 
+    def empty_enemy_sprites(self):
+        # The same sprite list is kept between waves rather than making a new one. Anything left in it is killed.
+        if self.enemy_sprites is None:
+            self.enemy_sprites = arcade.SpriteList()
+        else:
+            for sprite in list(self.enemy_sprites):
+                sprite.kill()
+
+    def pool_high_water(self):
+        """
+        Find the most enemies, bullets, scrap and explosions that have been in use at once this mission.
+
+        :return: A dictionary of the high water mark of each pool, and of the bullet system.
+        """
+        return {'enemies': self.enemy_pool.high_water,
+                'bullets': self.game_window.bullet_system.high_water,
+                'scrap': self.scrap_pool.high_water,
+                'explosions': self.explosion_pool.high_water}
+
+    def get_archetype(self, type_data):
+        """
+        Find the shared assets of an enemy type, loading them the first time the type is used.
+
+        :param type_data: The type's data from enemy_types.json.
+        :return: The EnemyArchetype of the type.
+        """
+        archetype = self.archetypes.get(type_data['type'])
+        if archetype is None:
+            archetype = _.EnemyArchetype.load(type_data)
+            self.archetypes[type_data['type']] = archetype
+        return archetype
+
     def cluster(self):
         # Does small calculations to evenly distribute enemies between waves.
         if self.num_enemies >= self.max_count_in_clusters:
@@ -281,21 +405,23 @@ class EnemyHandler:
 
             if angle_to_object is None:
                 angle = round(random.uniform(0.0, 2 * math.pi), 2)
-                cluster.center_x = self.planet_data.center_x + (math.cos(angle) *
-                                                                (self.planet_data.width +
-                                                                random.randint(screen_x * 3, screen_x * 6)))
-                cluster.center_y = self.planet_data.center_y + (math.sin(angle) *
-                                                                (self.planet_data.width +
-                                                                random.randint(screen_x * 3, screen_x * 6)))
+                x = self.planet_data.center_x + (math.cos(angle) *
+                                                 (self.planet_data.width + random.randint(screen_x * 3, screen_x * 6)))
+                y = self.planet_data.center_y + (math.sin(angle) *
+                                                 (self.planet_data.width + random.randint(screen_x * 3, screen_x * 6)))
             else:
                 angle = math.radians(angle_to_object + random.randint(-6, 7))
                 distance = distance_to_object + random.randint(screen_x * 3, screen_x * 6)
                 if distance < self.planet_data.width / 2 + 1000:
                     distance = self.planet_data.width / 2 + 1000 + random.randint(50, 500)
-                cluster.center_x = self.planet_data.center_x + (math.cos(angle) * distance)
-                cluster.center_y = self.planet_data.center_y + (math.sin(angle) * distance)
+                x = self.planet_data.center_x + (math.cos(angle) * distance)
+                y = self.planet_data.center_y + (math.sin(angle) * distance)
+
+            # The cluster starts its approach from the position.
+            cluster.place(x, y)
 
             self.clusters.append(cluster)
+            self.schedule_cluster(cluster, self.game_window.clock.time)
 
         # If the split was not perfect, separate the remaining enemies between the clusters evenly.
         if remaining:
@@ -311,6 +437,23 @@ class EnemyHandler:
         """
         self.scrap_list.draw()
 
+        # If there is a next cluster to arrive show the text. It is only made again when the seconds change, and only
+        # moved when the view moves.
+        if self.time_until_threat is not None:
+            seconds = round(self.time_until_threat)
+            position = (self.game_window.left_view + arcade.get_display_size()[0] / 2,
+                        self.game_window.bottom_view + arcade.get_display_size()[1] - 50)
+            if self.time_to_spawn is None or seconds != self.time_to_spawn_seconds:
+                self.time_to_spawn = font.LetterList("Time Until Threat Arrival: " + str(seconds) + "s",
+                                                     position[0], position[1], mid_x=True)
+                self.time_to_spawn_seconds = seconds
+            elif position != self.time_to_spawn_position:
+                self.time_to_spawn.move(position[0] - self.time_to_spawn_position[0],
+                                        position[1] - self.time_to_spawn_position[1])
+            self.time_to_spawn_position = position
+        else:
+            self.time_to_spawn = None
+
         if self.time_to_spawn is not None and not self.player.dead:
             self.time_to_spawn.draw()
 
@@ -322,40 +465,43 @@ class EnemyHandler:
         updates all of the enemies
         """
 
-        # Update the scrap and enemies.
-        self.scrap_list.update()
-        self.enemy_sprites.on_update(delta_time)
+        # Find every hit, then apply the hits before updating the scrap and enemies.
+        self.bullet_layers = self.game_window.bullet_system.layers()
+        self.hit_events = self.find_hits()
+        self.resolve_hits(self.hit_events)
+
+        # The neighbour index is only asked by enemies running their own rules.
+        if not self.batched_rules:
+            self.build_neighbour_index()
+        self.line_of_fire.build((enemy for enemy in self.enemy_sprites if type(enemy) != vector.AnimatedTempSprite),
+                                self.enemy_sprites)
+        self.scrap_list.on_update(delta_time)
+        if self.batched_rules:
+            self.flocking.on_update(delta_time)
+        else:
+            self.enemy_sprites.on_update(delta_time)
 
-        # If there are clusters run the spawn check for all clusters that have not spawned yet.
-        if len(self.clusters) != 0:
-            for clusters in self.clusters:
-                if not clusters.spawned:
-                    clusters.spawn_enemies(delta_time)
+        # Check the clusters that are due to spawn. Clusters that do not spawn are checked again later. Then make the
+        # enemies they are waiting on, and any time left makes ready the enemies of clusters arriving soon.
+        self.check_clusters(self.game_window.clock.time)
+        self.update_spawn_queue(self.game_window.clock.time)
 
         # count the total count in clusters to ensure there are still enemies to spawn.
-        # Also find the time until the next cluster arrives at the target.
+        # Also find the time until the next cluster arrives within a screen of the target.
         self.total_count_in_clusters = 0
         time_to_spawn = None
         for clusters in self.clusters:
             self.total_count_in_clusters += clusters.num_enemies
             if not clusters.spawned:
-                distance = vector.find_distance((clusters.center_x, clusters.center_y),
-                                                (self.target_object.center_x, self.target_object.center_y)) \
-                           - arcade.get_display_size()[0]
-                speed = clusters.speed
-
-                t = distance / speed
-                if time_to_spawn is None or t < time_to_spawn:
-                    time_to_spawn = t
-
-        # If there is a next cluster to arrive show the text.
-        if time_to_spawn is not None:
-            self.time_to_spawn = font.LetterList("Time Until Threat Arrival: " + str(round(time_to_spawn)) + "s",
-                                                 self.game_window.left_view + arcade.get_display_size()[0] / 2,
-                                                 self.game_window.bottom_view + arcade.get_display_size()[1] - 50,
-                                                 mid_x=True)
-        else:
-            self.time_to_spawn = None
+                arrival = clusters.arrival_time(arcade.get_display_size()[0])
+                if arrival is not None:
+                    t = arrival - self.game_window.clock.time
+                    if time_to_spawn is None or t < time_to_spawn:
+                        time_to_spawn = t
+
+        # Save the time until the next cluster arrives. The text is made when drawing as the screen moves after the
+        # simulation steps.
+        self.time_until_threat = time_to_spawn
 
         # If there are enemies spawned, count the enemies, for the time factor in waves.
         if len(self.enemy_sprites):
@@ -365,21 +511,201 @@ class EnemyHandler:
         if len(self.enemy_sprites) == 0 and self.total_count_in_clusters <= 0:
             self.setup_wave()
 
-        # Calculate the targets of each enemies.
-        self.do_enemy_targets()
+        # Decide the targets of the enemies, if it is time to.
+        self.do_enemy_targets(delta_time)
 
-    def do_enemy_targets(self):
+    def schedule_cluster(self, cluster, t):
+        # Check if a cluster should spawn at a game time.
+        heapq.heappush(self.cluster_schedule, (t, self.scheduled_clusters, cluster))
+        self.scheduled_clusters += 1
+
+    def check_clusters(self, t):
+        """
+        Check every cluster that is due by a game time. Each is checked once, and if it did not spawn it is scheduled
+        for when it next could.
+
+        :param t: The game time.
+        """
+        due = []
+        while self.cluster_schedule and self.cluster_schedule[0][0] <= t:
+            due.append(heapq.heappop(self.cluster_schedule)[2])
+
+        for cluster in due:
+            if not cluster.spawned:
+                next_check = cluster.spawn_enemies(t)
+                if next_check is not None:
+                    self.schedule_cluster(cluster, next_check)
+
+    def queue_spawn(self, entry):
+        # Queue an enemy a cluster has spawned to be made.
+        self.spawn_queue.append(entry)
+
+    def update_spawn_queue(self, t):
+        """
+        Make the enemies in the spawn queue in order until the spawn budget is spent. At least one is always made so
+        the queue can not stall. If the queue empties with time to spare, the enemies of clusters arriving within the
+        prewarm time are made ready so they only need setting up when they spawn.
+
+        :param t: The game time.
+        """
+        start = time.perf_counter()
+        self.spawned_count = 0
+        self.prepared_count = 0
+
+        while self.spawn_queue:
+            if self.spawned_count and (time.perf_counter() - start) * 1000 > self.spawn_budget:
+                break
+            self.materialize(self.spawn_queue.popleft())
+            self.spawned_count += 1
+
+        # Only prepare the clusters once every spawned enemy is made.
+        if not self.spawn_queue:
+            for cluster in self.clusters:
+                if cluster.spawned or not cluster.unprepared:
+                    continue
+                arrival = cluster.arrival_time(ui.SCREEN_WIDTH)
+                if (arrival is None or arrival - t > self.prewarm_time) and cluster.p_distance > ui.SCREEN_WIDTH * 2:
+                    continue
+                while cluster.unprepared > 0 and (time.perf_counter() - start) * 1000 <= self.spawn_budget:
+                    cluster.prepare_enemy()
+                    self.prepared_count += 1
+
+        self.spawn_time = (time.perf_counter() - start) * 1000
+
+    def materialize(self, entry):
+        """
+        Make an enemy from the spawn queue. It is set up, placed where its cluster spawned it, and added to the enemies.
+
+        :param entry: The PendingEnemy.
+        """
+        cluster = entry.cluster
+        enemy = entry.enemy
+        if enemy is None:
+            enemy = self.enemy_pool.acquire(entry.type_data, entry.bullet_type, self.get_archetype(entry.type_data))
+        enemy.setup(self, entry.target, (entry.center_x, entry.center_y), cluster)
+        enemy.center_x = entry.center_x
+        enemy.center_y = entry.center_y
+        self.game_window.physics_world.sync(enemy)
+        self.enemy_sprites.append(enemy)
+
+        # Once the cluster's last enemy is made its point is no longer needed.
+        cluster.pending -= 1
+        if cluster.pending <= 0:
+            cluster.point.remove_from_sprite_lists()
+
+    def build_neighbour_index(self):
+        # Rebuild the index of where every sprite in the enemy list is. Nothing moves until the physics step so it is
+        # correct for the whole update. Killed enemies remove themselves.
+        self.neighbour_index.clear()
+        for enemy in self.enemy_sprites:
+            self.neighbour_index.insert_point(enemy, enemy.center_x, enemy.center_y)
+
+    def find_neighbours(self, enemy, radius):
+        """
+        Find the sprites in the enemy list near an enemy, not including the enemy.
+
+        :param enemy: The enemy.
+        :param radius: How far away to look. Some sprites found may be up to a cell further away.
+        :return: The list of nearby sprites.
+        """
+        return [neighbour for neighbour in self.neighbour_index.query_radius(enemy.center_x, enemy.center_y, radius)
+                if neighbour is not enemy]
+
+    def check_bullet(self, sprite, shot):
+        # The narrow phase for one bullet and one sprite. A swept bullet that missed where it ended is also checked
+        # along the segment it moved.
+        if collision.check_hit(sprite, shot):
+            return True
+        if self.swept_collisions or shot.swept:
+            return collision.check_swept_hit(sprite, shot, shot.previous_position)
+        return False
+
+    def collision_sprites(self):
+        """
+        Yields every sprite a bullet can hit, in the order hits are found. The enemies, then the player and the
+        station, then the planet and its satellites if any live bullet can hit them.
+        """
+        for enemy in self.enemy_sprites:
+            if type(enemy) != vector.AnimatedTempSprite:
+                yield enemy
+
+        yield self.player
+        if self.target_object is not self.planet_data:
+            yield self.target_object
+
+        planet = self.planet_data
+        if self.bullet_layers & (collision.LAYER_PLANET | collision.LAYER_SATELLITE):
+            yield planet
+            for satellite in planet.satellites:
+                if satellite is not self.target_object:
+                    yield satellite
+
+    def find_hits(self):
+        """
+        The collision pass. Every bullet touching a sprite its mask lets it hit becomes a hit event. The bounding
+        circles and masks are checked for every bullet at once before any exact geometry. Nothing is damaged or killed
+        here. A bullet only ever makes one event, the first
+        sprite it is found touching.
+
+        :return: The list of hit events in the order they should be resolved.
+        """
+        events = []
+        used = set()
+        self.pairs_checked = 0
+        bullet_system = self.game_window.bullet_system
+
+        # The bullets near each sprite and able to hit it are found for all the bullets at once.
+        for sprite in self.collision_sprites():
+            shape = collision.sprite_hit_shape(sprite)
+            if shape is None:
+                continue
+            rows = bullet_system.near(sprite.center_x, sprite.center_y, shape.radius * sprite.scale,
+                                      self.swept_collisions)
+            for row in bullet_system.can_hit_rows(rows, sprite).tolist():
+                if row in used:
+                    continue
+                shot = bullet_system.shot(row)
+                self.pairs_checked += 1
+                if self.check_bullet(sprite, shot):
+                    used.add(row)
+                    events.append(collision.HitEvent(shot, sprite, shot.damage, shot.owner))
+
+        return events
+
+    def resolve_hits(self, events):
+        """
+        The resolution step. Applies the damage, damage frames, sounds and kills of each hit event then kills the
+        bullet. An enemy killed by an earlier event takes no more damage, but the bullets are still used up. A bullet
+        killed by an earlier event, such as with the enemy that fired it, does nothing.
+
+        :param events: The hit events to apply.
+        """
+        killed = set()
+        bullet_system = self.game_window.bullet_system
+        for event in events:
+            if not bullet_system.alive[event.bullet.row]:
+                continue
+            victim = event.victim
+            owner = event.owner
+            if victim in killed:
+                pass
+            elif isinstance(victim, _.Enemy):
+                if victim.take_hit(event.damage):
+                    killed.add(victim)
+            elif isinstance(owner, _.Enemy) and victim.collision_layer & (collision.LAYER_PLAYER |
+                                                                          collision.LAYER_STATION):
+                owner.hit_sprite(victim, event.damage)
+            elif getattr(victim, 'health', 0) > 0:
+                # Anything else with health just takes the damage, anything without it absorbs the bullet.
+                victim.health -= event.damage
+            event.bullet.kill()
+
+    def do_enemy_targets(self, delta_time: float = 1 / 60):
         # Decides whether the enemy should attack the player or the target.
-        # It prioritises the player.
-        player_targets = 0
-        for enemies in self.enemy_sprites:
-            distance = vector.find_distance((self.player.center_x, self.player.center_y),
-                                            (enemies.center_x, enemies.center_y))
-            if distance < ui.SCREEN_WIDTH * 3 and player_targets < self.max_count_in_clusters:
-                enemies.target = self.player
-                player_targets += 1
-            else:
-                enemies.target = self.target_object
+        # It prioritises the closest enemies to the player, up to the most in a cluster.
+        enemies = [enemy for enemy in self.enemy_sprites if type(enemy) != vector.AnimatedTempSprite]
+        self.threat_assigner.on_update(delta_time, enemies, self.player, self.target_object,
+                                       self.max_count_in_clusters)
 
     def assign_player_health(self):
         # If the player is not none calculate the amount of health the player has lost.
@@ -405,13 +731,6 @@ class EnemyHandler:
             self.average_time = total / len(self.wave_times)
         self.engagement = 0
 
-    def pause_delay(self, pause_delay):
-        # If the game was paused, add a time delay to the bullets so they do not despawn.
-        if self.enemy_sprites is not None:
-            for bodies in self.enemy_sprites:
-                for shots in bodies.bullets:
-                    shots.pause_delay += pause_delay
-
     def count_enemy_death(self):
         # If an enemy was killed count this in the mission handler.
         self.mission_handler.current_mission_data['enemies_killed'] += 1
@@ -8,6 +8,10 @@ import json
 import arcade
 
 import game_data.player as player
+import game_data.clock as clock
+import game_data.physics as physics
+import game_data.bullet as bullet
+import game_data.trajectory as trajectory
 import game_data.stars as stars
 import game_data.space as space
 import game_data.mission as mission
@@ -45,6 +49,17 @@ class GameWindow(arcade.View):
         # The Gravity Handler
         self.gravity_handler = None
 
+        # The fixed step clock, and the interpolator for drawing between steps.
+        self.clock = clock.GameClock()
+        self.interpolator = clock.RenderInterpolator()
+
+        # The physics world and the bullet system.
+        self.physics_world = physics.PhysicsWorld()
+        self.bullet_system = bullet.BulletSystem(self.window)
+
+        # The player's predicted path.
+        self.player_trajectory = None
+
         # The Missions
         self.mission = mission.Mission(self)
         self.prev_difficulty = 1.05
@@ -54,7 +69,6 @@ class GameWindow(arcade.View):
         # check if on_update should run.
         self.process = True
         self.changed = False
-        self.pause_delay = 0
 
         # x and y Coordinates for Reset Position
         self.center_x = SCREEN_WIDTH // 2
@@ -125,13 +139,6 @@ class GameWindow(arcade.View):
         self.planet_sprites = {}
 
     def on_show(self):
-        if self.pause_delay != 0:
-            self.pause_delay = time.time() - self.pause_delay
-            for shots in self.player.bullets:
-                shots.pause_delay += self.pause_delay
-            self.mission.enemy_handler.pause_delay(self.pause_delay)
-            self.pause_delay = 0
-
         if self.music.get_stream_position() == 0:
             self.music.play(vector.VOLUME * 0.25)
 
@@ -233,11 +240,11 @@ class GameWindow(arcade.View):
             if self.music.get_stream_position() == 0 and not self.wormhole:
                 self.music.play(vector.VOLUME * 0.25)
 
-            # Gravity Update
-            self.gravity_handler.calculate_each_gravity()
-
-            # Players Update
-            self.player.on_update(delta_time)
+            # Run as many fixed steps as fit in the frame time.
+            for step in range(self.clock.advance(delta_time)):
+                self.interpolator.capture(self.interpolated_sprites())
+                self.clock.tick()
+                self.simulate(self.clock.step)
 
             # Move Viewport
             self.view_port(delta_time)
@@ -250,8 +257,6 @@ class GameWindow(arcade.View):
             self.cursor.center_y = self.bottom_view + self.cursor_screen_pos[1]
             self.player.after_update()
 
-            self.mission.on_update(delta_time)
-
             # Enemy update
             if self.changed:
                 self.mission.check_setup()
@@ -260,6 +265,36 @@ class GameWindow(arcade.View):
         if self.player.dead:
             self.dead_text(delta_time)
 
+    def simulate(self, step):
+        """
+        Runs a single fixed step of the game.
+        :param step: The length of the step.
+        """
+
+        # Gravity Update
+        self.gravity_handler.calculate_each_gravity()
+        self.physics_world.apply_gravity()
+
+        # Players Update
+        self.player.on_update(step)
+
+        # Mission and Enemy Update
+        self.mission.on_update(step)
+
+        # Move every body and bullet.
+        self.physics_world.step(step)
+        self.bullet_system.step(step)
+
+        # Move the player's predicted path along.
+        self.player_trajectory.on_update()
+
+    def interpolated_sprites(self):
+        """
+        Yields the moving sprites outside the physics world.
+        """
+        if self.mission.curr_planet is not None:
+            yield from self.mission.curr_planet.satellites
+
     def view_port(self, delta_time):
         """
         Function for cleaning up on_update.
@@ -271,8 +306,9 @@ class GameWindow(arcade.View):
         prev_value = [self.left_view, self.bottom_view]
 
         # Move the screen pos so the player is in the center.
-        left_view = self.player.center_x - SCREEN_WIDTH/2
-        bottom_view = self.player.center_y - SCREEN_HEIGHT/2
+        player_x, player_y = self.physics_world.position(self.player, self.clock.alpha)
+        left_view = player_x - SCREEN_WIDTH/2
+        bottom_view = player_y - SCREEN_HEIGHT/2
         self.left_view = left_view
         self.bottom_view = bottom_view
 
@@ -300,6 +336,11 @@ class GameWindow(arcade.View):
         self.window.ctx.enable_only(self.window.ctx.BLEND)
         arcade.start_render()
 
+        # Draw the sprites between the last two steps.
+        if self.process:
+            self.interpolator.apply(self.clock.alpha)
+            self.physics_world.apply_interpolation(self.clock.alpha)
+
         # If there are stars draw them.
         if self.star_field.game_view is not None:
             self.star_field.draw()
@@ -319,7 +360,11 @@ class GameWindow(arcade.View):
         if self.wormhole:
             self.worm_sprite.draw()
 
-        # Draw the player.
+        # Draw the bullets, then the player.
+        if self.process:
+            self.bullet_system.draw(self.clock.alpha)
+        else:
+            self.bullet_system.draw()
         self.player.draw()
 
         # Draw the cursor.
@@ -332,6 +377,10 @@ class GameWindow(arcade.View):
                                          SCREEN_WIDTH, SCREEN_HEIGHT,
                                          (0, 0, 0, 255*self.blackout))
 
+        # Move the sprites back.
+        self.interpolator.restore()
+        self.physics_world.restore()
+
     def dead_text(self, delta_time):
         """
         update the death animation, first the blackout then the temporal collapse.
@@ -399,6 +448,12 @@ class GameWindow(arcade.View):
 
         self.gravity_handler = None
 
+        # simulation
+        self.clock.reset()
+        self.interpolator.reset()
+        self.physics_world.reset()
+        self.bullet_system.reset()
+
         # view
         self.left_view = 0
         self.bottom_view = 0
@@ -452,6 +507,8 @@ class GameWindow(arcade.View):
             del self.enemy_handler
 
         self.gravity_handler = space.GravityHandler()
+        self.physics_world = physics.PhysicsWorld()
+        self.bullet_system.reset()
 
         # player
         self.player = player.Player(self.player_ships[self.player_ship], self,
@@ -468,6 +525,12 @@ class GameWindow(arcade.View):
         self.player.center_x = self.mission.target_object.center_x + random.randint(-1250, 1250)
         self.player.center_y = self.mission.target_object.center_y + random.randint(-1250, 1250)
 
+        # simulation
+        self.clock.reset()
+        self.interpolator.reset()
+        self.physics_world.sync(self.player)
+        self.player_trajectory = trajectory.TrajectoryPredictor(self.gravity_handler, self.clock, self.player)
+
         # view
         self.left_view = self.player.center_x - SCREEN_WIDTH/2
         self.bottom_view = self.player.center_y - SCREEN_HEIGHT/2
@@ -504,6 +567,14 @@ class GameWindow(arcade.View):
         self.player.center_x = self.mission.target_object.center_x + random.randint(-1250, 1250)
         self.player.center_y = self.mission.target_object.center_y + random.randint(-1250, 1250)
 
+        # simulation
+        self.clock.reset()
+        self.interpolator.reset()
+        self.physics_world.reset()
+        self.physics_world.add(self.player, 0)
+        self.bullet_system.reset()
+        self.player_trajectory.reset()
+
         # view
         self.left_view = self.player.center_x - (SCREEN_WIDTH/2)
         self.bottom_view = self.player.center_y - (SCREEN_HEIGHT/2)
@@ -545,7 +616,6 @@ class GameWindow(arcade.View):
 
             elif key == arcade.key.ESCAPE:
                 # Open the map
-                self.pause_delay = time.time()
                 self.open_map()
 
     def on_key_release(self, key, modifier):
@@ -0,0 +1,11 @@
+#version 330
+uniform sampler2D texture0;
+
+in vec2 uv;
+
+out vec4 fragColor;
+
+void main(){
+
+    fragColor = texture(texture0, uv);
+}
@@ -0,0 +1,32 @@
+#version 330
+
+//the left, bottom, width and height of the viewport
+uniform vec4 view;
+
+//the width and height of the bullet's texture once scaled
+uniform vec2 size;
+
+//the corner of the quad and its texture coordinate
+in vec2 in_vert;
+in vec2 in_uv;
+
+//the position and angle of each bullet
+in vec2 in_pos;
+in float in_angle;
+
+out vec2 uv;
+
+void main() {
+
+    // Rotate the corner by the bullet's angle then move it to the bullet.
+    float rad_angle = radians(in_angle);
+    vec2 corner = in_vert * size;
+    vec2 rotated = vec2(corner.x * cos(rad_angle) - corner.y * sin(rad_angle),
+                        corner.x * sin(rad_angle) + corner.y * cos(rad_angle));
+    vec2 world_pos = in_pos + rotated;
+
+    uv = in_uv;
+
+    // Convert to the -1 to 1 scale of the viewport.
+    gl_Position = vec4((world_pos - view.xy) / view.zw * 2.0 - 1.0, 0.0, 1);
+}
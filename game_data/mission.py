@@ -3,6 +3,7 @@ import random
 import copy as c
 
 import game_data.space as space
+import game_data.collision as collision
 import game_data.enemy_handler as enemy_handler
 
 # Mission Generator.
@@ -220,6 +221,9 @@ class Mission:
         self.level_data = level_data
         self.current_mission_data = dict(self.base_mission_data)
 
+        # The last mission's handler is finished with, so its AI worker is stopped.
+        if self.enemy_handler is not None:
+            self.enemy_handler.close()
         self.enemy_handler = None
         self.curr_planet = None
 
@@ -243,6 +247,7 @@ class Mission:
         for satellite in self.curr_planet.satellites:
             if satellite.type == self.level_data['company']:
                 self.target_object = satellite
+                self.target_object.collision_layer = collision.LAYER_STATION
                 break
         if self.target_object is None:
             # If the satellite does not exist then there has been a generation error.
@@ -0,0 +1,194 @@
+import numpy as np
+
+# The number of bodies the world has room for at the start, it doubles whenever it is full.
+INITIAL_CAPACITY = 256
+
+
+class PhysicsWorld:
+    """
+    Moves every body but the bullets in one batched step, each body a row of the arrays. A body's velocity and
+    gravity_acceleration are views of its row, but its position is not: setting center_x or center_y is overwritten
+    by the next step unless sync is called after.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        # The arrays of every body. Each row is a body.
+        self.positions = np.zeros((capacity, 2))
+        self.previous_positions = np.zeros((capacity, 2))
+        self.velocities = np.zeros((capacity, 2))
+        self.accelerations = np.zeros((capacity, 2))
+        self.gravity_scales = np.zeros(capacity)
+        self.active = np.zeros(capacity, dtype=bool)
+
+        # The body in each used row, and the rows that are free.
+        self.bodies = {}
+        self.free_rows = list(range(capacity - 1, -1, -1))
+
+        # The simulated positions of the bodies while they are drawn at their interpolated positions.
+        self.stored = False
+
+    @property
+    def capacity(self):
+        return len(self.positions)
+
+    def grow(self):
+        """
+        Double the size of every array and remake the bodies' views.
+        """
+        old_capacity = self.capacity
+        new_capacity = old_capacity * 2
+
+        def _resize(array):
+            new_array = np.zeros((new_capacity,) + array.shape[1:], dtype=array.dtype)
+            new_array[:old_capacity] = array
+            return new_array
+
+        self.positions = _resize(self.positions)
+        self.previous_positions = _resize(self.previous_positions)
+        self.velocities = _resize(self.velocities)
+        self.accelerations = _resize(self.accelerations)
+        self.gravity_scales = _resize(self.gravity_scales)
+        self.active = _resize(self.active)
+
+        self.free_rows = list(range(new_capacity - 1, old_capacity - 1, -1)) + self.free_rows
+        for row, body in self.bodies.items():
+            self.bind(body, row)
+
+    def bind(self, body, row):
+        # Give the body views of its row.
+        body.physics_world = self
+        body.physics_row = row
+        body.velocity = self.velocities[row]
+        body.gravity_acceleration = self.accelerations[row]
+
+    def owns(self, body):
+        # Whether the body currently has a row in this world.
+        return self.bodies.get(getattr(body, 'physics_row', None)) is body
+
+    def add(self, body, gravity_scale: float = 1.0):
+        """
+        Give a body a row in the world. Its current position, velocity and gravity acceleration are copied in.
+
+        :param body: The sprite to add, it must have a velocity.
+        :param gravity_scale: How much of the body's gravity acceleration is applied each step.
+        """
+        if self.owns(body):
+            self.sync(body)
+            self.gravity_scales[body.physics_row] = gravity_scale
+            return
+
+        if not self.free_rows:
+            self.grow()
+        row = self.free_rows.pop()
+
+        self.positions[row] = body.center_x, body.center_y
+        self.previous_positions[row] = self.positions[row]
+        self.velocities[row] = body.velocity[0], body.velocity[1]
+        gravity_acceleration = getattr(body, 'gravity_acceleration', (0.0, 0.0))
+        self.accelerations[row] = gravity_acceleration[0], gravity_acceleration[1]
+        self.gravity_scales[row] = gravity_scale
+        self.active[row] = True
+
+        self.bodies[row] = body
+        self.bind(body, row)
+
+    def remove(self, body):
+        """
+        Free the row of a body, giving it plain lists in place of its views.
+
+        :param body: The sprite to remove.
+        """
+        if not self.owns(body):
+            return
+
+        row = body.physics_row
+        body.velocity = self.velocities[row].tolist()
+        body.gravity_acceleration = self.accelerations[row].tolist()
+        body.physics_world = None
+        body.physics_row = None
+
+        self.velocities[row] = 0.0
+        self.accelerations[row] = 0.0
+        self.gravity_scales[row] = 0.0
+        self.active[row] = False
+
+        del self.bodies[row]
+        self.free_rows.append(row)
+
+    def sync(self, body):
+        """
+        Copy the sprite position of a body into the world. Used whenever a body is teleported.
+
+        :param body: The sprite that was moved.
+        """
+        if self.owns(body):
+            self.positions[body.physics_row] = body.center_x, body.center_y
+            self.previous_positions[body.physics_row] = self.positions[body.physics_row]
+
+    def set_gravity_scale(self, body, gravity_scale: float):
+        # Change how much of a body's gravity acceleration is applied.
+        if self.owns(body):
+            self.gravity_scales[body.physics_row] = gravity_scale
+
+    def apply_gravity(self):
+        """
+        Add every body's gravity acceleration to its velocity, before the player and enemies update.
+        """
+        active = self.active
+        self.velocities[active] += self.accelerations[active] * self.gravity_scales[active, np.newaxis]
+
+    def step(self, delta_time: float):
+        """
+        Move every body by its velocity and write the positions back to the sprites.
+
+        :param delta_time: The length of the step.
+        """
+        active = self.active
+        self.previous_positions[:] = self.positions
+        self.positions[active] += self.velocities[active] * delta_time
+
+        self.write_positions(self.positions)
+
+    def write_positions(self, positions):
+        # Move every body's sprite to its row of the given positions.
+        rows = positions.tolist()
+        for row, body in self.bodies.items():
+            body.position = rows[row][0], rows[row][1]
+
+    def position(self, body, alpha: float = 1.0):
+        """
+        Find the position of a body between the last two steps without moving it.
+
+        :param body: The body.
+        :param alpha: How far between the last two steps.
+        :return: The x and y position.
+        """
+        if not self.owns(body):
+            return body.center_x, body.center_y
+
+        previous = self.previous_positions[body.physics_row]
+        current = self.positions[body.physics_row]
+        return tuple((previous + (current - previous) * alpha).tolist())
+
+    def previous_position(self, body):
+        # The position of a body before the last step. Bodies outside the world have not moved.
+        if not self.owns(body):
+            return body.center_x, body.center_y
+        return tuple(self.previous_positions[body.physics_row].tolist())
+
+    def apply_interpolation(self, alpha: float):
+        # Move every body's sprite to between the last two steps for drawing.
+        self.write_positions(self.previous_positions + (self.positions - self.previous_positions) * alpha)
+        self.stored = True
+
+    def restore(self):
+        # Move every body's sprite back to its simulated position after drawing.
+        if self.stored:
+            self.write_positions(self.positions)
+            self.stored = False
+
+    def reset(self):
+        # Free every row, used when a mission restarts.
+        for body in list(self.bodies.values()):
+            self.remove(body)
+        self.stored = False
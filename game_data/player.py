@@ -4,9 +4,24 @@ import json
 
 import arcade
 
-import game_data.bullet as bullet
 import game_data.ui as ui
 import game_data.vector as vector
+import game_data.collision as collision
+
+# The player's hit box. It follows the outline of the ship so it is not convex.
+HIT_BOX = ((-145, -5), (-145, 5), (-105, 5), (-105, 15), (-75, 15), (-75, 25), (-135, 25), (-135, 35),
+           (-125, 35), (-125, 55), (-115, 55), (-115, 75), (-85, 75), (-85, 105), (-125, 105), (-125, 135),
+           (-135, 135), (-135, 155), (-145, 155), (-145, 185), (-125, 185), (-125, 195), (-165, 195),
+           (-165, 205), (-135, 205), (-135, 215), (-35, 215), (-35, 205), (25, 205), (25, 195), (85, 195),
+           (85, 185), (125, 185), (125, 175), (135, 175), (135, 165), (145, 165), (145, 155), (155, 155),
+           (155, 135), (165, 135), (165, 55), (115, 55), (115, 45), (65, 45), (65, 35), (75, 35), (75, 15),
+           (85, 15), (85, -15), (75, -15), (75, -35), (65, -35), (65, -45), (115, -45), (115, -55),
+           (165, -55), (165, -135), (155, -135), (155, -155), (145, -155), (145, -165), (135, -165),
+           (135, -175), (125, -175), (125, -185), (85, -185), (85, -195), (25, -195), (25, -205),
+           (-35, -205), (-35, -215), (-135, -215), (-135, -205), (-165, -205), (-165, -195), (-125, -195),
+           (-125, -185), (-145, -185), (-145, -155), (-135, -155), (-135, -135), (-125, -135),
+           (-125, -105), (-85, -105), (-85, -75), (-115, -75), (-115, -55), (-125, -55), (-125, -35),
+           (-135, -35), (-135, -25), (-75, -25), (-75, -15), (-105, -15), (-105, -5))
 
 
 class Player(arcade.Sprite):
@@ -26,6 +41,7 @@ class Player(arcade.Sprite):
              "speed": 420,
              "age": 2,
              "damage": 4,
+             "collision_mask": ["enemy", "boss"],
              "hit_box": [[-20.0, 40.0], [-20.0, -40.0], [0.0, -60.0], [0.0, -70.0], [40.0, -80.0], [100.0, -80.0],
                          [120.0, -70.0], [140.0, -60.0], [150.0, -50.0], [160.0, -30.0], [160.0, 30.0], [150.0, 50.0],
                          [140.0, 60.0], [120.0, 70.0], [100.0, 80.0], [40.0, 80.0], [0.0, 70.0], [0.0, 60.0],
@@ -133,6 +149,11 @@ class Player(arcade.Sprite):
         self.velocity = [0.0, 0.0]
         self.speed = 0
 
+        # The physics world moves the player, gravity is applied once the player has moved.
+        self.physics_world = None
+        self.physics_row = None
+        self.holder.physics_world.add(self, 0)
+
         # Variables for turning
         self.correcting = False
         self.turn_key = False
@@ -161,28 +182,16 @@ class Player(arcade.Sprite):
         # shooting variables
         self.shooting = False
         self.delay = self.base_delay
-        self.bullets = arcade.SpriteList()
         self.last_shot = 0
 
         # Enemy Pointer Variables
         self.enemy_handler = None
         self.enemy_pointers = arcade.SpriteList()
 
-        # hit box
-        point_list = ((-145, -5), (-145, 5), (-105, 5), (-105, 15), (-75, 15), (-75, 25), (-135, 25), (-135, 35),
-                      (-125, 35), (-125, 55), (-115, 55), (-115, 75), (-85, 75), (-85, 105), (-125, 105), (-125, 135),
-                      (-135, 135), (-135, 155), (-145, 155), (-145, 185), (-125, 185), (-125, 195), (-165, 195),
-                      (-165, 205), (-135, 205), (-135, 215), (-35, 215), (-35, 205), (25, 205), (25, 195), (85, 195),
-                      (85, 185), (125, 185), (125, 175), (135, 175), (135, 165), (145, 165), (145, 155), (155, 155),
-                      (155, 135), (165, 135), (165, 55), (115, 55), (115, 45), (65, 45), (65, 35), (75, 35), (75, 15),
-                      (85, 15), (85, -15), (75, -15), (75, -35), (65, -35), (65, -45), (115, -45), (115, -55),
-                      (165, -55), (165, -135), (155, -135), (155, -155), (145, -155), (145, -165), (135, -165),
-                      (135, -175), (125, -175), (125, -185), (85, -185), (85, -195), (25, -195), (25, -205),
-                      (-35, -205), (-35, -215), (-135, -215), (-135, -205), (-165, -205), (-165, -195), (-125, -195),
-                      (-125, -185), (-145, -185), (-145, -155), (-135, -155), (-135, -135), (-125, -135),
-                      (-125, -105), (-85, -105), (-85, -75), (-115, -75), (-115, -55), (-125, -55), (-125, -35),
-                      (-135, -35), (-135, -25), (-75, -25), (-75, -15), (-105, -15), (-105, -5))
-        self.points = point_list
+        # hit box, and the cached hit shape used for collisions.
+        self.points = HIT_BOX
+        self.hit_shape = collision.get_hit_shape(HIT_BOX)
+        self.collision_layer = collision.LAYER_PLAYER
 
         # The amount of scrap.
         self.scrap = 0
@@ -224,7 +233,8 @@ class Player(arcade.Sprite):
 
         # Gravity_variables.
         self.gravity_influences = []
-        self.gravity_acceleration = [0.0, 0.0]
+        self.gravity_acceleration[0] = 0.0
+        self.gravity_acceleration[1] = 0.0
 
         # Ui.
         self.collision_warning = False
@@ -241,7 +251,8 @@ class Player(arcade.Sprite):
         self.thrusters_output = {'l': 0, 'lc': 0, 'rc': 0, 'r': 0}
         self.forward_force = 0
         self.acceleration = [0.0, 0.0]
-        self.velocity = [0.0, 0.0]
+        self.velocity[0] = 0.0
+        self.velocity[1] = 0.0
 
         # Variables for turning.
         self.correcting = False
@@ -260,7 +271,6 @@ class Player(arcade.Sprite):
         # Shooting variables.
         self.shooting = False
         self.delay = self.base_delay
-        self.bullets = arcade.SpriteList()
         self.last_shot = 0
 
         # Enemy Pointer Variables
@@ -273,20 +283,7 @@ class Player(arcade.Sprite):
         self.angle = 0
 
         # Hit box.
-        point_list = ((-145, -5), (-145, 5), (-105, 5), (-105, 15), (-75, 15), (-75, 25), (-135, 25), (-135, 35),
-                      (-125, 35), (-125, 55), (-115, 55), (-115, 75), (-85, 75), (-85, 105), (-125, 105), (-125, 135),
-                      (-135, 135), (-135, 155), (-145, 155), (-145, 185), (-125, 185), (-125, 195), (-165, 195),
-                      (-165, 205), (-135, 205), (-135, 215), (-35, 215), (-35, 205), (25, 205), (25, 195), (85, 195),
-                      (85, 185), (125, 185), (125, 175), (135, 175), (135, 165), (145, 165), (145, 155), (155, 155),
-                      (155, 135), (165, 135), (165, 55), (115, 55), (115, 45), (65, 45), (65, 35), (75, 35), (75, 15),
-                      (85, 15), (85, -15), (75, -15), (75, -35), (65, -35), (65, -45), (115, -45), (115, -55),
-                      (165, -55), (165, -135), (155, -135), (155, -155), (145, -155), (145, -165), (135, -165),
-                      (135, -175), (125, -175), (125, -185), (85, -185), (85, -195), (25, -195), (25, -205),
-                      (-35, -205), (-35, -215), (-135, -215), (-135, -205), (-165, -205), (-165, -195), (-125, -195),
-                      (-125, -185), (-145, -185), (-145, -155), (-135, -155), (-135, -135), (-125, -135),
-                      (-125, -105), (-85, -105), (-85, -75), (-115, -75), (-115, -55), (-125, -55), (-125, -35),
-                      (-135, -35), (-135, -25), (-75, -25), (-75, -15), (-105, -15), (-105, -5))
-        self.points = point_list
+        self.points = HIT_BOX
 
     def on_update(self, delta_time: float = 1 / 60):
 
@@ -311,9 +308,7 @@ class Player(arcade.Sprite):
         if self.over_heating:
             self.shooting = False
 
-        # update the bullets, and shoot if the player is not over heating
-        # and the time has been long enough from last shot
-        self.bullets.on_update(delta_time)
+        # shoot if the player is not over heating and the time has been long enough from last shot.
         if self.shooting and self.last_shot + self.delay < time.time() and self.heat_level < 1:
 
             # Shoot and heat up the player.
@@ -354,7 +349,6 @@ class Player(arcade.Sprite):
         if not self.dead:
             self.ui.under_draw()
             self.enemy_pointers.draw()
-            self.bullets.draw()
         super().draw()
         if not self.dead:
             if self.alt:
@@ -466,13 +460,12 @@ class Player(arcade.Sprite):
         self.velocity[0] += self.acceleration[0]
         self.velocity[1] += self.acceleration[1]
 
-        # If the player has moved apply gravity to them.
-        if self.start > 1:
-            self.velocity[0] += self.gravity_acceleration[0] * self.gravity_weakener
-            self.velocity[1] += self.gravity_acceleration[1] * self.gravity_weakener
+        # If the player has moved the physics world applies gravity to them, from the start of the next step.
+        if self.physics_world is not None:
+            self.physics_world.set_gravity_scale(self, self.gravity_weakener if self.start > 1 else 0)
 
     def move(self, delta_time):
-        # Move the player based on their angular and liner velocity.
+        # Turn the player based on their angular velocity. The physics world moves them with their linear velocity.
         self.angle += self.angle_velocity * delta_time
         if self.angle > 360:
             self.angle -= 360
@@ -487,9 +480,6 @@ class Player(arcade.Sprite):
                 self.velocity[1] = (self.velocity[1]/self.speed) * self.max_speed
                 self.speed = self.max_speed
 
-        self.center_x += self.velocity[0] * delta_time
-        self.center_y += self.velocity[1] * delta_time
-
     """
     Other Methods
     """
@@ -601,8 +591,8 @@ class Player(arcade.Sprite):
         # Shoot a bullet and play the shooting audio.
         self.shot_audio.play(volume=0.2)
         self.bullet_type['damage'] = self.total_damage
-        shot = bullet.Bullet([self.center_x, self.center_y], self.angle, self.velocity, self.bullet_type)
-        self.bullets.append(shot)
+        self.holder.bullet_system.fire([self.center_x, self.center_y], self.angle, self.velocity, self.bullet_type,
+                                       self)
 
     def clear_upgrades(self):
         # Reset the current_upgrade_data.json file.
@@ -0,0 +1,67 @@
+class Pool:
+    """
+    A Pool keeps objects that are no longer used so they can be used again, rather than making new ones. Waves and
+    firefights then reuse the same enemies, scrap and explosions instead of leaving the old ones to the garbage
+    collector.
+
+    The pooled class is made with the same arguments acquire is given. When an object is reused its reuse method is
+    called with them instead, which must reset it in place. An object knows its pool and releases itself when it is
+    killed.
+    """
+
+    def __init__(self, factory):
+        # The class or function that makes a new object.
+        self.factory = factory
+
+        # The released objects waiting to be used again, and their ids so none is released twice.
+        self.free = []
+        self.free_ids = set()
+
+        # The number of objects in use, the most that have ever been in use at once, and the number made and reused.
+        self.in_use = 0
+        self.high_water = 0
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args, **kwargs):
+        """
+        Take an object from the pool, or make a new one if there are none free.
+
+        :return: The object, reset with the arguments.
+        """
+        if self.free:
+            item = self.free.pop()
+            self.free_ids.discard(id(item))
+            item.reuse(*args, **kwargs)
+            self.reused += 1
+        else:
+            item = self.factory(*args, **kwargs)
+            self.created += 1
+
+        item.pool = self
+        self.in_use += 1
+        if self.in_use > self.high_water:
+            self.high_water = self.in_use
+        return item
+
+    def release(self, item):
+        """
+        Give an object back to the pool. Releasing an object that is already free does nothing.
+
+        :param item: The object.
+        """
+        if id(item) in self.free_ids:
+            return
+        self.free.append(item)
+        self.free_ids.add(id(item))
+        self.in_use -= 1
+
+    def clear(self):
+        # Forget every free object.
+        self.free = []
+        self.free_ids = set()
+
+    @property
+    def size(self):
+        # The number of objects the pool has made that are still held, in use or free.
+        return self.in_use + len(self.free)
@@ -2,87 +2,346 @@ import math
 import random
 
 import arcade
+import numpy as np
 
-import game_data.vector as vector
+import game_data.clock as clock
+import game_data.collision as collision
 
 # the gravity constant for calculations.
 GRAVITY_CONSTANT = 6.67408 * 10 ** (-12)
 
+# The number of samples inside and outside of an influence in each radial acceleration table, how far past the edge
+# of the influence the table reaches, and the maximum number of tables kept at once.
+RADIAL_TABLE_INSIDE_SAMPLES = 64
+RADIAL_TABLE_OUTSIDE_SAMPLES = 448
+RADIAL_TABLE_RANGE = 60000
+RADIAL_TABLE_CACHE_SIZE = 32
+
+# Accelerations smaller than the epsilon are skipped. A body further than the sleep distance from where every influence
+# is skipped, even once the influence has moved as far as it can in the sleep ticks, sleeps. It reuses its last
+# acceleration until it moves the sleep distance or the sleep ticks run out.
+GRAVITY_EPSILON = 0.01
+SLEEP_DISTANCE = 500
+SLEEP_TICKS = 120
+
+# The cached radial tables, keyed by (weight, radius, width).
+RADIAL_TABLES = {}
+
+
+class RadialTable:
+    """
+    A precomputed table of the acceleration an influence causes at every distance from its center. As the weight,
+    width and planetary radius of an influence never change its pull is only a function of distance.
+
+    Positive accelerations pull towards the influence while negative accelerations push out of it.
+    """
+
+    def __init__(self, weight, radius, width):
+        self.weight = weight
+        self.radius = radius
+        self.half_width = width / 2
+
+        # The samples inside the influence, then the samples outside of it. The outside samples are closer together
+        # near the edge where the acceleration changes the most. The push out is a step so the edge is sampled twice.
+        inside = np.linspace(0.0, self.half_width, RADIAL_TABLE_INSIDE_SAMPLES)
+        spread = np.linspace(0.0, 1.0, RADIAL_TABLE_OUTSIDE_SAMPLES)[1:] ** 2
+        outside = self.half_width + spread * RADIAL_TABLE_RANGE
+        edge = np.nextafter(self.half_width, np.inf)
+
+        self.distances = np.concatenate((inside, [edge], outside))
+        self.accelerations = self.calculate(self.distances)
+        self.max_distance = self.distances[-1]
+
+    def calculate(self, base_distance):
+        """
+        Calculate the exact acceleration at a distance from the center of the influence.
+        Used to build the table and for anything beyond the table.
+        """
+
+        # because the scale on screen is not the true scale an extra distance must be added to the sprite
+        # without this the planet sprites would have to be 12 million pixels in size.
+        # (to have a similar gravity to earth)
+        distance = base_distance - self.half_width + self.radius
+        acceleration = (GRAVITY_CONSTANT * self.weight) / (distance ** 2)
+
+        # if the distance is within the radius of the influence push out of the influence.
+        return np.where(base_distance <= self.half_width, acceleration * -25, acceleration)
+
+    def cutoff_distance(self, epsilon):
+        """
+        Find the distance from the center past which the acceleration is smaller than epsilon.
+        Objects inside the influence are never past the cutoff as they must be pushed out.
+        """
+        if epsilon <= 0:
+            return np.inf
+        cutoff = math.sqrt((GRAVITY_CONSTANT * self.weight) / epsilon) + self.half_width - self.radius
+        return max(cutoff, self.half_width)
+
+    def sample(self, base_distance):
+        """
+        Interpolate the acceleration at each distance, anything further than the table is calculated exactly.
+        """
+        acceleration = np.interp(base_distance, self.distances, self.accelerations)
+        beyond = base_distance > self.max_distance
+        if np.any(beyond):
+            acceleration = np.where(beyond, self.calculate(base_distance), acceleration)
+        return acceleration
+
+
+def get_radial_table(weight, radius, width):
+    """
+    Find the radial table of an influence, creating it if it has not been made yet.
+    Regenerating the same mission reuses the tables already made.
+    """
+    key = (weight, radius, width)
+    table = RADIAL_TABLES.get(key)
+    if table is None:
+        # If there are too many tables remove the oldest one.
+        if len(RADIAL_TABLES) >= RADIAL_TABLE_CACHE_SIZE:
+            RADIAL_TABLES.pop(next(iter(RADIAL_TABLES)))
+        table = RadialTable(weight, radius, width)
+        RADIAL_TABLES[key] = table
+    return table
+
 
 class GravityHandler:
     """
     Handles all of the gravity accelerations of each object in game.
+
+    The influences are stored as contiguous numpy arrays so every object and influence pair can be calculated in a
+    single broadcast pass. Each row is a gravity object and each column is a gravity influence.
     """
 
-    def __init__(self):
+    def __init__(self, epsilon: float = GRAVITY_EPSILON, sleep_distance: float = SLEEP_DISTANCE):
         # The gravity influences, the objects that accelerate other object towards the.
         self.gravity_influences = arcade.SpriteList()
 
         # The gravity objects, the objects that get affected by gravity.
         self.gravity_objects = arcade.SpriteList()
 
+        # The arrays of the influences, these only change when an influence is added or removed.
+        self.influences_changed = True
+        self.influence_positions = np.zeros((0, 2))
+        self.influence_half_widths = np.zeros(0)
+        self.influence_cutoffs = np.zeros(0)
+        self.influence_travel = np.zeros(0)
+        self.influence_tables = []
+
+        # The smallest acceleration that is calculated, and how far sleeping bodies can move before waking.
+        self.epsilon = epsilon
+        self.sleep_distance = sleep_distance
+
+        # The sleeping bodies, with the position they fell asleep at and the calculation they wake up on.
+        self.sleeping = {}
+        self.calculations = 0
+
+        # The number of object and influence pairs evaluated and culled, and the bodies asleep, in the last calculation.
+        self.pairs_evaluated = 0
+        self.pairs_culled = 0
+        self.bodies_sleeping = 0
+
     def set_gravity_object_influence(self, gravity_object):
         # adds a gravity influence.
         gravity_object.gravity_handler = self
         self.gravity_influences.append(gravity_object)
+        self.influences_changed = True
 
     def set_gravity_object(self, gravity_object):
         # adds a gravity object.
         gravity_object.gravity_handler = self
         self.gravity_objects.append(gravity_object)
 
-    def calculate_each_gravity(self):
-
-        # ### IT EXPECTS EACH OBJECT TO BE A SPRITE HOWEVER THAT IS NOT THE CASE SO IT COMPLAINS ###
-
-        # for every gravity object calculate the gravity of evey influence and accelerate the object.
-        for gravity_object in self.gravity_objects:
-            gravity_object.gravity_acceleration = [0.0, 0.0]
-            gravity_object.gravity_influences = []
-            for influences in self.gravity_influences:
-
-                # create vectors of the two objects positions. and find the distance from the objects.
-                gravity_pos = (gravity_object.center_x, gravity_object.center_y)
-                inf_pos = influences.center_x, influences.center_y
-                base_distance = vector.find_distance(gravity_pos, inf_pos)
-
-                # because the scale on screen is not the true scale an extra distance must be added to the sprite
-                # without this the planet sprites would have to be 12 million pixels in size.
-                # (to have a similar gravity to earth)
-                distance = base_distance - (
-                        influences.width / 2) + influences.planetary_radius
-
-                # find the direction towards the influence.
-                direction = math.radians(vector.find_angle(inf_pos, gravity_pos))
-
-                # calculate the force the influence and the acceleration of the object.
-                force = (GRAVITY_CONSTANT * gravity_object.weight * influences.weight) / (distance ** 2)
-                acceleration = force / gravity_object.weight
-
-                # if the object is within the radius of the influence push them out of the influence.
-                if base_distance <= influences.width / 2:
-                    acceleration = force * 25 / gravity_object.weight
-                    direction += math.pi
-
-                    # if the objects health is greater than Zero damage them.
-                    if gravity_object.health > 0:
-                        gravity_object.health -= 1
+    def set_epsilon(self, epsilon):
+        # Change the smallest acceleration that is calculated. The cutoffs must be rebuilt.
+        self.epsilon = epsilon
+        self.sleeping = {}
+        self.influences_changed = True
+
+    def build_influence_arrays(self):
+        """
+        Rebuilds the width and cutoff arrays and radial tables of the influences. Their positions are refreshed every
+        calculation as satellites orbit.
+        """
+        influences = list(self.gravity_influences)
+        self.influence_positions = np.zeros((len(influences), 2))
+        self.influence_half_widths = np.array([influence.width / 2 for influence in influences], dtype=float)
+        self.influence_tables = [influence.radial_table for influence in influences]
+        self.influence_cutoffs = np.array([table.cutoff_distance(self.epsilon) for table in self.influence_tables],
+                                          dtype=float)
+
+        # The furthest each influence can move while a body sleeps. Satellites travel at 30 times their speed, planets
+        # do not move.
+        self.influence_travel = np.array([getattr(influence, 'speed', 0) * 30 * SLEEP_TICKS * clock.SIMULATION_STEP
+                                          for influence in influences], dtype=float)
+        self.influences_changed = False
+
+    def find_awake(self, objects):
+        """
+        Find which objects need their gravity calculated. A sleeping object stays asleep until it moves the sleep
+        distance from where it fell asleep, or it has slept for the sleep ticks.
+
+        :param objects: The gravity objects.
+        :return: The objects that are awake.
+        """
+        if not self.sleeping:
+            return objects
+
+        awake = []
+        sleeping = {}
+        for gravity_object in objects:
+            sleep = self.sleeping.get(gravity_object)
+            if sleep is not None:
+                d_x = gravity_object.center_x - sleep[0]
+                d_y = gravity_object.center_y - sleep[1]
+                if d_x ** 2 + d_y ** 2 < self.sleep_distance ** 2 and self.calculations < sleep[2]:
+                    sleeping[gravity_object] = sleep
+                    continue
+            awake.append(gravity_object)
+
+        # Only keep the objects still asleep, this also forgets killed objects.
+        self.sleeping = sleeping
+        return awake
+
+    def acceleration_at(self, x, y, t=None):
+        """
+        Find the gravity acceleration at a point without changing any gravity object. If a game time is given the
+        orbiting influences are placed where they will be at that time, this lets paths be predicted ahead.
+
+        :param x: The x position.
+        :param y: The y position.
+        :param t: The game time, or None to use where the influences are now.
+        :return: The x and y acceleration.
+        """
+        if self.influences_changed or len(self.influence_tables) != len(self.gravity_influences):
+            self.build_influence_arrays()
+            self.sleeping = {}
+
+        a_x, a_y = 0.0, 0.0
+        for influence, table, cutoff in zip(self.gravity_influences, self.influence_tables, self.influence_cutoffs):
+            if t is not None and hasattr(influence, 'position_at'):
+                inf_x, inf_y = influence.position_at(t)
+            else:
+                inf_x, inf_y = influence.center_x, influence.center_y
+
+            # Skip any influence too far away to matter, just like calculate_each_gravity.
+            d_x = inf_x - x
+            d_y = inf_y - y
+            distance = math.sqrt(d_x ** 2 + d_y ** 2)
+            if distance > cutoff:
+                continue
+
+            acceleration = float(table.sample(distance))
+            if distance:
+                a_x += d_x / distance * acceleration
+                a_y += d_y / distance * acceleration
+            else:
+                a_x += acceleration
 
-                # the acceleration as a vector.
-                a_x = math.cos(direction) * acceleration
-                a_y = math.sin(direction) * acceleration
-                acceleration_vector = (a_x, a_y)
+        return a_x, a_y
 
-                # apply the acceleration.
-                gravity_object.gravity_influences.append(acceleration_vector)
-                gravity_object.gravity_acceleration[0] += a_x
-                gravity_object.gravity_acceleration[1] += a_y
+    def calculate_each_gravity(self):
+        """
+        Calculate the gravity of every influence on every gravity object in one pass, then accelerate the objects.
+        """
+
+        self.calculations += 1
+        self.pairs_evaluated = 0
+        self.pairs_culled = 0
+        self.bodies_sleeping = 0
+
+        objects = list(self.gravity_objects)
+        if not len(objects):
+            return
+
+        # If an influence was added or killed the arrays must be rebuilt.
+        if self.influences_changed or len(self.influence_tables) != len(self.gravity_influences):
+            self.build_influence_arrays()
+            self.sleeping = {}
+
+        # If there are no influences there is no gravity.
+        if not len(self.influence_tables):
+            for gravity_object in objects:
+                gravity_object.gravity_acceleration[0] = 0.0
+                gravity_object.gravity_acceleration[1] = 0.0
+                gravity_object.gravity_influences = []
+            return
+
+        # Sleeping objects reuse their last acceleration, so their pairs are culled.
+        num_objects = len(objects)
+        objects = self.find_awake(objects)
+        self.bodies_sleeping = num_objects - len(objects)
+        self.pairs_culled = self.bodies_sleeping * len(self.influence_tables)
+        if not len(objects):
+            return
+
+        # create arrays of the positions, then find the offset and distance from every object to every influence.
+        object_positions = np.array([(gravity_object.center_x, gravity_object.center_y) for gravity_object in objects],
+                                    dtype=float)
+        self.influence_positions[:] = [(influence.center_x, influence.center_y)
+                                       for influence in self.gravity_influences]
+        offset = self.influence_positions[np.newaxis, :, :] - object_positions[:, np.newaxis, :]
+        base_distance = np.hypot(offset[:, :, 0], offset[:, :, 1])
+
+        # sample the acceleration of each object from each influence's radial table.
+        # The weight of the object cancels out of the force, and the table already pushes objects out of influences.
+        # Any pair past the influence's cutoff is too weak to matter and is skipped.
+        within = base_distance <= self.influence_cutoffs
+        acceleration = np.zeros_like(base_distance)
+        for column, table in enumerate(self.influence_tables):
+            rows = np.flatnonzero(within[:, column])
+            if len(rows):
+                acceleration[rows, column] = table.sample(base_distance[rows, column])
+
+        evaluated = int(np.count_nonzero(within))
+        self.pairs_evaluated = evaluated
+        self.pairs_culled += within.size - evaluated
+
+        # the objects that are far past the cutoff of every influence fall asleep, as long as no influence can move
+        # close enough to reach them before they wake.
+        margin = (base_distance - self.influence_cutoffs - self.influence_travel).min(axis=1)
+        asleep = (margin > self.sleep_distance).tolist()
+
+        # the objects within the radius of an influence.
+        inside = base_distance <= self.influence_half_widths
+
+        # find the direction towards the influence. If they share a position the direction is 0 degrees.
+        touching = base_distance == 0
+        safe_distance = np.where(touching, 1.0, base_distance)
+        direction_x = np.where(touching, 1.0, offset[:, :, 0] / safe_distance)
+        direction_y = offset[:, :, 1] / safe_distance
+
+        # the acceleration as vectors, and the total acceleration of each object.
+        a_x = direction_x * acceleration
+        a_y = direction_y * acceleration
+        acceleration_vectors = np.stack((a_x, a_y), axis=-1).tolist()
+        totals = np.stack((a_x.sum(axis=1), a_y.sum(axis=1)), axis=-1).tolist()
+
+        # the number of influences each object is inside of.
+        inside_counts = inside.sum(axis=1).tolist()
+
+        # apply the acceleration.
+        for gravity_object, influences, total, count, sleep in zip(objects, acceleration_vectors, totals,
+                                                                   inside_counts, asleep):
+            gravity_object.gravity_influences = influences
+            gravity_object.gravity_acceleration[0] = total[0]
+            gravity_object.gravity_acceleration[1] = total[1]
+
+            if sleep:
+                self.sleeping[gravity_object] = (gravity_object.center_x, gravity_object.center_y,
+                                                 self.calculations + SLEEP_TICKS)
+
+            # if the objects health is greater than Zero damage them once for every influence they are inside.
+            while count and gravity_object.health > 0:
+                gravity_object.health -= 1
+                count -= 1
 
     def reset(self):
         # If the game resets, reset the gravity influences to ensure nothing carries over.
 
         self.gravity_influences = arcade.SpriteList()
         self.gravity_objects = arcade.SpriteList()
+        self.influences_changed = True
+        self.sleeping = {}
 
 
 class Planet(arcade.Sprite):
@@ -92,7 +351,9 @@ class Planet(arcade.Sprite):
 
         self.game_window = game_window
         self.gravity_handler = None
+        self.radial_table = None
         self.satellites = None
+        self.collision_layer = collision.LAYER_PLANET
         self.game_window.gravity_handler.set_gravity_object_influence(self)
 
         # Set all of the data of this planet.
@@ -116,6 +377,9 @@ class Planet(arcade.Sprite):
                 self.width = 1920
                 self.height = 1920
 
+            # The planet's pull is only a function of distance so it is precomputed.
+            self.radial_table = get_radial_table(self.weight, self.planetary_radius, self.width)
+
             self.texture = self.game_window.planet_sprites[self.subset][self.type][planet_data['tex']]
 
             # create the satllites.
@@ -157,6 +421,12 @@ class Satellite(arcade.Sprite):
 
         self.parent = parent
         self.gravity_handler = None
+        self.radial_table = None
+        self.collision_layer = collision.LAYER_SATELLITE
+
+        # The satellite follows its orbit using the game clock, starting from when it was created.
+        self.clock = parent.game_window.clock
+        self.epoch = self.clock.time
 
         self.data = satellite_data
 
@@ -168,6 +438,7 @@ class Satellite(arcade.Sprite):
         self.type = None
         self.subset = None
         self.speed = 0
+        self.angular_speed = 0
         self.file_name = ''
 
         self.velocity = [0.0, 0.0]
@@ -195,10 +466,15 @@ class Satellite(arcade.Sprite):
                 self.scale = 0.5
                 self.health = 550
 
+            # If the satellite has gravity its pull is precomputed just like planets.
+            if self.gravity:
+                self.radial_table = get_radial_table(self.weight, self.planetary_radius, self.width)
+
+            # The angular speed in radians per second, the satellite always travels at 30 times its speed.
+            self.angular_speed = (self.speed * 30) / self.orbit
+
             # position the satellite based on its orbit and angle.
-            rad_angle = math.radians(self.current_angle)
-            self.center_x = self.parent.center_x + math.cos(rad_angle) * self.orbit
-            self.center_y = self.parent.center_y + math.sin(rad_angle) * self.orbit
+            self.center_x, self.center_y = self.position_at(self.epoch)
 
     def setup(self, gravity_handler=None):
 
@@ -209,16 +485,44 @@ class Satellite(arcade.Sprite):
             self.gravity_handler = gravity_handler
             self.gravity_handler.set_gravity_object_influence(self)
 
+    def phase_at(self, t):
+        # The angle of the satellite around its parent in radians at the game time t.
+        return math.radians(self.starting_angle) + self.angular_speed * (t - self.epoch)
+
+    def position_at(self, t):
+        """
+        Find where the satellite is at any game time. The orbit is a circle around the parent so it is exact and does
+        not drift.
+
+        :param t: The game time.
+        :return: The x and y position.
+        """
+        phase = self.phase_at(t)
+        return (self.parent.center_x + math.cos(phase) * self.orbit,
+                self.parent.center_y + math.sin(phase) * self.orbit)
+
+    def velocity_at(self, t):
+        """
+        Find the velocity of the satellite at any game time. It is always at a right angle to the parent.
+
+        :param t: The game time.
+        :return: The x and y velocity.
+        """
+        phase = self.phase_at(t)
+        return -math.sin(phase) * self.speed * 30, math.cos(phase) * self.speed * 30
+
     def on_update(self, delta_time: float = 1 / 60):
-        # applying its calculated velocity.
-        self.center_x += self.velocity[0] * delta_time
-        self.center_y += self.velocity[1] * delta_time
-
-        # finding its velocity
-        angle = vector.find_angle((self.center_x, self.center_y), (self.parent.center_x, self.parent.center_y)) + 90
-        rad_angle = math.radians(angle)
-        self.velocity[0] = math.cos(rad_angle) * self.speed * 30
-        self.velocity[1] = math.sin(rad_angle) * self.speed * 30
+        # Place the satellite on its orbit at the current game time. The velocity shares the same angle.
+        phase = self.phase_at(self.clock.time)
+        cos_phase = math.cos(phase)
+        sin_phase = math.sin(phase)
+        self.current_angle = math.degrees(phase)
+
+        self.center_x = self.parent.center_x + cos_phase * self.orbit
+        self.center_y = self.parent.center_y + sin_phase * self.orbit
+
+        self.velocity[0] = -sin_phase * self.speed * 30
+        self.velocity[1] = cos_phase * self.speed * 30
 
     def kill(self):
         # kill self
@@ -0,0 +1,202 @@
+import math
+from collections import deque
+
+# How far ahead in seconds the path is predicted, and how far the body can stray from the path before it is redone.
+PREDICTION_HORIZON = 3
+PREDICTION_TOLERANCE = 4
+
+# The number of steps added each tick while the path is being rebuilt. Once it is full only one step is added.
+REBUILD_STEPS = 12
+
+# How much the thrust can change, as a fraction of itself, before the path is redone. Turning while thrusting changes
+# the thrust a little every tick, the drift it causes is caught by the tolerance instead.
+THRUST_TOLERANCE = 0.05
+
+
+class TrajectoryPredictor:
+    """
+    Predicts the path of a body a few seconds ahead under its current thrust and the gravity of every influence.
+    The orbiting influences are placed where they will be at each step, so the path follows moving moons.
+
+    The path is kept between ticks. Each tick the step the body just took is dropped from the front and one new step
+    is added to the end. The path is only thrown away when the body's thrust or gravity scale changes, or when the
+    body has strayed from where the path said it would be. A rebuilt path grows a few steps a tick until it is full,
+    so no single tick integrates the whole horizon.
+    """
+
+    def __init__(self, gravity_handler, clock, body, horizon: float = PREDICTION_HORIZON,
+                 tolerance: float = PREDICTION_TOLERANCE, rebuild_steps: int = REBUILD_STEPS):
+        # The gravity handler for the accelerations, the game clock for the time, and the body being predicted.
+        self.gravity_handler = gravity_handler
+        self.clock = clock
+        self.body = body
+
+        # The length of the path in steps, and how far the body can stray from it.
+        self.horizon = horizon
+        self.max_steps = max(1, int(round(horizon / clock.step)))
+        self.tolerance = tolerance
+        self.rebuild_steps = rebuild_steps
+
+        # The predicted positions, one every step starting at the start time.
+        self.points = deque()
+        self.start_time = 0
+
+        # The state at the end of the path, used to extend it.
+        self.end_position = [0.0, 0.0]
+        self.end_velocity = [0.0, 0.0]
+        self.end_time = 0
+
+        # The thrust, gravity scale and max speed the path was predicted with.
+        self.inputs = None
+
+        # The number of times the path was rebuilt, and the number of steps predicted last tick.
+        self.rebuilds = 0
+        self.steps_predicted = 0
+
+    @property
+    def path(self):
+        # The predicted positions, starting at the body.
+        return list(self.points)
+
+    @property
+    def full(self):
+        # Whether the path reaches the whole horizon.
+        return len(self.points) > self.max_steps
+
+    def read_inputs(self):
+        """
+        Find what the body's motion currently depends on. If any of it changes the path is wrong.
+
+        :return: The thrust per step, the gravity scale and the max speed (None if the speed is not capped).
+        """
+        thrust = getattr(self.body, 'acceleration', (0.0, 0.0))
+
+        gravity_scale = 0.0
+        physics_world = getattr(self.body, 'physics_world', None)
+        if physics_world is not None:
+            gravity_scale = float(physics_world.gravity_scales[self.body.physics_row])
+
+        max_speed = None
+        if getattr(self.body, 'speed_limit', False):
+            max_speed = self.body.max_speed
+
+        return float(thrust[0]), float(thrust[1]), gravity_scale, max_speed
+
+    def inputs_changed(self, inputs):
+        # Whether the inputs are different enough from those the path was predicted with to redo it.
+        if self.inputs is None or inputs[2:] != self.inputs[2:]:
+            return True
+
+        d_x = inputs[0] - self.inputs[0]
+        d_y = inputs[1] - self.inputs[1]
+        allowed = THRUST_TOLERANCE * math.sqrt(self.inputs[0] ** 2 + self.inputs[1] ** 2)
+        return d_x ** 2 + d_y ** 2 > allowed ** 2
+
+    def restart(self, inputs):
+        # Throw away the path and start again from where the body is now.
+        self.inputs = inputs
+        self.rebuilds += 1
+
+        self.start_time = self.clock.time
+        self.end_time = self.clock.time
+        self.end_position = [self.body.center_x, self.body.center_y]
+        self.end_velocity = [float(self.body.velocity[0]), float(self.body.velocity[1])]
+
+        self.points = deque()
+        self.points.append(tuple(self.end_position))
+
+    def extend(self, steps: int):
+        """
+        Add steps to the end of the path. Each step runs just as the game does: the gravity is found, the thrust is
+        applied and the speed capped, then the gravity is applied and the body moved.
+
+        :param steps: The number of steps to add.
+        """
+        thrust_x, thrust_y, gravity_scale, max_speed = self.inputs
+        step = self.clock.step
+        x, y = self.end_position
+        v_x, v_y = self.end_velocity
+        t = self.end_time
+
+        for _ in range(steps):
+            if gravity_scale:
+                a_x, a_y = self.gravity_handler.acceleration_at(x, y, t)
+            else:
+                a_x, a_y = 0.0, 0.0
+
+            v_x += thrust_x
+            v_y += thrust_y
+            if max_speed is not None:
+                speed = math.sqrt(v_x ** 2 + v_y ** 2)
+                if speed > max_speed:
+                    v_x = (v_x / speed) * max_speed
+                    v_y = (v_y / speed) * max_speed
+
+            v_x += a_x * gravity_scale
+            v_y += a_y * gravity_scale
+            x += v_x * step
+            y += v_y * step
+            t += step
+            self.points.append((x, y))
+
+        self.end_position = [x, y]
+        self.end_velocity = [v_x, v_y]
+        self.end_time = t
+
+    def on_update(self):
+        """
+        Move the path along with the game clock. Called once every tick after the bodies have moved.
+        """
+        inputs = self.read_inputs()
+        if self.inputs_changed(inputs) or not self.points:
+            self.restart(inputs)
+        else:
+            # Drop the steps that are now in the past.
+            step = self.clock.step
+            while len(self.points) > 1 and self.start_time + step <= self.clock.time + step / 2:
+                self.points.popleft()
+                self.start_time += step
+
+            # If the body is not where the path says it should be the path is redone.
+            start_x, start_y = self.points[0]
+            if (self.body.center_x - start_x) ** 2 + (self.body.center_y - start_y) ** 2 > self.tolerance ** 2:
+                self.restart(inputs)
+
+        # Extend the path, quickly while rebuilding and a single step once it is full.
+        missing = self.max_steps + 1 - len(self.points)
+        self.steps_predicted = min(missing, self.rebuild_steps)
+        if self.steps_predicted > 0:
+            self.extend(self.steps_predicted)
+
+    def position_at(self, t):
+        """
+        Find where the body is predicted to be at a game time. Times past the end of the path continue in a straight
+        line with the velocity at the end.
+
+        :param t: The game time.
+        :return: The x and y position.
+        """
+        if not self.points:
+            return self.body.center_x, self.body.center_y
+
+        index = (t - self.start_time) / self.clock.step
+        if index <= 0:
+            return self.points[0]
+
+        last = len(self.points) - 1
+        if index >= last:
+            beyond = t - self.end_time
+            return (self.end_position[0] + self.end_velocity[0] * beyond,
+                    self.end_position[1] + self.end_velocity[1] * beyond)
+
+        # Interpolate between the two steps either side of the time.
+        lower = int(index)
+        fraction = index - lower
+        x_1, y_1 = self.points[lower]
+        x_2, y_2 = self.points[lower + 1]
+        return x_1 + (x_2 - x_1) * fraction, y_1 + (y_2 - y_1) * fraction
+
+    def reset(self):
+        # Forget the path, used when the body is teleported.
+        self.points = deque()
+        self.inputs = None
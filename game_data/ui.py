@@ -40,6 +40,10 @@ REP_BAR_TEXTURES.append(arcade.load_texture("game_data/Sprites/Ui/reputation_ful
 # The Screen Size for positioning.
 SCREEN_WIDTH, SCREEN_HEIGHT = arcade.get_display_size()
 
+# The colour of the player's predicted path, and how many steps of the path each drawn line covers.
+TRAJECTORY_COLOR = (255, 255, 255, 70)
+TRAJECTORY_STRIDE = 6
+
 #   -- In Game UI --
 #
 # Pointer - Is used to point the player towards enemies and the wormhole.
@@ -78,12 +82,11 @@ class Pointer(arcade.Sprite):
 
         holder_pos = self.holder.center_x, self.holder.center_y
         target_pos = self.target.center_x, self.target.center_y
-        self.angle = vector.find_angle(target_pos, holder_pos)
-        distance = vector.find_distance(holder_pos, target_pos)
+        unit_x, unit_y, distance = vector.direction(target_pos, holder_pos)
+        self.angle = vector.heading((unit_x, unit_y))
         push_out = 45 + distance / 50
-        rad_angle = math.radians(self.angle)
-        self.center_x = holder_pos[0] + (math.cos(rad_angle) * push_out)
-        self.center_y = holder_pos[1] + (math.sin(rad_angle) * push_out)
+        self.center_x = holder_pos[0] + (unit_x * push_out)
+        self.center_y = holder_pos[1] + (unit_y * push_out)
 
         if self.center_x > holder_pos[0] + SCREEN_WIDTH // 4:
             self.center_x = holder_pos[0] + SCREEN_WIDTH // 4
@@ -355,8 +358,17 @@ class PlayerUi:
         """
         The under draw runs first before any other drawings.
 
-        It draws the player thrusters.
+        It draws the player's predicted path and thrusters.
         """
+        trajectory = self.game_screen.player_trajectory
+        if trajectory is not None and len(trajectory.points) > 1:
+            path = trajectory.path
+            points = path[::TRAJECTORY_STRIDE]
+            if points[-1] != path[-1]:
+                points.append(path[-1])
+            if len(points) > 1:
+                arcade.draw_line_strip(points, TRAJECTORY_COLOR, 2)
+
         self.thrusters.on_draw()
 
 
@@ -448,6 +460,13 @@ class MiniMap:
                                            center_x=pos[0], center_y=pos[1])
                 self.other_sprites.append(sprite)
 
+        # Enemies that have spawned but are waiting to be made are shown where they will be.
+        for entry in self.enemy_handler.spawn_queue:
+            pos = self.define_pos(entry)
+            sprite = arcade.Sprite("game_data/Sprites/Minimap/enemy/position.png", scale=self.planet_scale,
+                                   center_x=pos[0], center_y=pos[1])
+            self.other_sprites.append(sprite)
+
     def satellite_draw(self):
         # For every satellite create a satellite sprite, either a moon symbol or a station symbol.
         for satellite in self.planet.satellites:
@@ -2,10 +2,14 @@ import math
 from PIL import Image
 
 import arcade
+import numpy as np
 
 # Volume variable so i don't have to change it in multiple places.
 VOLUME = .05
 
+# The frames of every animation sprite sheet that has been cut, so each is only cut once.
+ANIMATION_FRAMES = {}
+
 """
 While called vector.py due to its mathematical functions 
 vector also holds utility classes that don't have anywhere else to be
@@ -24,10 +28,26 @@ class Scrap(arcade.Sprite):
         """
 
         super().__init__("game_data/Sprites/circles/circle_green.png", 0.2, center_x=x_y[0], center_y=x_y[1])
+
+        # The pool the scrap goes back to when it is collected, if it came from one.
+        self.pool = None
+
+        self.reuse(player, enemy_handler, x_y)
+
+    def reuse(self, player, enemy_handler, x_y):
+        # Set up the scrap, either new or taken from a pool, with all of its state reset.
+        self.scale = 0.2
+        self.center_x = x_y[0]
+        self.center_y = x_y[1]
         self.player = player
         self.enemy_handler = enemy_handler
 
-    def update(self):
+        # The physics world moves the scrap with its velocity.
+        self.velocity = [0.0, 0.0]
+        self.physics_world = None
+        self.physics_row = None
+
+    def on_update(self, delta_time: float = 1 / 60):
         """
         Updates the Scrap.
         If the player is close enough it gravitates towards them while shrinking in size.
@@ -37,17 +57,18 @@ class Scrap(arcade.Sprite):
         p_vec = (self.player.center_x, self.player.center_y)
         s_vec = (self.center_x, self.center_y)
 
-        # distance from player
-        distance = find_distance(p_vec, s_vec)
+        # direction and distance from player
+        unit_x, unit_y, distance = direction(p_vec, s_vec)
 
         if distance < 500:
             # if the distance is less then 500 pixels gravitate towards player.
-            direction = math.radians(find_angle(p_vec, s_vec))
             acceleration = 0.0006 * self.player.weight / distance
-            move_x = math.cos(direction) * acceleration
-            move_y = math.sin(direction) * acceleration
-            self.center_x += move_x
-            self.center_y += move_y
+            move_x = unit_x * acceleration
+            move_y = unit_y * acceleration
+
+            # The scrap moves the full amount each update.
+            self.velocity[0] = move_x / delta_time
+            self.velocity[1] = move_y / delta_time
             if distance <= self.width:
                 # If the the scrap is close to the player start shrinking in size.
                 self.scale = ((self.width*distance)/(self.width*self.width)) * 0.2
@@ -55,8 +76,19 @@ class Scrap(arcade.Sprite):
                     # If the scrap is within 15 pixels collect the scrap.
                     self.enemy_handler.count_collect_scrap()
                     self.player.add_scrap()
-                    self.remove_from_sprite_lists()
-                    del self
+                    self.kill()
+        else:
+            self.velocity[0] = 0.0
+            self.velocity[1] = 0.0
+
+    def kill(self):
+        # Take the scrap out of the physics world and every sprite list, then give it back to its pool.
+        if self.physics_world is not None:
+            self.physics_world.remove(self)
+        self.remove_from_sprite_lists()
+        if self.pool is not None:
+            self.pool.release(self)
+        del self
 
 
 class AnimatedTempSprite(arcade.Sprite):
@@ -73,28 +105,23 @@ class AnimatedTempSprite(arcade.Sprite):
 
         super().__init__()
 
+        # The pool the sprite goes back to when its animation ends, if it came from one.
+        self.pool = None
+
+        self.reuse(sprite_sheet, pos, animation_speed, loops)
+
+    def reuse(self, sprite_sheet, pos, animation_speed: int = 12, loops: int = 1):
+        # Set up the sprite, either new or taken from a pool, with all of its state reset.
         self.scale = 1
         self.center_x = pos[0]
         self.center_y = pos[1]
         self.loops = loops
-        self.frames = []
         self.fps = animation_speed
         self.frame_timer = 0
         self.frame_step = 1 / animation_speed
         self.current_texture = 0
-
-        # find the size of the sprite, and use it to cut the sprite sheet.
-        image = Image.open(sprite_sheet)
-        frame_size, sprite_sheet_height = image.size
-        if sprite_sheet_height % frame_size != 0:
-            raise TypeError("The Frames Must Have Equal Width and Height")
-        else:
-            num_frames = sprite_sheet_height//frame_size
-            for y in range(num_frames):
-                texture = arcade.load_texture(sprite_sheet, 0, frame_size * y,
-                                              frame_size, frame_size)
-                self.frames.append(texture)
-            self.texture = self.frames[self.current_texture]
+        self.frames = get_animation_frames(sprite_sheet)
+        self.texture = self.frames[self.current_texture]
 
     def on_update(self, delta_time: float = 1/60):
         # run the animation. If it has run through all its loops kill it.
@@ -114,9 +141,33 @@ class AnimatedTempSprite(arcade.Sprite):
 
     def kill(self):
         self.remove_from_sprite_lists()
+        if self.pool is not None:
+            self.pool.release(self)
         del self
 
 
+def get_animation_frames(sprite_sheet):
+    """
+    Find the frames of an animation's sprite sheet, cutting it the first time it is used.
+
+    :param sprite_sheet: The sprite sheet, one column of square frames.
+    :return: The list of textures.
+    """
+    frames = ANIMATION_FRAMES.get(sprite_sheet)
+    if frames is None:
+        # find the size of the sprite, and use it to cut the sprite sheet.
+        image = Image.open(sprite_sheet)
+        frame_size, sprite_sheet_height = image.size
+        if sprite_sheet_height % frame_size != 0:
+            raise TypeError("The Frames Must Have Equal Width and Height")
+
+        num_frames = sprite_sheet_height//frame_size
+        frames = [arcade.load_texture(sprite_sheet, 0, frame_size * y, frame_size, frame_size)
+                  for y in range(num_frames)]
+        ANIMATION_FRAMES[sprite_sheet] = frames
+    return frames
+
+
 """
 These are all general use mathematical functions based around 2D points(vectors) and angles.
 """
@@ -193,3 +244,134 @@ def find_distance(v1, v2):
 
     distance = math.sqrt(dx ** 2 + dy ** 2)
     return distance
+
+
+"""
+Direction functions. These find and turn unit vectors without ever finding an angle, so the hot loops do not need
+atan2, radians, cos and sin just to find which way to move. Each has a numpy variant for whole arrays of vectors.
+"""
+
+
+def direction(vector1, vector2):
+    """
+    Find the unit vector pointing from vector2 to vector1, and the distance between them.
+    This is the direction find_angle gives, without finding the angle.
+
+    :return: The x and y of the unit vector, and the distance.
+    """
+    dx = vector1[0] - vector2[0]
+    dy = vector1[1] - vector2[1]
+    distance = math.sqrt(dx * dx + dy * dy)
+
+    # Two vectors in the same place point at an angle of 0, just like find_angle.
+    if distance == 0:
+        return 1.0, 0.0, 0.0
+
+    return dx / distance, dy / distance, distance
+
+
+def normalize(v):
+    """
+    Find the unit vector of a vector, and its length.
+
+    :return: The x and y of the unit vector, and the length.
+    """
+    return direction(v, (0.0, 0.0))
+
+
+def rotate(v, cos_angle, sin_angle):
+    """
+    Rotate a vector anti-clockwise by an angle given as its cosine and sine.
+    """
+    return v[0] * cos_angle - v[1] * sin_angle, v[0] * sin_angle + v[1] * cos_angle
+
+
+def perpendicular(v, side: int = 1):
+    """
+    Rotate a vector by 90 degrees. A side of 1 is anti-clockwise, -1 is clockwise.
+    """
+    return -v[1] * side, v[0] * side
+
+
+def angle_vector(angle):
+    """
+    Find the unit vector facing an angle in degrees.
+    """
+    rad_angle = math.radians(angle)
+    return math.cos(rad_angle), math.sin(rad_angle)
+
+
+def heading(v):
+    """
+    Find the angle in degrees of a vector, in the range 0 - 360 the same as find_angle.
+    """
+    angle = math.degrees(math.atan2(v[1], v[0]))
+    if angle < 0:
+        angle += 360
+
+    return angle
+
+
+def directions(vectors1, vectors2):
+    """
+    Find the unit vectors pointing from each of vectors2 to each of vectors1, and the distances between them.
+    Both are arrays of shape (n, 2), or anything that broadcasts to it.
+
+    :return: An (n, 2) array of unit vectors, and an (n,) array of distances.
+    """
+    offsets = np.asarray(vectors1, dtype=float) - np.asarray(vectors2, dtype=float)
+    distances = np.sqrt(np.einsum('...i,...i->...', offsets, offsets))
+
+    # Like direction, vectors in the same place point at an angle of 0.
+    same = distances == 0
+    units = offsets / np.where(same, 1.0, distances)[..., np.newaxis]
+    units[same] = 1.0, 0.0
+
+    return units, distances
+
+
+def normalize_all(vectors):
+    """
+    Find the unit vectors of an (n, 2) array of vectors, and their lengths.
+    """
+    return directions(vectors, 0.0)
+
+
+def rotate_all(vectors, cos_angles, sin_angles):
+    """
+    Rotate an (n, 2) array of vectors anti-clockwise by angles given as their cosines and sines.
+    """
+    vectors = np.asarray(vectors, dtype=float)
+    rotated = np.empty_like(vectors)
+    rotated[..., 0] = vectors[..., 0] * cos_angles - vectors[..., 1] * sin_angles
+    rotated[..., 1] = vectors[..., 0] * sin_angles + vectors[..., 1] * cos_angles
+    return rotated
+
+
+def headings(vectors):
+    """
+    Find the angles in degrees of an (n, 2) array of vectors, in the range 0 - 360.
+    """
+    vectors = np.asarray(vectors, dtype=float)
+    return np.degrees(np.arctan2(vectors[..., 1], vectors[..., 0])) % 360
+
+
+def angle_vectors(angles):
+    """
+    Find the unit vectors facing an array of angles in degrees, as an (n, 2) array.
+    """
+    rad_angles = np.radians(np.asarray(angles, dtype=float))
+    return np.stack((np.cos(rad_angles), np.sin(rad_angles)), axis=-1)
+
+
+def calc_differences(target_angles, start_angles):
+    """
+    Calculate the differences between arrays of angles in a clockwise and anti-clockwise direction, the same as
+    calc_difference.
+    """
+    differences_left = np.asarray(target_angles, dtype=float) - start_angles
+    differences_right = start_angles + (360 - np.asarray(target_angles, dtype=float))
+    differences_left = np.where(differences_left < 0, differences_left + 360, differences_left)
+    differences_right = np.where(differences_right > 360, differences_right - 360, differences_right)
+
+    return differences_left, differences_right
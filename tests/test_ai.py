@@ -0,0 +1,184 @@
+import math
+import random
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import game_data.ai as ai
+import game_data.enemy as enemy
+import game_data.vector as vector
+
+
+class RuleEnemy:
+    # An enemy with only the values the scalar rules read, and the rules themselves.
+    rule1 = enemy.Enemy.rule1
+    rule2 = enemy.Enemy.rule2
+    rule3 = enemy.Enemy.rule3
+    rule4 = enemy.Enemy.rule4
+    rule5 = enemy.Enemy.rule5
+
+
+def make_flock(num_enemies=40):
+    # A crowded flock near two planets, so every branch of the rules is taken.
+    random.seed(3)
+    enemies = []
+    for _ in range(num_enemies):
+        flock_enemy = RuleEnemy()
+        flock_enemy.center_x = random.uniform(-600, 600)
+        flock_enemy.center_y = random.uniform(-600, 600)
+        flock_enemy.angle = random.uniform(-20, 380)
+        flock_enemy.velocity = [random.uniform(-300, 300), random.uniform(-300, 300)]
+        flock_enemy.speed = math.hypot(*flock_enemy.velocity)
+        heading = random.uniform(0, math.tau)
+        flock_enemy.target_direction = (math.cos(heading), math.sin(heading))
+        flock_enemy.target_distance = random.uniform(0, 4000)
+        flock_enemy.target_velocity = [random.uniform(-300, 300), random.uniform(-300, 300)]
+        flock_enemy.target_speed = math.hypot(*flock_enemy.target_velocity)
+        flock_enemy.target_acceleration = random.uniform(0, 5)
+        for rule in range(1, 6):
+            setattr(flock_enemy, f'rule_{rule}_priority', random.choice((0, 0.5, 1, 2)))
+        enemies.append(flock_enemy)
+
+    # Two enemies on top of each other, and one looking straight past another so it is dodged at a right angle.
+    enemies[1].center_x, enemies[1].center_y = enemies[0].center_x, enemies[0].center_y
+    enemies[2].center_x, enemies[2].center_y = enemies[3].center_x + 100, enemies[3].center_y + 50
+    enemies[3].angle = vector.find_angle((enemies[2].center_x, enemies[2].center_y),
+                                         (enemies[3].center_x, enemies[3].center_y)) + 10
+
+    # An explosion in the enemy list is a neighbour too.
+    explosion = SimpleNamespace(center_x=0.0, center_y=0.0, angle=0.0)
+    sprites = enemies + [explosion]
+
+    # The player looks at the middle of the flock.
+    player = SimpleNamespace(center_x=-900.0, center_y=0.0, angle=0.0)
+    influences = [SimpleNamespace(center_x=3000.0, center_y=0.0, width=1000),
+                  SimpleNamespace(center_x=-2000.0, center_y=500.0, width=600)]
+    handler = SimpleNamespace(player=player,
+                              find_neighbours=lambda of, radius: [sprite for sprite in sprites if sprite is not of])
+    for flock_enemy in enemies:
+        flock_enemy.handler = handler
+        flock_enemy.gravity_handler = SimpleNamespace(gravity_influences=influences)
+
+    state = ai.FlockState(
+        np.array([(e.center_x, e.center_y) for e in enemies], dtype=float),
+        np.array([e.velocity for e in enemies], dtype=float),
+        np.array([e.angle for e in enemies], dtype=float),
+        np.array([e.speed for e in enemies], dtype=float),
+        np.array([e.target_direction for e in enemies], dtype=float),
+        np.array([e.target_distance for e in enemies], dtype=float),
+        np.array([e.target_velocity for e in enemies], dtype=float),
+        np.array([e.target_speed for e in enemies], dtype=float),
+        np.array([e.target_acceleration for e in enemies], dtype=float),
+        np.array([[getattr(e, f'rule_{rule}_priority') for rule in range(1, 6)] for e in enemies], dtype=float),
+        np.array([(sprite.center_x, sprite.center_y) for sprite in sprites], dtype=float),
+        np.array([sprite.angle for sprite in sprites], dtype=float),
+        np.arange(num_enemies),
+        np.array((player.center_x, player.center_y), dtype=float), player.angle,
+        np.array([(influence.center_x, influence.center_y) for influence in influences], dtype=float),
+        np.array([influence.width / 2 for influence in influences], dtype=float))
+    return enemies, state
+
+
+@pytest.mark.parametrize('rule, scalar_rule', [(ai.approach_rule, enemy.Enemy.rule1),
+                                               (ai.separation_rule, enemy.Enemy.rule2),
+                                               (ai.match_speed_rule, enemy.Enemy.rule3),
+                                               (ai.avoid_nose_rule, enemy.Enemy.rule4),
+                                               (ai.avoid_planets_rule, enemy.Enemy.rule5)])
+def test_batched_rules_match_each_enemy(rule, scalar_rule):
+    enemies, state = make_flock()
+    expected = np.array([scalar_rule(flock_enemy) for flock_enemy in enemies], dtype=float)
+    assert np.allclose(rule(state), expected, atol=1e-9)
+
+
+def test_flock_takes_every_branch():
+    # The flock has to reach the parts of the rules that are easy to get wrong for the comparison to mean anything.
+    enemies, state = make_flock()
+    positions = state.positions
+
+    # An enemy is dodged at a right angle by the neighbour looking past it, and enemies dodge the player's nose.
+    unit_x, unit_y, _ = vector.direction((enemies[2].center_x, enemies[2].center_y),
+                                         (enemies[3].center_x, enemies[3].center_y))
+    sides, _ = ai.dodge_sides(*vector.calc_differences(np.array([enemies[3].angle]),
+                                                        vector.headings(np.array([(unit_x, unit_y)]))))
+    assert sides[0] != 0
+    sides, _ = ai.dodge_sides(*vector.calc_differences(state.player_angle,
+                                                        vector.headings(positions - state.player_position)))
+    assert np.any(sides != 0)
+
+    # Some enemies are pushed by both planets, so rule five inverts its running total twice.
+    inside = [(0 < distance) & (distance < ai.PLANET_DISTANCE)
+              for distance in (np.hypot(*(positions - position).T) - radius
+                               for position, radius in zip(state.influence_positions, state.influence_radii))]
+    assert np.any(inside[0] & inside[1])
+
+
+class TierEnemy:
+    # An enemy that only records when it thinks, acts and fires.
+
+    def __init__(self, position, target, target_distance):
+        self.center_x, self.center_y = position
+        self.target = target
+        self.target_distance = target_distance
+        self.target_acceleration = 1
+        self.rule_1_priority = 1
+        self.rule_acceleration = [0.0, 0.0]
+        self.rule_time = None
+        self.health = 10
+        self.lod = ai.LOD_FULL
+        self.lod_time = 0
+        self.physics_row = 0
+        self.thoughts = 0
+        self.shots = 0
+        self.steps = 0
+
+    def think(self, delta_time):
+        self.thoughts += 1
+
+    def act(self, delta_time, fire=True):
+        self.steps += 1
+        if fire:
+            self.shots += 1
+
+
+def run_tier(position, target_distance=ai.ENGAGE_DISTANCE * 2, chase_player=True, ticks=60):
+    # Run the engine for a second with a single enemy, without the rules themselves.
+    player = SimpleNamespace(center_x=0.0, center_y=0.0)
+    station = SimpleNamespace(center_x=0.0, center_y=0.0)
+    enemy = TierEnemy(position, player if chase_player else station, target_distance)
+    game_window = SimpleNamespace(left_view=0, bottom_view=0,
+                                  physics_world=SimpleNamespace(velocities=np.zeros((1, 2))))
+    engine = ai.FlockingEngine(SimpleNamespace(enemy_sprites=[enemy], player=player, game_window=game_window))
+    engine.apply_rules = lambda enemies, delta_time: None
+
+    for _ in range(ticks):
+        engine.on_update(1 / 60)
+    return enemy
+
+
+def test_full_tier_updates_and_fires_every_tick():
+    enemy = run_tier((100, 100))
+    assert enemy.lod == ai.LOD_FULL
+    assert enemy.thoughts == enemy.steps == enemy.shots == 60
+
+
+def test_reduced_tier_updates_less_often_and_never_fires():
+    # Engaged but off the screen, the enemy is held in the reduced tier.
+    enemy = run_tier((-ai.LOD_DISTANCES[1] * 4, 0), target_distance=0)
+    assert enemy.lod == ai.LOD_REDUCED
+    assert enemy.steps == ai.LOD_TICK_RATES[ai.LOD_REDUCED]
+    assert enemy.shots == 0
+
+
+def test_far_enemies_steer_towards_the_station_and_freeze_chasing_the_player():
+    position = (-ai.LOD_DISTANCES[2] * 2, 0)
+
+    chasing_station = run_tier(position, chase_player=False)
+    assert chasing_station.lod == ai.LOD_STEERING
+    assert chasing_station.steps == chasing_station.shots == 0
+    assert chasing_station.rule_acceleration[0] > 0
+
+    chasing_player = run_tier(position)
+    assert chasing_player.lod == ai.LOD_FROZEN
+    assert chasing_player.steps == chasing_player.shots == 0
+    assert chasing_player.rule_acceleration == [0.0, 0.0]
@@ -0,0 +1,76 @@
+import random
+from types import SimpleNamespace
+
+import arcade
+
+import game_data.bullet as bullet
+import game_data.clock as clock
+import game_data.collision as collision
+import game_data.enemy as enemy
+import game_data.enemy_handler as enemy_handler
+import game_data.physics as physics
+import game_data.space as space
+
+# The type of the enemies made for the tests, without the assets of a real type.
+TYPE_DATA = {'type': "test", 'super_type': "basic", 'health': 10, 'shoot_delay': [1, 2], 'num_shots': 1,
+             'start_angle': 0, 'angle_mod': 0}
+
+
+def make_handler():
+    # An enemy handler with the parts of the game window the enemies use.
+    game_window = SimpleNamespace(physics_world=physics.PhysicsWorld(), bullet_system=bullet.BulletSystem(),
+                                  gravity_handler=space.GravityHandler(), clock=clock.GameClock(),
+                                  prev_difficulty=0)
+    mission_handler = SimpleNamespace(curr_planet=None,
+                                      current_mission_data={'enemies_killed': 0, 'total_enemy': 0,
+                                                            'scrap_identify': 0})
+    planet = SimpleNamespace(center_x=0, center_y=0, width=100)
+    handler = enemy_handler.EnemyHandler(game_window, mission_handler, mission_data={'planet': planet, 'stages': 1},
+                                         target_object=planet)
+    handler.player = SimpleNamespace(center_x=0.0, center_y=0.0, velocity=[0.0, 0.0],
+                                     enemy_pointers=arcade.SpriteList())
+    handler.enemy_sprites = arcade.SpriteList()
+    return handler
+
+
+def make_archetype():
+    # An archetype with a single frame, a square hit box and no sounds.
+    point_list = ((-10, -10), (10, -10), (10, 10), (-10, 10))
+    texture = arcade.load_texture("game_data/Sprites/circles/circle_green.png")
+    return enemy.EnemyArchetype(type="test", textures=(texture,), ability_frames=(), shot_sound=None, hit_sound=None,
+                                point_list=point_list, hit_shape=collision.get_hit_shape(point_list),
+                                rules=(1, 1, 1, 1, 1))
+
+
+def play_wave(handler, archetype, num_enemies):
+    # Spawn a wave, kill half of it so it leaves scrap and explosions, then reset with the rest still alive.
+    for _ in range(num_enemies):
+        spawned = handler.enemy_pool.acquire(TYPE_DATA, {}, archetype)
+        spawned.setup(handler, handler.player, (0, 0))
+        handler.enemy_sprites.append(spawned)
+
+    for spawned in list(handler.enemy_sprites)[:num_enemies // 2]:
+        spawned.take_hit(spawned.health)
+
+    handler.reset()
+    handler.enemy_sprites = arcade.SpriteList()
+
+
+def test_reset_releases_every_pool():
+    random.seed(1)
+    handler = make_handler()
+    archetype = make_archetype()
+    pools = {'enemies': handler.enemy_pool, 'scrap': handler.scrap_pool, 'explosions': handler.explosion_pool}
+
+    for _ in range(6):
+        play_wave(handler, archetype, 10)
+
+        # Nothing is left in use after a reset.
+        assert all(pool.in_use == 0 for pool in pools.values())
+
+    # So each wave reuses what the last released, and the high water is never more than a single wave needs. Every
+    # enemy drops up to three scrap, those still alive when the reset kills them too.
+    high_water = handler.pool_high_water()
+    assert high_water['enemies'] == 10
+    assert high_water['explosions'] <= 5
+    assert high_water['scrap'] <= 10 * 3
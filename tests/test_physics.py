@@ -0,0 +1,60 @@
+import arcade
+import numpy as np
+import pytest
+
+import game_data.physics as physics
+
+
+def make_body(x, y, velocity):
+    body = arcade.Sprite()
+    body.center_x, body.center_y = x, y
+    body.velocity = list(velocity)
+    return body
+
+
+def test_add_step_remove_round_trip():
+    # The world only has room for one body, so adding the second grows it and remakes the views.
+    world = physics.PhysicsWorld(capacity=1)
+    first = make_body(10, 20, (60, -30))
+    second = make_body(-5, 0, (0, 120))
+    world.add(first)
+    world.add(second)
+
+    # The body's velocity is a view of its row, so changing either changes both.
+    first.velocity[0] += 60
+    assert world.velocities[first.physics_row].tolist() == [120, -30]
+
+    world.step(0.5)
+    assert (first.center_x, first.center_y) == pytest.approx((70, 5))
+    assert (second.center_x, second.center_y) == pytest.approx((-5, 60))
+    assert world.position(first, 0) == pytest.approx((10, 20))
+
+    # Once removed the body keeps its position and velocity, but no longer shares the world's arrays.
+    row = first.physics_row
+    world.remove(first)
+    assert first.velocity == [120, -30]
+    assert not isinstance(first.velocity, np.ndarray)
+    assert world.velocities[row].tolist() == [0, 0]
+
+    # Adding it again copies it back in as it was.
+    world.add(first)
+    world.step(0.5)
+    assert (first.center_x, first.center_y) == pytest.approx((130, -10))
+    assert first.velocity.tolist() == [120, -30]
+
+
+def test_teleport_needs_sync():
+    world = physics.PhysicsWorld()
+    body = make_body(0, 0, (0, 0))
+    world.add(body)
+
+    # Setting the sprite position alone is undone by the next step.
+    body.center_x, body.center_y = 500, 500
+    world.step(1 / 60)
+    assert (body.center_x, body.center_y) == (0, 0)
+
+    body.center_x, body.center_y = 500, 500
+    world.sync(body)
+    world.step(1 / 60)
+    assert (body.center_x, body.center_y) == (500, 500)
+    assert world.position(body, 0) == (500, 500)
@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+import pytest
+
+import game_data.clock as clock
+import game_data.trajectory as trajectory
+
+
+def test_path_starts_where_the_body_is_before_the_step():
+    # A body drifting with a little thrust and no gravity, moved the way the game moves the player.
+    game_clock = clock.GameClock()
+    body = SimpleNamespace(center_x=0.0, center_y=0.0, velocity=[120.0, -30.0], acceleration=(0.5, 0.25))
+    predictor = trajectory.TrajectoryPredictor(None, game_clock, body)
+
+    for _ in range(30):
+        # The clock ticks first, then the enemies aim before the body is moved.
+        game_clock.tick()
+        assert predictor.position_at(predictor.start_time) == pytest.approx((body.center_x, body.center_y))
+        predicted = predictor.position_at(predictor.start_time + game_clock.step)
+
+        body.velocity[0] += body.acceleration[0]
+        body.velocity[1] += body.acceleration[1]
+        body.center_x += body.velocity[0] * game_clock.step
+        body.center_y += body.velocity[1] * game_clock.step
+        predictor.on_update()
+
+        # Once the path exists, a step after its start is where the body ends up.
+        if game_clock.ticks > 1:
+            assert predicted == pytest.approx((body.center_x, body.center_y))